@@ -0,0 +1,430 @@
+"""Background data acquisition for a bench and group of battery cells"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from battery_engine import CellTable, pack_batch, tick_frame
+from battery_events import require_independent_cells, simulate_events
+from battery_history import HistoryBuffer
+from battery_model import SIMULATION_BLOCK_STEPS, CellModel
+from battery_pack import pack_metrics
+from battery_replay import Replay
+from battery_store import HistoryStore
+
+# Run ids name the store directory of each run; microseconds keep two runs initialized
+# within the same second apart
+RUN_ID_FORMAT = "%Y%m%dT%H%M%S%f"
+
+class AcquisitionWorker:
+    """Samples one bench/group on a background thread at the configured sampling interval.
+
+    The thread schedules itself on time.monotonic(), so the sample rate does not depend
+    on how many viewers are connected or how long the dashboard takes to render. Viewers
+    only read the latest snapshot and the history buffer.
+
+    When `store_root` is given every sample is also written to an on-disk
+    HistoryStore, so the full test stays queryable while RAM holds only the
+    ring buffer.
+
+    Readings come from a stateful CellModel that only advances while sampling, so a
+    paused test resumes from the state it stopped in. Every initialize() spawns the
+    model's seed (`run_seed`) from the worker's `seed`, and the store records it.
+    The model is advanced through a Replay, so any sample of the run can be recomputed
+    from its checkpoints (see replay_frame) after it has left the ring buffer. An
+    event-driven simulation keeps its EventTimeline instead, which evaluates any sample
+    on demand.
+    """
+
+    def __init__(self, bench_name, group_num, history_capacity=1000, seed=None, store_root=None):
+        self.bench_name = bench_name
+        self.group_num = group_num
+        self.history_capacity = history_capacity
+        self.store_root = store_root
+        self.seed = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.run_seed = None
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._thread = None
+
+        self.process_params = {}
+        # Bumped on every parameter change so viewer sessions can tell when to re-sync
+        self.params_version = 0
+        self.cells = None
+        self.model = None
+        self.replay = None
+        self.timeline = None
+        self._last_step = None
+        self.history = None
+        self.store = None
+        self.latest_timestamp = None
+        self.latest_records = None
+        self.is_monitoring = False
+        # Set for the whole of simulate(), which advances the model outside the lock
+        self.is_simulating = False
+        self.is_completed = False
+        self.process_start_time = None
+        self.missed_samples = 0
+
+    @property
+    def cell_ids(self):
+        return self.cells.cell_ids if self.cells is not None else []
+
+    @property
+    def cell_types(self):
+        return self.cells.cell_types if self.cells is not None else []
+
+    @property
+    def sampling_interval(self):
+        return float(self.process_params.get('sampling_interval', 5))
+
+    def set_process_parameters(self, process_params):
+        """Update the process parameters used for the next sample"""
+        with self._lock:
+            if process_params != self.process_params:
+                self.process_params = dict(process_params)
+                self.params_version += 1
+                # Wake the loop so a new sampling interval takes effect immediately
+                self._wake.set()
+
+    def initialize(self, cell_ids, cell_types, positions=None):
+        """Configure the cells, clear history and take an initial reading"""
+        with self._lock:
+            self.cells = CellTable(cell_ids, cell_types, positions)
+            self.run_seed = self.seed.spawn(1)[0]
+            self.model = CellModel(
+                self.cells.type_codes, seed=self.run_seed, positions=self.cells.positions,
+                ambient_temperature=self.process_params.get('target_temperature', 25)
+            )
+            self.history = HistoryBuffer(self.cell_ids, self.cell_types, capacity=self.history_capacity)
+            self.process_start_time = datetime.now()
+            if self.store is not None:
+                self.store.flush()
+            self.store = None
+            if self.store_root:
+                self.store = HistoryStore(
+                    self.store_root, self.bench_name, self.group_num,
+                    self.process_start_time.strftime(RUN_ID_FORMAT), self.cell_ids, self.cell_types,
+                    seed=self.run_seed
+                )
+            self.is_completed = False
+            self.missed_samples = 0
+            self.latest_timestamp = self.process_start_time
+            self.latest_records = pack_batch(self.model.step(0, self.process_params))
+            self.replay = Replay(self.model)
+            self.timeline = None
+
+    def start(self):
+        """Start (or resume) background sampling; does nothing while a simulation runs"""
+        with self._lock:
+            if self.cells is None or self.is_simulating:
+                return
+            self.is_monitoring = True
+            self.is_completed = False
+            # Model time only advances while sampling
+            self._last_step = datetime.now()
+            if not self.process_start_time:
+                self.process_start_time = datetime.now()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"acquisition-{self.bench_name}-{self.group_num}", daemon=True
+                )
+                self._thread.start()
+
+    def pause(self):
+        """Stop sampling; the thread exits at its next wake-up"""
+        with self._lock:
+            self.is_monitoring = False
+            self._wake.set()
+            if self.store is not None:
+                self.store.flush()
+
+    def reset(self):
+        """Stop sampling and drop all cells and history"""
+        with self._lock:
+            self.pause()
+            self.cells = None
+            self.model = None
+            self.replay = None
+            self.timeline = None
+            self.history = None
+            self.store = None
+            self.latest_timestamp = None
+            self.latest_records = None
+            self.process_start_time = None
+            self.is_completed = False
+
+    def snapshot(self):
+        """Return the timestamp and SAMPLE_DTYPE records of the latest sample"""
+        with self._lock:
+            return self.latest_timestamp, self.latest_records
+
+    def latest_frame(self):
+        """Return the latest sample joined with the cell table, or None when not initialized.
+
+        Adds the model's projection of hours until each cell reaches its voltage limit
+        and, while a protocol runs, every cell's current protocol step.
+        """
+        with self._lock:
+            if self.latest_records is None:
+                return None
+            frame = tick_frame(self.cells, self.latest_timestamp, self.latest_records)
+            frame["hours_to_limit"] = self.model.time_to_limit() / 3600
+            protocol_steps = self.model.protocol_steps(self.process_params)
+            if protocol_steps is not None:
+                frame["protocol_step"] = protocol_steps
+            return frame
+
+    def pack_metrics(self, strings):
+        """Return pack_metrics of the latest sample for a pack_topology of the cells, or None when not initialized"""
+        with self._lock:
+            if self.latest_records is None:
+                return None
+            return pack_metrics(strings, self.latest_records, self.model.type_codes, self.model.resistance)
+
+    def replay_range(self):
+        """Return the first and last timestamps replay_frame() can show, or None before any sample"""
+        with self._lock:
+            ranges = [source.time_range() for source in (self.timeline, self.replay) if source is not None]
+        ranges = [time_range for time_range in ranges if time_range is not None]
+        if not ranges:
+            return None
+        return min(first for first, _ in ranges), max(last for _, last in ranges)
+
+    def replay_frame(self, timestamp):
+        """Return the sample at or before `timestamp` recomputed from the replay checkpoints.
+
+        Samples of an event-driven simulation are evaluated from its timeline instead. The
+        frame matches latest_frame() for that sample; returns None before the first sample.
+        """
+        with self._lock:
+            replay, timeline, cells = self.replay, self.timeline, self.cells
+        source = replay
+        if timeline is not None and (not len(replay) or np.datetime64(timestamp, "ns") < replay.time_range()[0]):
+            source = timeline
+        sample = source.seek(timestamp) if source is not None else None
+        if sample is None:
+            return None
+        timestamp, readings = sample
+        frame = tick_frame(cells, timestamp, pack_batch(readings))
+        if "protocol_step" in readings:
+            frame["protocol_step"] = readings["protocol_step"]
+        return frame
+
+    def history_window(self, metrics, since=None, last=None):
+        """Return (timestamps, {metric: samples x cells}) for the most recent samples.
+
+        `last` limits the window to a number of samples from the ring buffer; `since`
+        selects a time range, read from the on-disk store when it reaches further back
+        than the ring buffer.
+        """
+        with self._lock:
+            history, store = self.history, self.store
+        if history is None:
+            return np.array([], dtype="datetime64[ns]"), {name: np.empty((0, 0)) for name in metrics}
+
+        timestamps, series = history.snapshot(metrics, last)
+        if since is None:
+            return timestamps, series
+        since = np.datetime64(since, "ns")
+        if store is not None and (len(timestamps) == 0 or timestamps[0] > since):
+            return store.query(start=since, metrics=metrics)
+        mask = timestamps >= since
+        return timestamps[mask], {name: values[mask] for name, values in series.items()}
+
+    def iter_history_window(self, metrics, since, until=None):
+        """Yield the samples since `since` (and before `until`) as (timestamps, {metric: samples x cells}) chunks.
+
+        Selects the same samples as history_window(since=...) without joining them: a
+        window the ring buffer covers is one chunk, a longer one is read from the on-disk
+        store one file at a time, so reducing it never holds the whole range in memory.
+        """
+        with self._lock:
+            history, store = self.history, self.store
+        if history is None:
+            return
+        since = np.datetime64(since, "ns")
+        with history.lock:
+            timestamps = history.timestamps()
+            from_store = store is not None and (len(timestamps) == 0 or timestamps[0] > since)
+        until = None if until is None else np.datetime64(until, "ns")
+        if from_store:
+            end = None if until is None else until - np.timedelta64(1, "ns")
+            yield from store.iter_range(start=since, end=end, metrics=metrics)
+            return
+        timestamps, series = history.snapshot(metrics)
+        mask = timestamps >= since
+        if until is not None:
+            mask &= timestamps < until
+        if mask.any():
+            yield timestamps[mask], {name: values[mask] for name, values in series.items()}
+
+    def iter_history_chunks(self, metrics, chunk_samples=500):
+        """Yield the whole test history in chunks, from the on-disk store when there is one"""
+        with self._lock:
+            history, store = self.history, self.store
+        if store is not None:
+            return store.iter_chunks(metrics)
+        if history is not None:
+            return history.iter_chunks(metrics, chunk_samples)
+        return iter(())
+
+    def simulate(self, progress=None, event_driven=False):
+        """Replace the current run with the whole test_duration simulated offline.
+
+        The cells are re-initialized, unless the current run has not taken a sample yet,
+        and the model is advanced in blocks of samples at sampling_interval resolution,
+        as fast as it computes. Samples go to the history buffer and the on-disk store as
+        if they had been acquired live, timestamped so the run ends now. `progress`, when given, is called with the completed fraction.
+
+        With `event_driven` the model instead jumps from event to event (see
+        battery_events). Only the samples the history buffer holds are evaluated; the
+        store keeps the run's EventTimeline and evaluates the rest when they are read.
+        Raises ValueError when thermal coupling is on, which event-driven runs cannot follow.
+
+        While it runs is_simulating is set, and start() and sample() do nothing. Returns a
+        dict of run statistics including samples per second, or None when the cells are
+        not configured or live sampling or another simulation is running.
+        """
+        with self._lock:
+            if self.cells is None or self.is_monitoring or self.is_simulating:
+                return None
+            process_params = dict(self.process_params)
+            if event_driven:
+                require_independent_cells(process_params)
+            if len(self.replay) or self.timeline is not None:
+                self.initialize(self.cell_ids, self.cell_types, self.cells.positions)
+            else:
+                # A run initialized just before is simulated as it is, so its store keeps its seed
+                self.latest_timestamp = datetime.now()
+            interval = self.sampling_interval
+            total = int(process_params.get('test_duration', 0) * 3600 // interval)
+            self.process_start_time = self.latest_timestamp - timedelta(seconds=total * interval)
+            model, replay, history, store = self.model, self.replay, self.history, self.store
+            self.is_simulating = True
+
+        try:
+            start = np.datetime64(self.process_start_time, "ns")
+            interval_ns = np.timedelta64(round(interval * 1e9), "ns")
+            began = time.perf_counter()
+            done = 0
+            pending = []
+            event_stats = {}
+
+            def write_pending():
+                if store is not None and pending:
+                    store.append_block(np.concatenate([block[0] for block in pending]),
+                                       np.concatenate([block[1] for block in pending]))
+                    pending.clear()
+
+            if event_driven:
+                timeline = simulate_events(model, start, interval, total, process_params, progress)
+                done = total
+                if total:
+                    timestamps, readings = timeline.sample_block(max(0, total - history.capacity), total)
+                    records = pack_batch(readings)
+                    with self._lock:
+                        history.extend(timestamps, records)
+                        self.latest_timestamp = timestamps[-1].astype("datetime64[us]").item()
+                        self.latest_records = records[-1]
+                if store is not None:
+                    store.write_timeline(timeline)
+                with self._lock:
+                    self.timeline = timeline
+                event_stats = {"events": len(timeline.event_times), "segments": timeline.num_segments}
+            else:
+                run_timestamps = start + interval_ns * np.arange(1, total + 1)
+                for timestamps, readings in replay.iter_blocks(run_timestamps, interval, process_params):
+                    records = pack_batch(readings)
+                    done += len(records)
+                    with self._lock:
+                        history.extend(timestamps, records)
+                        self.latest_timestamp = timestamps[-1].astype("datetime64[us]").item()
+                        self.latest_records = records[-1]
+                    # Short blocks are batched so the store is not split into many tiny files
+                    pending.append((timestamps, records))
+                    if sum(len(block[0]) for block in pending) >= SIMULATION_BLOCK_STEPS:
+                        write_pending()
+                    if progress is not None:
+                        progress(done / total)
+                write_pending()
+            elapsed = time.perf_counter() - began
+            with self._lock:
+                self.is_completed = True
+        finally:
+            with self._lock:
+                self.is_simulating = False
+        num_cells = len(model)
+        return {
+            "run_id": store.run_id if store is not None else None,
+            "samples": done,
+            "cells": num_cells,
+            **event_stats,
+            "simulated_hours": done * interval / 3600,
+            "elapsed_seconds": elapsed,
+            "samples_per_second": done / elapsed if elapsed > 0 else float("inf"),
+            "cell_samples_per_second": done * num_cells / elapsed if elapsed > 0 else float("inf"),
+            "speedup": done * interval / elapsed if elapsed > 0 else float("inf")
+        }
+
+    def sample(self):
+        """Take one reading of every cell and append it to the history"""
+        current_time = datetime.now()
+        with self._lock:
+            if self.cells is None or self.is_simulating:
+                return
+            dt = (current_time - self._last_step).total_seconds() if self._last_step else 0
+            self._last_step = current_time
+            records = pack_batch(self.replay.step(current_time, dt, self.process_params))
+            self.latest_timestamp = current_time
+            self.latest_records = records
+            self.history.append(current_time, records)
+            if self.store is not None:
+                self.store.append(current_time, records)
+
+            # Stop once the configured test duration has elapsed
+            test_duration = self.process_params.get('test_duration')
+            if test_duration and self.process_start_time:
+                elapsed_hours = (current_time - self.process_start_time).total_seconds() / 3600
+                if elapsed_hours >= test_duration:
+                    self.is_monitoring = False
+                    self.is_completed = True
+                    if self.store is not None:
+                        self.store.flush()
+
+    def _run(self):
+        # Monotonic time of the current scheduled tick
+        tick = time.monotonic()
+        while True:
+            with self._lock:
+                if not self.is_monitoring:
+                    self._thread = None
+                    return
+            self.sample()
+
+            # Schedule on fixed multiples of the interval so slow samples do not add drift,
+            # skipping (and counting) ticks that were missed entirely. A parameter change
+            # wakes the wait to re-plan the next tick with the new interval, which is due
+            # at once if the shorter interval has already passed; it does not take an
+            # extra sample
+            interval = self.sampling_interval
+            replanning = False
+            while True:
+                with self._lock:
+                    self._wake.clear()
+                    if not self.is_monitoring:
+                        break
+                    interval = self.sampling_interval
+                now = time.monotonic()
+                if tick + interval < now:
+                    if replanning:
+                        tick = now - interval
+                    else:
+                        missed = int((now - tick - interval) // interval) + 1
+                        self.missed_samples += missed
+                        tick += missed * interval
+                if not self._wake.wait(tick + interval - now):
+                    break
+                replanning = True
+            tick += interval
@@ -0,0 +1,361 @@
+"""Benchmark suite for cell generation, history, export and dashboard rerun latency.
+
+Results are written as JSON so builds can be compared:
+
+    python battery_benchmark.py --output results.json
+    python battery_benchmark.py --quick --compare results.json
+
+With --compare the run exits with status 1 when any case is slower than the
+baseline by more than --threshold (median time ratio).
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from battery_engine import (
+    CELL_TYPES, CellTable, cell_type_codes, generate_cell_data, generate_cells_batch, pack_batch, tick_frame
+)
+from battery_events import simulate_events
+from battery_export import EXPORT_COLUMNS, export_historical_to_csv, export_to_csv, write_historical_export
+from battery_history import HistoryBuffer
+from battery_model import CellModel
+from battery_pack import pack_metrics, pack_topology
+from battery_protocol import PROTOCOL_PRESETS, validate_protocol
+from battery_replay import Replay
+
+DASHBOARD_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mainbattery_monitoring_dashboard.py")
+# Bench used for dashboard reruns; its history store directory is deleted afterwards
+BENCHMARK_BENCH = "__benchmark__"
+BENCHMARK_GROUPS = ("generation", "history", "export", "dashboard")
+# Median slowdown against a baseline that counts as a regression
+REGRESSION_THRESHOLD = 1.25
+
+# Case sizes per group: (full run, --quick run)
+GENERATION_CELLS = ((16, 1_000, 100_000), (16, 1_000))
+# Samples per cell_model_blocks run (block-stepped offline simulation)
+SIMULATION_STEPS = 200
+# Cells per series string of the packs reduced by pack_metrics
+PACK_SERIES = 16
+# Bench layout width of the thermally coupled model steps
+THERMAL_COLUMNS = 32
+# Protocol run by the cell_model_blocks_protocol case
+BENCHMARK_PROTOCOL = "CC-CV Cycle"
+# Simulated hours of the event-driven runs, at a 5 s sampling interval
+EVENT_HOURS = 24
+# History buffers as (cells, capacity): 1000 and 1M records
+HISTORY_SHAPES = (((1, 1000), (1000, 1000)), ((1, 1000), (100, 1000)))
+# Replay seeks go into a run of this many cells and hours, block-simulated at 5 s sampling
+REPLAY_CELLS = 16
+REPLAY_HOURS = 168
+EXPORT_CELLS = ((16, 1_000, 100_000), (16, 1_000))
+# Historical exports as (cells, samples)
+HISTORICAL_SHAPES = (((16, 1000), (100, 1000), (1000, 1000)), ((16, 1000), (100, 1000)))
+DASHBOARD_CELLS = ((16, 1000), (16,))
+DASHBOARD_TABS = ("📈 Real-time Data", "🔋 Enhanced Health", "🔥 Temperature Monitor",
+                  "⚡ Historical Trends", "⏪ Replay", "📊 Process Analysis",
+                  "🧪 Parameter Sweep", "🎲 Monte Carlo")
+
+def make_cells(num_cells):
+    """Return ids and chemistries of a bench cycling through every cell type"""
+    cell_types = [CELL_TYPES[i % len(CELL_TYPES)] for i in range(num_cells)]
+    return [f"Cell_{i+1}_{cell_type}" for i, cell_type in enumerate(cell_types)], cell_types
+
+def make_history(num_cells, samples, capacity=None):
+    """Return a HistoryBuffer filled with `samples` ticks of generated data"""
+    cell_ids, cell_types = make_cells(num_cells)
+    codes = cell_type_codes(cell_types)
+    history = HistoryBuffer(cell_ids, cell_types, capacity=capacity or samples)
+    start = np.datetime64(datetime.now(), "ns")
+    rng = np.random.default_rng(0)
+    for i in range(samples):
+        history.append(start + np.timedelta64(i, "s"), pack_batch(generate_cells_batch(codes, rng=rng)))
+    return history
+
+def time_case(fn, repeats, setup=None):
+    """Run fn `repeats` times and return the wall time of each run in seconds"""
+    timings = []
+    for _ in range(repeats):
+        state = setup() if setup else None
+        gc.collect()
+        start = time.perf_counter()
+        if setup:
+            fn(state)
+        else:
+            fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def result(benchmark, params, timings, items=None):
+    """Summarize the timings of one case as a JSON-serializable record"""
+    timings = np.asarray(timings)
+    record = {
+        "benchmark": benchmark,
+        "params": params,
+        "repeats": len(timings),
+        "min_s": float(timings.min()),
+        "median_s": float(np.median(timings)),
+        "mean_s": float(timings.mean()),
+        "max_s": float(timings.max())
+    }
+    if items:
+        record["items_per_s"] = float(items / np.median(timings))
+    return record
+
+def bench_generation(quick, repeats):
+    """Time per-cell dict generation against the batched generator and the stateful model.
+
+    The model is timed one step at a time and block-stepped as in offline simulation;
+    items are cell samples in both, so their items_per_s compare directly. Pack metrics
+    are timed for one tick of the cells wired as PACK_SERIES-cell strings. Thermally
+    coupled steps exchange heat on a THERMAL_COLUMNS-wide bench layout. Protocol runs
+    step every cell through BENCHMARK_PROTOCOL on its own. Event-driven runs cover
+    EVENT_HOURS; their items are the samples they stand for, evaluated or not.
+    """
+    results = []
+    process_params = {"charge_rate": 1.0, "discharge_rate": 1.0, "target_temperature": 25}
+    for num_cells in GENERATION_CELLS[quick]:
+        cell_ids, cell_types = make_cells(num_cells)
+        codes = cell_type_codes(cell_types)
+        now = datetime.now()
+        runs = max(1, repeats if num_cells <= 1_000 else repeats // 3)
+
+        timings = time_case(lambda: [generate_cell_data(cell_type, cell_id, now, process_params)
+                                     for cell_id, cell_type in zip(cell_ids, cell_types)], runs)
+        results.append(result("generate_cell_data", {"cells": num_cells}, timings, num_cells))
+        timings = time_case(lambda: pack_batch(generate_cells_batch(codes, process_params)), repeats)
+        results.append(result("generate_cells_batch", {"cells": num_cells}, timings, num_cells))
+        model = CellModel(codes)
+        timings = time_case(lambda: pack_batch(model.step(5, process_params)), repeats)
+        results.append(result("cell_model_step", {"cells": num_cells}, timings, num_cells))
+        coupled_params = {**process_params, "thermal_columns": THERMAL_COLUMNS}
+        timings = time_case(lambda: pack_batch(model.step(5, coupled_params)), repeats)
+        results.append(result("cell_model_step_thermal", {"cells": num_cells, "columns": THERMAL_COLUMNS},
+                              timings, num_cells))
+        timings = time_case(lambda: [pack_batch(readings) for readings
+                                     in model.iter_blocks(5, SIMULATION_STEPS, process_params)], runs)
+        results.append(result("cell_model_blocks", {"cells": num_cells, "steps": SIMULATION_STEPS},
+                              timings, num_cells * SIMULATION_STEPS))
+        protocol_params = {**process_params, "protocol": validate_protocol(PROTOCOL_PRESETS[BENCHMARK_PROTOCOL])}
+        timings = time_case(lambda: [pack_batch(readings) for readings
+                                     in model.iter_blocks(5, SIMULATION_STEPS, protocol_params)], runs)
+        results.append(result("cell_model_blocks_protocol", {"cells": num_cells, "steps": SIMULATION_STEPS},
+                              timings, num_cells * SIMULATION_STEPS))
+        event_samples = EVENT_HOURS * 720
+        initial_state = model.state()
+
+        def run_events(params):
+            model.restore(initial_state)
+            return simulate_events(model, np.datetime64("now", "ns"), 5, event_samples, params)
+
+        for name, params in (("event_simulation", process_params), ("event_simulation_protocol", protocol_params)):
+            timings = time_case(lambda: run_events(params), runs)
+            results.append(result(name, {"cells": num_cells, "hours": EVENT_HOURS}, timings,
+                                  num_cells * event_samples))
+        strings = pack_topology(np.arange(num_cells), max(1, num_cells // PACK_SERIES))
+        records = pack_batch(model.step(5, process_params))
+        timings = time_case(lambda: pack_metrics(strings, records, model.type_codes, model.resistance), repeats)
+        results.append(result("pack_metrics", {"cells": num_cells, "strings": len(strings)}, timings, num_cells))
+    return results
+
+def bench_history(quick, repeats):
+    """Time ring buffer appends while filling and while overwriting (trimming) old samples.
+
+    Also times seeks to random moments of a week-long replay, each recomputed from a checkpoint.
+    """
+    results = []
+    for num_cells, capacity in HISTORY_SHAPES[quick]:
+        cell_ids, cell_types = make_cells(num_cells)
+        records = pack_batch(generate_cells_batch(cell_type_codes(cell_types)))
+        start = np.datetime64(datetime.now(), "ns")
+        params = {"cells": num_cells, "capacity": capacity, "records": num_cells * capacity}
+
+        def fill(history):
+            for i in range(capacity):
+                history.append(start + np.timedelta64(i, "s"), records)
+
+        timings = time_case(fill, repeats, setup=lambda: HistoryBuffer(cell_ids, cell_types, capacity))
+        results.append(result("history_append", params, np.asarray(timings) / capacity, 1))
+
+        def full_history():
+            history = HistoryBuffer(cell_ids, cell_types, capacity)
+            fill(history)
+            return history
+
+        timings = time_case(fill, repeats, setup=full_history)
+        results.append(result("history_append_trim", params, np.asarray(timings) / capacity, 1))
+
+        history = full_history()
+        timings = time_case(lambda: history.snapshot(EXPORT_COLUMNS), repeats)
+        results.append(result("history_snapshot", params, timings, num_cells * capacity))
+
+    _, cell_types = make_cells(REPLAY_CELLS)
+    replay = Replay(CellModel(cell_type_codes(cell_types), seed=0))
+    steps = REPLAY_HOURS * 3600 // 5
+    run_start = np.datetime64(datetime.now(), "ns")
+    interval = np.timedelta64(5, "s")
+    process_params = {"charge_rate": 1.0, "discharge_rate": 1.0, "target_temperature": 25}
+    for _ in replay.iter_blocks(run_start + interval * np.arange(steps), 5, process_params):
+        pass
+    seek_times = iter(run_start + interval * np.random.default_rng(0).integers(0, steps, repeats))
+    timings = time_case(lambda: replay.seek(next(seek_times)), repeats)
+    results.append(result("replay_seek", {"cells": REPLAY_CELLS, "hours": REPLAY_HOURS}, timings))
+    return results
+
+def bench_export(quick, repeats):
+    """Time current-tick and historical exports, including serialization"""
+    results = []
+    for num_cells in EXPORT_CELLS[quick]:
+        cells = CellTable(*make_cells(num_cells))
+        frame = tick_frame(cells, datetime.now(), pack_batch(generate_cells_batch(cells.type_codes)))
+
+        def current_csv():
+            df, _ = export_to_csv(frame)
+            df.to_csv(io.StringIO(), index=False)
+
+        timings = time_case(current_csv, repeats)
+        results.append(result("export_to_csv", {"cells": num_cells}, timings, num_cells))
+
+    export_dir = tempfile.mkdtemp(prefix="battery_benchmark_")
+    try:
+        for num_cells, samples in HISTORICAL_SHAPES[quick]:
+            history = make_history(num_cells, samples)
+            params = {"cells": num_cells, "samples": samples, "rows": num_cells * samples}
+            runs = max(1, repeats if num_cells * samples <= 100_000 else repeats // 3)
+
+            def historical_csv():
+                df, _ = export_historical_to_csv(history)
+                df.to_csv(io.StringIO(), index=False)
+
+            timings = time_case(historical_csv, runs)
+            results.append(result("export_historical_to_csv", params, timings, num_cells * samples))
+
+            for export_format in ("CSV", "Parquet"):
+                path = os.path.join(export_dir, f"history.{export_format.lower()}")
+                timings = time_case(lambda: write_historical_export(
+                    path, history.iter_chunks(EXPORT_COLUMNS), history.cell_ids, history.cell_types, export_format
+                ), runs)
+                results.append(result("write_historical_export", {**params, "format": export_format},
+                                      timings, num_cells * samples))
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
+    return results
+
+def bench_dashboard(quick, repeats):
+    """Time full script reruns through AppTest with each tab selected"""
+    from streamlit.testing.v1 import AppTest
+    from battery_registry import shared_registry
+
+    results = []
+    at = AppTest.from_file(DASHBOARD_SCRIPT, default_timeout=600)
+    at.session_state["bench_name"] = BENCHMARK_BENCH
+    at.run()
+    # AppTest runs the app in this process, so it shares this process's registry
+    registry = shared_registry()
+    worker = registry.get(BENCHMARK_BENCH, 1)
+    try:
+        for num_cells in DASHBOARD_CELLS[quick]:
+            worker.initialize(*make_cells(num_cells))
+            for _ in range(worker.history_capacity):
+                worker.sample()
+            for tab in DASHBOARD_TABS:
+                at.session_state["selected_tab"] = tab
+                at.run()
+                if at.exception:
+                    raise RuntimeError(f"Dashboard raised while rendering {tab}: {at.exception[0].message}")
+                timings = time_case(at.run, repeats)
+                results.append(result("dashboard_rerun", {"cells": num_cells, "tab": tab}, timings))
+    finally:
+        registry.remove(BENCHMARK_BENCH, 1)
+        if worker.store_root:
+            shutil.rmtree(os.path.join(worker.store_root, BENCHMARK_BENCH), ignore_errors=True)
+    return results
+
+def environment():
+    """Describe the build and machine the benchmarks ran on"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    versions = {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__}
+    try:
+        import streamlit
+        versions["streamlit"] = streamlit.__version__
+    except ImportError:
+        pass
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions
+    }
+
+def case_key(record):
+    return record["benchmark"], json.dumps(record["params"], sort_keys=True, ensure_ascii=False)
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Return (record, ratio) for every case whose median is slower than the baseline by more than threshold"""
+    baseline_medians = {case_key(record): record["median_s"] for record in baseline["results"]}
+    regressions = []
+    for record in results:
+        reference = baseline_medians.get(case_key(record))
+        if reference:
+            ratio = record["median_s"] / reference
+            if ratio > threshold:
+                regressions.append((record, ratio))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the battery monitoring dashboard")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results")
+    parser.add_argument("--compare", help="Baseline JSON file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Median time ratio over the baseline reported as a regression")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--quick", action="store_true", help="Skip the largest sizes")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARK_GROUPS, default=BENCHMARK_GROUPS,
+                        help="Benchmark groups to run")
+    args = parser.parse_args(argv)
+
+    groups = {"generation": bench_generation, "history": bench_history,
+              "export": bench_export, "dashboard": bench_dashboard}
+    results = []
+    for name in args.only:
+        group_results = groups[name](int(args.quick), args.repeats)
+        for record in group_results:
+            params = ", ".join(f"{key}={value}" for key, value in record["params"].items())
+            print(f"{record['benchmark']:<26} {params:<52} median {record['median_s'] * 1000:10.3f} ms")
+        results.extend(group_results)
+
+    report = {"environment": environment(), "quick": args.quick, "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for record, ratio in regressions:
+            print(f"REGRESSION {record['benchmark']} {record['params']}: {ratio:.2f}x slower than baseline")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
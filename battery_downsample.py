@@ -0,0 +1,180 @@
+"""Downsampling of long (samples x cells) series for plotting"""
+import numpy as np
+
+DOWNSAMPLE_MODES = ("LTTB", "Min/Max", "Off")
+
+def _as_columns(values):
+    values = np.asarray(values)
+    return values.reshape(len(values), -1)
+
+def lttb_indices(x, values, n_out):
+    """Pick n_out sample indices per column with Largest-Triangle-Three-Buckets.
+
+    x is a 1-D numeric array shared by every column of values (samples x cells), or a
+    (samples x cells) array when every column has its own sample times. Buckets are
+    walked in order because each pick depends on the previous one, but every bucket
+    is evaluated for all cells at once.
+    """
+    y = _as_columns(values)
+    n, num_cols = y.shape
+    if n_out >= n or n_out < 3:
+        return np.tile(np.arange(n)[:, None], (1, num_cols))
+
+    x = np.asarray(x, dtype=float)
+    x = np.broadcast_to(x[:, None], (n, num_cols)) if x.ndim == 1 else x
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    cols = np.arange(num_cols)
+    selected = np.empty((n_out, num_cols), dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = selected[0].copy()
+
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # The third triangle point is the average of the next bucket (or the last sample)
+        next_start, next_end = (edges[bucket + 1], edges[bucket + 2]) if bucket + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean(axis=0)
+        avg_y = y[next_start:next_end].mean(axis=0)
+
+        prev_x = x[previous, cols]
+        prev_y = y[previous, cols]
+        bucket_x = x[start:end]
+        area = np.abs((prev_x - avg_x) * (y[start:end] - prev_y) - (prev_x - bucket_x) * (avg_y - prev_y))
+        previous = start + area.argmax(axis=0)
+        selected[bucket + 1] = previous
+
+    return selected
+
+def minmax_indices(values, n_buckets):
+    """Pick the minimum and maximum sample of each bucket per column, in time order.
+
+    Keeps short spikes visible: every bucket contributes its extremes no matter how
+    many samples it covers.
+    """
+    y = _as_columns(values)
+    n, num_cols = y.shape
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.tile(np.arange(n)[:, None], (1, num_cols))
+
+    # Equal-size buckets; the tail is padded with the last sample so padding never
+    # introduces a new extreme
+    size = -(-n // n_buckets)
+    padded = np.concatenate([y, np.repeat(y[-1:], n_buckets * size - n, axis=0)])
+    buckets = padded.reshape(n_buckets, size, num_cols)
+    offsets = (np.arange(n_buckets) * size)[:, None]
+    lows = np.minimum(offsets + buckets.argmin(axis=1), n - 1)
+    highs = np.minimum(offsets + buckets.argmax(axis=1), n - 1)
+
+    indices = np.empty((2 * n_buckets, num_cols), dtype=np.intp)
+    indices[0::2] = np.minimum(lows, highs)
+    indices[1::2] = np.maximum(lows, highs)
+    return indices
+
+def downsample(timestamps, values, max_points, mode="LTTB"):
+    """Reduce a series to at most max_points per column.
+
+    Returns (x, y) arrays of shape (points x columns) holding the chosen timestamps
+    and values; the series is returned unchanged when it is already short enough
+    or mode is "Off".
+    """
+    timestamps = np.asarray(timestamps)
+    y = _as_columns(values)
+    n, num_cols = y.shape
+
+    if mode == "Off" or n <= max_points:
+        indices = np.tile(np.arange(n)[:, None], (1, num_cols))
+    elif mode == "Min/Max":
+        indices = minmax_indices(y, max_points // 2)
+    elif mode == "LTTB":
+        x = (timestamps - timestamps[0]).astype("timedelta64[ns]").astype(np.int64) / 1e9
+        indices = lttb_indices(x, y, max_points)
+    else:
+        raise ValueError(f"Unknown downsampling mode: {mode}")
+
+    return timestamps[indices], np.take_along_axis(y, indices, axis=0)
+
+class BucketDownsampler:
+    """Streaming min/max downsampling of (samples x columns) chunks between two timestamps.
+
+    The time range [start, end] is split into equal buckets, and every bucket keeps the
+    minimum and maximum of each column with their timestamps, so memory is bounded by
+    buckets x columns however many samples are added. Chunks are added oldest first;
+    samples outside the range count towards its first or last bucket. Up to `max_points`
+    samples are also kept as they are, so a short series is returned unreduced.
+    """
+
+    def __init__(self, start, end, num_columns, max_points, mode="LTTB"):
+        if mode not in DOWNSAMPLE_MODES:
+            raise ValueError(f"Unknown downsampling mode: {mode}")
+        self.max_points = max_points
+        self.mode = mode
+        # LTTB picks from twice the points Min/Max shows, so it can choose between extremes
+        self.buckets = max(1, max_points if mode == "LTTB" else max_points // 2)
+        self.start = np.datetime64(start, "ns")
+        self.width = max((np.datetime64(end, "ns") - self.start).astype(np.int64) / self.buckets, 1.0)
+        self.samples = 0
+        self._raw = []
+        self._low = np.full((self.buckets, num_columns), np.inf)
+        self._high = np.full((self.buckets, num_columns), -np.inf)
+        self._low_time = np.zeros((self.buckets, num_columns), dtype="datetime64[ns]")
+        self._high_time = np.zeros((self.buckets, num_columns), dtype="datetime64[ns]")
+
+    def add(self, timestamps, values):
+        """Add a chunk of timestamps and (samples x columns) values, later than any added before"""
+        timestamps = np.asarray(timestamps, dtype="datetime64[ns]")
+        y = _as_columns(values).astype(np.float64)
+        if not len(timestamps):
+            return
+        self.samples += len(timestamps)
+        if self._raw is not None:
+            self._raw.append((timestamps, y))
+            if self.samples > self.max_points:
+                self._raw = None
+
+        offsets = (timestamps - self.start).astype(np.int64)
+        bucket = np.clip((offsets // self.width).astype(np.intp), 0, self.buckets - 1)
+        # Samples arrive in time order, so every bucket is one run of rows
+        starts = np.flatnonzero(np.r_[True, np.diff(bucket) != 0])
+        counts = np.diff(np.r_[starts, len(bucket)])
+        ids = bucket[starts]
+        rows = np.arange(len(y))[:, None]
+        for extreme, values_kept, times_kept, better in (
+            (np.minimum, self._low, self._low_time, np.less),
+            (np.maximum, self._high, self._high_time, np.greater)
+        ):
+            reduced = extreme.reduceat(y, starts, axis=0)
+            # First row of each run holding the run's extreme, per column
+            hits = np.where(y == np.repeat(reduced, counts, axis=0), rows, len(y))
+            times = timestamps[np.minimum.reduceat(hits, starts, axis=0)]
+            replace = better(reduced, values_kept[ids])
+            values_kept[ids] = np.where(replace, reduced, values_kept[ids])
+            times_kept[ids] = np.where(replace, times, times_kept[ids])
+
+    def result(self):
+        """Return (x, y) arrays of shape (points x columns) like downsample().
+
+        A series longer than max_points gives each non-empty bucket's minimum and maximum
+        in time order; LTTB then picks max_points of them. "Off" cannot return a series of
+        unbounded length, so it reduces like Min/Max.
+        """
+        if self._raw is not None:
+            if not self._raw:
+                num_columns = self._low.shape[1]
+                return np.empty((0, num_columns), dtype="datetime64[ns]"), np.empty((0, num_columns))
+            timestamps = np.concatenate([chunk[0] for chunk in self._raw])
+            y = np.concatenate([chunk[1] for chunk in self._raw])
+            return np.broadcast_to(timestamps[:, None], y.shape).copy(), y
+
+        filled = np.isfinite(self._low[:, 0])
+        low_first = self._low_time[filled] <= self._high_time[filled]
+        x = np.empty((2 * filled.sum(), self._low.shape[1]), dtype="datetime64[ns]")
+        y = np.empty(x.shape)
+        x[0::2] = np.where(low_first, self._low_time[filled], self._high_time[filled])
+        x[1::2] = np.where(low_first, self._high_time[filled], self._low_time[filled])
+        y[0::2] = np.where(low_first, self._low[filled], self._high[filled])
+        y[1::2] = np.where(low_first, self._high[filled], self._low[filled])
+        if self.mode == "LTTB" and len(x) > self.max_points:
+            seconds = (x - x[0].min()).astype(np.int64) / 1e9
+            indices = lttb_indices(seconds, y, self.max_points)
+            x, y = np.take_along_axis(x, indices, axis=0), np.take_along_axis(y, indices, axis=0)
+        return x, y
@@ -0,0 +1,316 @@
+"""Battery cell configurations and simulated cell data generation"""
+import numpy as np
+import pandas as pd
+
+# Open-circuit voltage curves ("ocv_curve") are sampled at these states of charge
+OCV_SOC_POINTS = (0.0, 0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+
+# Cell type configurations with enhanced colors; internal resistance in ohms
+CELL_CONFIGS = {
+    "LFP": {
+        "nominal_voltage": 3.2,
+        "min_voltage": 2.8,
+        "max_voltage": 3.6,
+        "color": "#00ff88",
+        "gradient": "linear-gradient(135deg, #11998e 0%, #38ef7d 100%)",
+        "capacity_range": (2.5, 3.5),
+        "temp_range": (-20, 60),
+        "internal_resistance": 0.025,
+        "ocv_curve": (2.80, 3.04, 3.12, 3.16, 3.18, 3.19, 3.20, 3.21, 3.22, 3.24, 3.26, 3.33, 3.56)
+    },
+    "NMC": {
+        "nominal_voltage": 3.6,
+        "min_voltage": 3.2,
+        "max_voltage": 4.0,
+        "color": "#ff6b6b",
+        "gradient": "linear-gradient(135deg, #ff416c 0%, #ff4b2b 100%)",
+        "capacity_range": (2.8, 3.2),
+        "temp_range": (-10, 50),
+        "internal_resistance": 0.035,
+        "ocv_curve": (3.20, 3.32, 3.40, 3.46, 3.51, 3.56, 3.60, 3.65, 3.70, 3.77, 3.84, 3.90, 3.98)
+    },
+    "LTO": {
+        "nominal_voltage": 2.4,
+        "min_voltage": 1.5,
+        "max_voltage": 2.8,
+        "color": "#ffa726",
+        "gradient": "linear-gradient(135deg, #f093fb 0%, #f5576c 100%)",
+        "capacity_range": (1.8, 2.8),
+        "temp_range": (-30, 55),
+        "internal_resistance": 0.015,
+        "ocv_curve": (1.50, 2.02, 2.21, 2.31, 2.34, 2.37, 2.40, 2.41, 2.44, 2.46, 2.51, 2.59, 2.76)
+    },
+    "LiCoO2": {
+        "nominal_voltage": 3.7,
+        "min_voltage": 3.0,
+        "max_voltage": 4.2,
+        "color": "#ab47bc",
+        "gradient": "linear-gradient(135deg, #667eea 0%, #764ba2 100%)",
+        "capacity_range": (2.0, 3.0),
+        "temp_range": (0, 45),
+        "internal_resistance": 0.045,
+        "ocv_curve": (3.00, 3.30, 3.42, 3.52, 3.58, 3.64, 3.70, 3.76, 3.83, 3.91, 4.01, 4.08, 4.16)
+    }
+}
+
+# Per-chemistry lookup tables indexed by cell type code, used by the batch generator
+CELL_TYPES = list(CELL_CONFIGS.keys())
+NOMINAL_VOLTAGES = np.array([CELL_CONFIGS[t]["nominal_voltage"] for t in CELL_TYPES])
+MIN_VOLTAGES = np.array([CELL_CONFIGS[t]["min_voltage"] for t in CELL_TYPES])
+MAX_VOLTAGES = np.array([CELL_CONFIGS[t]["max_voltage"] for t in CELL_TYPES])
+CAPACITY_LOWS = np.array([CELL_CONFIGS[t]["capacity_range"][0] for t in CELL_TYPES])
+CAPACITY_HIGHS = np.array([CELL_CONFIGS[t]["capacity_range"][1] for t in CELL_TYPES])
+
+# Status labels indexed by status code
+STATUS_LABELS = np.array(["Excellent", "Good", "Warning", "Critical"], dtype=object)
+STATUS_EXCELLENT, STATUS_GOOD, STATUS_WARNING, STATUS_CRITICAL = range(4)
+
+# Compact per-cell record of one tick; static attributes live in CellTable and the
+# timestamp is stored once per tick
+SAMPLE_DTYPE = np.dtype([
+    ("voltage", np.float32),
+    ("current", np.float32),
+    ("temperature", np.float32),
+    ("power", np.float32),
+    ("capacity", np.float32),
+    ("soc", np.float32),
+    ("health", np.float32),
+    ("stress_factor", np.float32),
+    ("status_code", np.int8)
+])
+
+_default_rng = np.random.default_rng()
+
+def generate_cell_data(cell_type, cell_id, current_time, process_params=None, rng=None):
+    """Generate realistic battery cell data with enhanced status based on process parameters.
+
+    Random draws come from the NumPy Generator `rng` (default: a module-wide unseeded one).
+    """
+    rng = _default_rng if rng is None else rng
+    config = CELL_CONFIGS[cell_type]
+    
+    # Apply process parameters if available
+    if process_params:
+        # Simulate effects of process parameters
+        voltage_offset = 0
+        temp_offset = 0
+        
+        # Charging/Discharging rate effects
+        if process_params.get('charge_rate', 0) > 2:
+            voltage_offset += rng.uniform(0.02, 0.05)
+            temp_offset += rng.uniform(2, 5)
+        elif process_params.get('discharge_rate', 0) > 2:
+            voltage_offset -= rng.uniform(0.02, 0.05)
+            temp_offset += rng.uniform(1, 3)
+            
+        # Temperature control effects
+        target_temp = process_params.get('target_temperature', 25)
+        temp_variation = rng.uniform(-2, 2)
+        temperature = target_temp + temp_variation + temp_offset
+        
+        # Voltage with process effects
+        base_voltage = config["nominal_voltage"] + voltage_offset
+        voltage_variation = rng.uniform(-0.05, 0.05)
+        voltage = round(base_voltage + voltage_variation, 3)
+    else:
+        # Default behavior
+        base_voltage = config["nominal_voltage"]
+        voltage_variation = rng.uniform(-0.1, 0.1)
+        voltage = round(base_voltage + voltage_variation, 3)
+        
+        base_temp = 25
+        temp_variation = rng.uniform(-2, 8)
+        temperature = round(base_temp + temp_variation, 1)
+    
+    # Simulate current based on process parameters
+    if process_params:
+        charge_rate = process_params.get('charge_rate', 0)
+        discharge_rate = process_params.get('discharge_rate', 0)
+        
+        if charge_rate > 0:
+            current = round(rng.uniform(charge_rate * 0.8, charge_rate * 1.2), 2)
+        elif discharge_rate > 0:
+            current = round(rng.uniform(-discharge_rate * 1.2, -discharge_rate * 0.8), 2)
+        else:
+            current = round(rng.uniform(-5.0, 5.0), 2)
+    else:
+        current = round(rng.uniform(-5.0, 5.0), 2)
+    
+    # Calculate power and capacity
+    power = round(voltage * abs(current), 2)
+    capacity = round(rng.uniform(*config["capacity_range"]), 2)
+    
+    # Enhanced health calculation with process parameter effects
+    voltage_health = 100 * (1 - abs(voltage - config["nominal_voltage"]) / config["nominal_voltage"])
+    temp_health = 100 * max(0, 1 - max(0, temperature - 35) / 20)
+    
+    # Process stress factor
+    stress_factor = 1.0
+    if process_params:
+        if abs(current) > 3:
+            stress_factor *= 0.98
+        if temperature > 40:
+            stress_factor *= 0.95
+    
+    overall_health = round((voltage_health + temp_health) / 2 * stress_factor, 1)
+    
+    # Enhanced status determination
+    if voltage < config["min_voltage"] or voltage > config["max_voltage"] or temperature > 50:
+        status = "Critical"
+    elif temperature > 45 or overall_health < 75:
+        status = "Warning"
+    elif overall_health >= 90:
+        status = "Excellent"
+    else:
+        status = "Good"
+    
+    return {
+        "cell_id": cell_id,
+        "cell_type": cell_type,
+        "voltage": voltage,
+        "current": current,
+        "temperature": temperature,
+        "power": power,
+        "capacity": capacity,
+        "health": overall_health,
+        "status": status,
+        "timestamp": current_time,
+        "min_voltage": config["min_voltage"],
+        "max_voltage": config["max_voltage"],
+        "stress_factor": stress_factor
+    }
+
+def cell_type_codes(cell_types):
+    """Convert a sequence of chemistry names into an array of cell type codes"""
+    codes = {cell_type: code for code, cell_type in enumerate(CELL_TYPES)}
+    return np.array([codes[cell_type] for cell_type in cell_types], dtype=np.int8)
+
+def generate_cells_batch(type_codes, process_params=None, rng=None):
+    """Generate one tick of data for many cells at once as column arrays.
+
+    Mirrors generate_cell_data: same distributions, rounding and status rules,
+    but every random draw and rule is evaluated over the whole array of cells.
+    """
+    rng = _default_rng if rng is None else rng
+    codes = np.asarray(type_codes, dtype=np.intp)
+    n = codes.size
+    nominal = NOMINAL_VOLTAGES[codes]
+    
+    if process_params:
+        charge_rate = process_params.get('charge_rate', 0)
+        discharge_rate = process_params.get('discharge_rate', 0)
+        
+        # Charging/Discharging rate effects
+        if charge_rate > 2:
+            voltage_offset = rng.uniform(0.02, 0.05, n)
+            temp_offset = rng.uniform(2, 5, n)
+        elif discharge_rate > 2:
+            voltage_offset = -rng.uniform(0.02, 0.05, n)
+            temp_offset = rng.uniform(1, 3, n)
+        else:
+            voltage_offset = 0.0
+            temp_offset = 0.0
+        
+        target_temp = process_params.get('target_temperature', 25)
+        temperature = target_temp + rng.uniform(-2, 2, n) + temp_offset
+        voltage = np.round(nominal + voltage_offset + rng.uniform(-0.05, 0.05, n), 3)
+        
+        if charge_rate > 0:
+            current = np.round(rng.uniform(charge_rate * 0.8, charge_rate * 1.2, n), 2)
+        elif discharge_rate > 0:
+            current = np.round(rng.uniform(-discharge_rate * 1.2, -discharge_rate * 0.8, n), 2)
+        else:
+            current = np.round(rng.uniform(-5.0, 5.0, n), 2)
+    else:
+        voltage = np.round(nominal + rng.uniform(-0.1, 0.1, n), 3)
+        temperature = np.round(25 + rng.uniform(-2, 8, n), 1)
+        current = np.round(rng.uniform(-5.0, 5.0, n), 2)
+    
+    power = np.round(voltage * np.abs(current), 2)
+    capacity = np.round(rng.uniform(CAPACITY_LOWS[codes], CAPACITY_HIGHS[codes]), 2)
+    
+    health, stress_factor = cell_health(codes, voltage, current, temperature, process_params)
+    status_code = classify_status(codes, voltage, temperature, health)
+    
+    return {
+        "voltage": voltage,
+        "current": current,
+        "temperature": temperature,
+        "power": power,
+        "capacity": capacity,
+        # Independent draws carry no state of charge
+        "soc": np.full(n, np.nan),
+        "health": health,
+        "status": STATUS_LABELS[status_code],
+        "status_code": status_code,
+        "stress_factor": stress_factor
+    }
+
+def cell_health(type_codes, voltage, current, temperature, process_params=None):
+    """Return (health, stress_factor) arrays for readings of many cells, as in generate_cell_data"""
+    nominal = NOMINAL_VOLTAGES[np.asarray(type_codes, dtype=np.intp)]
+    voltage_health = 100 * (1 - np.abs(voltage - nominal) / nominal)
+    temp_health = 100 * np.maximum(0, 1 - np.maximum(0, temperature - 35) / 20)
+    
+    stress_factor = np.ones(len(nominal))
+    if process_params:
+        stress_factor = np.where(np.abs(current) > 3, stress_factor * 0.98, stress_factor)
+        stress_factor = np.where(temperature > 40, stress_factor * 0.95, stress_factor)
+    
+    health = np.round((voltage_health + temp_health) / 2 * stress_factor, 1)
+    return health, stress_factor
+
+def classify_status(type_codes, voltage, temperature, health):
+    """Apply the cell status rules to arrays of readings and return status codes"""
+    codes = np.asarray(type_codes, dtype=np.intp)
+    out_of_range = (voltage < MIN_VOLTAGES[codes]) | (voltage > MAX_VOLTAGES[codes])
+    return np.select(
+        [out_of_range | (temperature > 50), (temperature > 45) | (health < 75), health >= 90],
+        [STATUS_CRITICAL, STATUS_WARNING, STATUS_EXCELLENT],
+        default=STATUS_GOOD
+    ).astype(np.int8)
+
+class CellTable:
+    """Static per-cell attributes keyed by cell index; positions default to 1..n"""
+
+    __slots__ = ("cell_ids", "cell_types", "positions", "type_codes", "min_voltage", "max_voltage")
+
+    def __init__(self, cell_ids, cell_types, positions=None):
+        self.cell_ids = list(cell_ids)
+        self.cell_types = list(cell_types)
+        self.positions = (np.arange(1, len(self.cell_ids) + 1) if positions is None
+                          else np.asarray(positions, dtype=np.int64))
+        self.type_codes = cell_type_codes(self.cell_types)
+        self.min_voltage = MIN_VOLTAGES[self.type_codes]
+        self.max_voltage = MAX_VOLTAGES[self.type_codes]
+
+    def __len__(self):
+        return len(self.cell_ids)
+
+def pack_batch(batch):
+    """Pack the column arrays of one tick (or a samples x cells block) into SAMPLE_DTYPE records"""
+    codes = batch["status_code"]
+    records = np.empty(np.shape(codes), dtype=SAMPLE_DTYPE)
+    for name in SAMPLE_DTYPE.names:
+        records[name] = batch[name]
+    return records
+
+def tick_frame(cells, timestamp, records):
+    """Join one tick of records with the cell table into the DataFrame used by the dashboard"""
+    return pd.DataFrame({
+        "cell_id": cells.cell_ids,
+        "cell_type": cells.cell_types,
+        "position": cells.positions,
+        "voltage": records["voltage"],
+        "current": records["current"],
+        "temperature": records["temperature"],
+        "power": records["power"],
+        "capacity": records["capacity"],
+        "soc": records["soc"],
+        "health": records["health"],
+        "status": STATUS_LABELS[records["status_code"]],
+        "timestamp": pd.Timestamp(timestamp),
+        "min_voltage": cells.min_voltage,
+        "max_voltage": cells.max_voltage,
+        "stress_factor": records["stress_factor"]
+    })
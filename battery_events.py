@@ -0,0 +1,435 @@
+"""Event-driven simulation: every cell jumps from one threshold crossing to the next.
+
+Between two events a cell's current is either constant or, while a CV step holds the
+terminal voltage on one linear piece of the OCV curve, decays exponentially. Both have
+closed-form state of charge and temperature, so the time of the next event is solved
+for instead of found by stepping:
+
+    voltage limits     SOC at which OCV + I R reaches the limit (soc_at_voltage)
+    SOC bounds         0 and 1, the ends of the OCV curve
+    step ends          remaining step time, CC voltage limits and the CV cutoff current
+    pulse edges        the end of the on or off phase
+    temperature        TEMPERATURE_THRESHOLDS, the first-order thermal response solved
+                       for the crossing
+
+Each cell runs through its own events; cells are vectorized and only events are looped,
+so a cell resting or charging for hours costs one segment instead of a sample per
+interval. The trajectory segments form an EventTimeline, which evaluates samples at the
+sampling interval only when they are read. The readings are the noise-free trajectory:
+current and temperature noise belong to fixed-step sampling.
+"""
+import json
+
+import numpy as np
+
+from battery_engine import MAX_VOLTAGES, MIN_VOLTAGES, pack_batch
+from battery_history import HISTORY_METRICS
+from battery_model import (
+    OCV_SOC, OCV_TABLE, THERMAL_RESISTANCE, THERMAL_TIME_CONSTANT, cell_readings, next_direction,
+    open_circuit_voltage, soc_at_voltage
+)
+from battery_protocol import STEP_CC_CHARGE, STEP_CC_DISCHARGE, STEP_CV_HOLD, STEP_PULSE, ProtocolTable
+
+# Temperatures (°C) at which a cell's status changes: Warning above 45, Critical above 50
+TEMPERATURE_THRESHOLDS = (45.0, 50.0)
+# What ended a segment, as logged in EventTimeline.event_kinds; pulse edges and OCV
+# breakpoints only switch the closed form and are not logged
+EVENT_KINDS = ("voltage_limit", "step_end", "temperature")
+EVENT_VOLTAGE_LIMIT, EVENT_STEP_END, EVENT_TEMPERATURE = range(len(EVENT_KINDS))
+# Bisection steps locating a temperature crossing; 2^-50 of a segment is far below a nanosecond
+CROSSING_BISECTION_STEPS = 50
+# Relative margin by which a CV current must exceed its cap to count as capped, so a cell
+# that just tapered off the cap is not put back on it by rounding
+CV_CAP_TOLERANCE = 1e-9
+# Samples evaluated at a time by EventTimeline.iter_chunks
+TIMELINE_CHUNK_SAMPLES = 500
+# Per-cell fields of every trajectory segment
+SEGMENT_FIELDS = ("start", "soc", "temperature", "current", "decay", "step_index")
+
+def _thermal_forcing(current, decay, heating):
+    """Amplitude of the I²R term in the temperature response to a current decaying at `decay`"""
+    # The response has a resonance where the squared current decays at the thermal rate;
+    # a relative nudge of the denominator keeps it finite there
+    denominator = 1 - 2 * decay * THERMAL_TIME_CONSTANT
+    denominator = np.where(np.abs(denominator) < 1e-9, 1e-9, denominator)
+    return heating * current ** 2 / denominator
+
+def segment_state(soc, temperature, current, decay, seconds, capacity_ah, heating, ambient):
+    """Return (soc, temperature, current) `seconds` into segments starting from the given state.
+
+    The current is I(t) = I e^(-decay t); the charge it moves is integrated exactly, and
+    temperature solves the first-order response to ambient plus I(t)² heating.
+    """
+    fade = np.exp(-decay * seconds)
+    moved = np.where(decay > 0, -np.expm1(-decay * seconds) / np.where(decay > 0, decay, 1.0), seconds)
+    soc = np.clip(soc + current * moved / (3600 * capacity_ah), 0.0, 1.0)
+    forcing = _thermal_forcing(current, decay, heating)
+    temperature = (ambient + forcing * fade ** 2
+                   + (temperature - ambient - forcing) * np.exp(-seconds / THERMAL_TIME_CONSTANT))
+    return soc, temperature, current * fade
+
+def temperature_crossing(temperature, current, decay, heating, ambient, horizon, threshold):
+    """Return the seconds until each cell's temperature crosses `threshold`, or inf within `horizon`.
+
+    The response is a sum of two exponentials, so it turns at most once; each monotonic
+    side of the turn is checked for a sign change and bisected. The returned time is just
+    past the crossing, so the next segment starts on the far side of the threshold.
+    """
+    forcing = _thermal_forcing(current, decay, heating)
+    free = temperature - ambient - forcing
+
+    def excess(seconds):
+        fade = np.exp(-decay * seconds)
+        return ambient + forcing * fade ** 2 + free * np.exp(-seconds / THERMAL_TIME_CONSTANT) - threshold
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        turn = (np.log(-free / (2 * decay * forcing * THERMAL_TIME_CONSTANT))
+                / (1 / THERMAL_TIME_CONSTANT - 2 * decay))
+    turn = np.where(np.isfinite(turn) & (turn > 0) & (turn < horizon), turn, horizon)
+    start, middle, end = np.sign(temperature - threshold), np.sign(excess(turn)), np.sign(excess(horizon))
+    rising_first = start * middle < 0
+    crossed = rising_first | (middle * end < 0)
+    if not crossed.any():
+        return np.full(len(temperature), np.inf)
+
+    low = np.where(rising_first, 0.0, turn)
+    high = np.where(rising_first, turn, horizon)
+    side = np.where(rising_first, start, middle)
+    for _ in range(CROSSING_BISECTION_STEPS):
+        middle_time = (low + high) / 2
+        before = np.sign(excess(middle_time)) == side
+        low, high = np.where(before, middle_time, low), np.where(before, high, middle_time)
+    return np.where(crossed, high, np.inf)
+
+def _rate_segments(state, model, charge_rate, discharge_rate, interval):
+    """Return (current, seconds to the voltage limit, SOC there, charging, held) of every cell under constant rates.
+
+    The SOC is NaN where the segment does not end exactly at the limit.
+    """
+    charging, held = next_direction(
+        state["charging"], state["at_max"], state["at_min"], charge_rate, discharge_rate
+    )
+    current = np.where(held, 0.0, np.where(charging, charge_rate, -discharge_rate))
+    limit = np.where(current > 0, model.max_voltage, model.min_voltage)
+    target = soc_at_voltage(model.type_codes, limit - current * model.resistance)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        to_limit = np.where(current != 0, (target - state["soc"]) * 3600 * model.capacity_ah / current, np.inf)
+    # A cell that turns around at one limit straight into the other is kept going for one
+    # sampling interval, the soonest fixed-step sampling could notice it
+    target = np.where(to_limit > 0, target, np.nan)
+    to_limit = np.where(to_limit > 0, to_limit, interval)
+    return current, to_limit, target, charging, held
+
+def _protocol_segments(state, model, table):
+    """Return the current, decay rate, seconds to the step end and to the next switch of every cell.
+
+    A switch keeps the cell in its step but changes its closed form: CV holds split at
+    the OCV curve's breakpoints, where the decay rate changes, and at the SOC where a
+    capped current starts to taper; pulses split at every edge. Also returned are the
+    SOC each cell lands on at its step end and at its switch, NaN where that event is
+    not defined by a SOC.
+    """
+    index, soc = state["step_index"], state["soc"]
+    codes, resistance, capacity = model.type_codes, model.resistance, model.capacity_ah
+    kind, setpoint = table.kind[index], table.current[index]
+    limit = table.voltage[index]
+    limit = np.where(np.isnan(limit), np.where(kind == STEP_CC_DISCHARGE, model.min_voltage, model.max_voltage), limit)
+    ocv = open_circuit_voltage(codes, soc)
+    cc = (kind == STEP_CC_CHARGE) | (kind == STEP_CC_DISCHARGE)
+    cv = kind == STEP_CV_HOLD
+    pulse = kind == STEP_PULSE
+
+    # CC steps end at the SOC whose terminal voltage reaches the limit
+    cc_current = np.where(kind == STEP_CC_DISCHARGE, -setpoint, setpoint)
+    cc_target = soc_at_voltage(codes, limit - np.nan_to_num(cc_current) * resistance)
+
+    # CV: on the OCV piece OCV = a + b SOC the held current decays as e^(-t b / (3600 C R))
+    upper = np.clip(np.searchsorted(OCV_SOC, soc, side="right"), 1, len(OCV_SOC) - 1)
+    slope = (OCV_TABLE[codes, upper] - OCV_TABLE[codes, upper - 1]) / (OCV_SOC[upper] - OCV_SOC[upper - 1])
+    cap = np.where(np.isnan(setpoint), np.inf, setpoint)
+    held_current = np.where(soc >= 1.0, 0.0, np.maximum((limit - ocv) / resistance, 0.0))
+    capped = cv & (held_current > cap * (1 + CV_CAP_TOLERANCE))
+    tapering = cv & ~capped & (held_current > 0)
+
+    pulse_on = state["step_elapsed"] % table.period[index] < table.on_seconds[index]
+    current = np.select(
+        [cc, pulse, capped, cv],
+        [cc_current, np.where(pulse_on, setpoint, 0.0), cap, held_current],
+        default=0.0
+    )
+    decay = np.where(tapering, slope / (3600 * capacity * resistance), 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        to_target = np.where(cc, (cc_target - soc) * 3600 * capacity / current, np.inf)
+        cutoff = table.cutoff_current[index]
+        to_cutoff = np.where(
+            cv & ~capped & ~np.isnan(cutoff),
+            np.where(current > cutoff, np.log(current / cutoff) / decay, 0.0),
+            np.inf
+        )
+        taper_soc = soc_at_voltage(codes, limit - cap * resistance)
+        to_taper = np.where(capped, (taper_soc - soc) * 3600 * capacity / cap, np.inf)
+        rise = (OCV_TABLE[codes, upper] - ocv) / (limit - ocv)
+        to_breakpoint = np.where(tapering & (rise < 1), -np.log1p(-rise) / decay, np.inf)
+        phase = state["step_elapsed"] % table.period[index]
+        to_edge = np.where(pulse, np.where(pulse_on, table.on_seconds[index] - phase, table.period[index] - phase),
+                           np.inf)
+    to_target = np.maximum(to_target, 0.0)
+    remaining = table.duration[index] - state["step_elapsed"]
+    to_step_end = np.minimum(remaining, np.minimum(to_target, to_cutoff))
+    end_soc = np.where(cc & (to_target <= remaining), np.clip(cc_target, 0.0, 1.0), np.nan)
+    to_switch = np.minimum(np.maximum(to_taper, 0.0), np.minimum(to_breakpoint, to_edge))
+    switch_soc = np.where(capped, taper_soc, np.where(np.isfinite(to_breakpoint), OCV_SOC[upper], np.nan))
+    return current, decay, to_step_end, end_soc, to_switch, switch_soc
+
+def require_independent_cells(process_params):
+    """Raise ValueError when the process parameters couple neighbouring cells, which events cannot follow"""
+    if int(process_params.get('thermal_columns', 0) or 0) > 0:
+        raise ValueError("Event-driven simulation needs independent cells: turn thermal coupling (thermal_columns) off")
+
+def simulate_events(model, start, interval, samples, process_params, progress=None):
+    """Advance `model` through `samples` sampling intervals event by event and return the EventTimeline.
+
+    The timeline's samples are timestamped start + k interval for k = 1..samples, like a
+    fixed-step run. The model ends in the state the last event left it in (its noise
+    stream is untouched). A cell held at a limit under constant rates stays there, where
+    fixed-step sampling lets it creep on as its IR drop vanishes. `progress`, when
+    given, is called with the fraction of the run every cell has reached.
+    """
+    require_independent_cells(process_params)
+    duration = interval * samples
+    table = model.protocol_table(process_params)
+    charge_rate = process_params.get('charge_rate', 0)
+    discharge_rate = process_params.get('discharge_rate', 0)
+    ambient = process_params.get('target_temperature', 25)
+    heating = model.resistance * THERMAL_RESISTANCE
+    n = len(model)
+
+    state = model.state()
+    elapsed = np.zeros(n)
+    # Segments of the cells still running in every pass, with the cell each belongs to
+    segment_cells = []
+    segments = {name: [] for name in SEGMENT_FIELDS}
+    # (times, cells, kinds) of the events of every pass
+    events = [(np.empty(0), np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp))]
+
+    def log(mask, kind):
+        events.append((elapsed[mask], np.flatnonzero(mask), np.full(mask.sum(), kind)))
+
+    while True:
+        active = elapsed < duration
+        if not active.any():
+            break
+
+        if table is None:
+            current, to_end, end_soc, charging, held = _rate_segments(
+                state, model, charge_rate, discharge_rate, interval
+            )
+            decay, to_switch, switch_soc = np.zeros(n), np.full(n, np.inf), np.full(n, np.nan)
+        else:
+            current, decay, to_end, end_soc, to_switch, switch_soc = _protocol_segments(state, model, table)
+        horizon = np.minimum(np.minimum(to_end, to_switch), duration - elapsed)
+        to_crossing = np.full(n, np.inf)
+        for threshold in TEMPERATURE_THRESHOLDS:
+            to_crossing = np.minimum(to_crossing, temperature_crossing(
+                state["temperature"], current, decay, heating, ambient, horizon, threshold
+            ))
+        seconds = np.where(active, np.minimum(horizon, to_crossing), 0.0)
+
+        segment_cells.append(np.flatnonzero(active))
+        for name, values in (("start", elapsed), ("soc", state["soc"]), ("temperature", state["temperature"]),
+                             ("current", current), ("decay", decay), ("step_index", state["step_index"])):
+            segments[name].append(values[active])
+
+        soc, temperature, end_current = segment_state(
+            state["soc"], state["temperature"], current, decay, seconds, model.capacity_ah, heating, ambient
+        )
+        crossed = active & (to_crossing <= seconds)
+        ended = active & ~crossed & (to_end <= seconds)
+        switched = active & ~crossed & ~ended & (to_switch <= seconds)
+        elapsed = np.where(active, elapsed + seconds, elapsed)
+        # Land exactly on the SOC an event is defined by rather than a rounding error short
+        # of it, which would otherwise leave an ever shorter segment to go
+        soc = np.where(ended & ~np.isnan(end_soc), end_soc, soc)
+        state["soc"] = np.where(switched & ~np.isnan(switch_soc), switch_soc, soc)
+        if table is None:
+            state["charging"] = charging
+            state["at_max"] = np.where(ended, current > 0, state["at_max"] & held)
+            state["at_min"] = np.where(ended, current < 0, state["at_min"] & held)
+            log(ended, EVENT_VOLTAGE_LIMIT)
+        else:
+            # Snap step time to microseconds so pulse edges do not leave slivers of a phase behind
+            step_elapsed = np.round(state["step_elapsed"] + seconds, 6)
+            state["step_index"], state["cycle"] = table.advance(state["step_index"], state["cycle"], ended)
+            state["step_elapsed"] = np.where(ended, 0.0, step_elapsed)
+            log(ended, EVENT_STEP_END)
+        log(crossed, EVENT_TEMPERATURE)
+        state["temperature"] = temperature
+        state["current"] = np.where(active, end_current, state["current"])
+        if table is not None:
+            state["charging"] = np.where(state["current"] != 0, state["current"] > 0, state["charging"])
+        if progress is not None:
+            progress(float(elapsed.min() / duration) if duration > 0 else 1.0)
+
+    model.restore(state)
+    times, cells, kinds = (np.concatenate(values) for values in zip(*events))
+    order = np.argsort(times, kind="stable")
+    # Passes are in time order, so a stable sort by cell leaves every cell's segments in time order
+    segment_cells = np.concatenate(segment_cells) if segment_cells else np.empty(0, dtype=np.intp)
+    by_cell = np.argsort(segment_cells, kind="stable")
+    return EventTimeline(
+        start, interval, samples, model.type_codes, model.capacity_ah, model.resistance, process_params,
+        {name: np.concatenate(values)[by_cell] if values else np.empty(0) for name, values in segments.items()},
+        segment_cells[by_cell], times[order], cells[order], kinds[order]
+    )
+
+class EventTimeline:
+    """Closed-form trajectory segments of one event-driven run, evaluated at any sample on demand.
+
+    Segments are stored ragged: flat arrays of every cell's segments, cell by cell and in
+    time order within a cell, with `segment_cells` naming the cell of each. A cell that
+    reaches the end early stops adding segments, so a bench does not pay for the event
+    count of its busiest cell. Samples are read like a
+    HistoryStore (query, iter_chunks) or a Replay (seek, time_range) and computed from
+    the segment each cell is in at that moment.
+    """
+
+    def __init__(self, start, interval, samples, type_codes, capacity_ah, resistance, process_params, segments,
+                 segment_cells, event_times, event_cells, event_kinds):
+        self.start = np.datetime64(start, "ns")
+        self.interval = float(interval)
+        self.samples = int(samples)
+        self.type_codes = np.asarray(type_codes, dtype=np.intp)
+        self.capacity_ah = np.asarray(capacity_ah, dtype=np.float64)
+        self.resistance = np.asarray(resistance, dtype=np.float64)
+        self.min_voltage = MIN_VOLTAGES[self.type_codes]
+        self.max_voltage = MAX_VOLTAGES[self.type_codes]
+        self.process_params = process_params
+        self.segments = segments
+        self.segment_cells = np.asarray(segment_cells, dtype=np.intp)
+        self.event_times = event_times
+        self.event_cells = event_cells
+        self.event_kinds = event_kinds
+
+        protocol = process_params.get('protocol')
+        self._labels = ProtocolTable(protocol).labels if protocol else None
+        self._interval_ns = np.timedelta64(round(self.interval * 1e9), "ns")
+        # Segment starts as one sorted key per segment, offset by its cell, so a single
+        # searchsorted finds the segment of every cell at every sample
+        self._span = np.ceil(self.interval * self.samples) + 2
+        self._keys = self.segment_cells * self._span + np.minimum(segments["start"], self._span - 1)
+
+    def __len__(self):
+        return self.samples
+
+    @property
+    def num_segments(self):
+        return len(self.segments["start"])
+
+    def timestamps(self, first=0, stop=None):
+        """Return the timestamps of samples first..stop-1 (sample k lies k + 1 intervals after start)"""
+        stop = self.samples if stop is None else stop
+        return self.start + self._interval_ns * np.arange(first + 1, stop + 1)
+
+    def time_range(self):
+        """Return the first and last sample timestamps as datetime64[ns], or None for an empty run"""
+        if not self.samples:
+            return None
+        return self.timestamps(0, 1)[0], self.timestamps(self.samples - 1)[0]
+
+    def _segment_index(self, seconds):
+        """Flat index of the segment every cell is in at each of `seconds` (samples x cells)"""
+        n = len(self.type_codes)
+        keys = np.arange(n) * self._span + np.asarray(seconds, dtype=np.float64)[:, None]
+        return np.searchsorted(self._keys, keys, side="right") - 1
+
+    def evaluate(self, seconds):
+        """Return readings like CellModel.iter_blocks at `seconds` after the run start (samples x cells).
+
+        While a protocol runs, "step_index" holds every cell's protocol step.
+        """
+        index = self._segment_index(seconds)
+        segment = {name: values[index] for name, values in self.segments.items()}
+        ambient = self.process_params.get('target_temperature', 25)
+        soc, temperature, current = segment_state(
+            segment["soc"], segment["temperature"], segment["current"], segment["decay"],
+            np.asarray(seconds, dtype=np.float64)[:, None] - segment["start"], self.capacity_ah,
+            self.resistance * THERMAL_RESISTANCE, ambient
+        )
+        voltage = open_circuit_voltage(self.type_codes, soc) + current * self.resistance
+        readings = cell_readings(
+            self.type_codes, self.capacity_ah, np.clip(voltage, self.min_voltage, self.max_voltage),
+            current, temperature, self.process_params
+        )
+        readings["soc"] = soc
+        if self._labels is not None:
+            readings["step_index"] = segment["step_index"].astype(np.intp)
+        return readings
+
+    def sample_block(self, first, stop):
+        """Return (timestamps, readings) of samples first..stop-1"""
+        return self.timestamps(first, stop), self.evaluate(self.interval * np.arange(first + 1, stop + 1))
+
+    def _sample_range(self, start, end):
+        """Return the (first, stop) sample indices of the samples within [start, end]"""
+        timestamps = self.timestamps()
+        first = 0 if start is None else int(np.searchsorted(timestamps, np.datetime64(start, "ns"), side="left"))
+        stop = self.samples if end is None else int(np.searchsorted(timestamps, np.datetime64(end, "ns"), side="right"))
+        return first, max(first, stop)
+
+    def iter_chunks(self, metrics=HISTORY_METRICS, chunk_samples=TIMELINE_CHUNK_SAMPLES, start=None, end=None):
+        """Yield (timestamps, {metric: samples x cells}) for samples within [start, end], evaluated chunk by chunk"""
+        first, stop = self._sample_range(start, end)
+        for chunk_first in range(first, stop, chunk_samples):
+            timestamps, readings = self.sample_block(chunk_first, min(chunk_first + chunk_samples, stop))
+            records = pack_batch(readings)
+            yield timestamps, {name: records[name] for name in metrics}
+
+    def query(self, start=None, end=None, metrics=HISTORY_METRICS):
+        """Return (timestamps, {metric: samples x cells}) for samples within [start, end], like HistoryStore.query"""
+        first, stop = self._sample_range(start, end)
+        if stop <= first:
+            return self.timestamps(0, 0), {name: np.empty((0, len(self.type_codes))) for name in metrics}
+        timestamps, readings = self.sample_block(first, stop)
+        records = pack_batch(readings)
+        return timestamps, {name: records[name] for name in metrics}
+
+    def seek(self, timestamp):
+        """Return (timestamp, readings) of the last sample at or before `timestamp`, like Replay.seek"""
+        if not self.samples:
+            return None
+        offset = (np.datetime64(timestamp, "ns") - self.start) / self._interval_ns
+        sample = int(np.clip(np.floor(offset) - 1, 0, self.samples - 1))
+        timestamps, readings = self.sample_block(sample, sample + 1)
+        readings = {name: values[0] for name, values in readings.items()}
+        if self._labels is not None:
+            readings["protocol_step"] = self._labels[readings.pop("step_index")]
+        return timestamps[0], readings
+
+    def save(self, path):
+        """Write the timeline to an .npz file"""
+        np.savez_compressed(
+            path, start=self.start, interval=self.interval, samples=self.samples, type_codes=self.type_codes,
+            capacity_ah=self.capacity_ah, resistance=self.resistance,
+            process_params=np.array(json.dumps(self.process_params)),
+            event_times=self.event_times, event_cells=self.event_cells, event_kinds=self.event_kinds,
+            segment_cells=self.segment_cells, **{f"segment_{name}": values for name, values in self.segments.items()}
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Read a timeline written by save()"""
+        with np.load(path) as data:
+            segments = {name: data[f"segment_{name}"] for name in SEGMENT_FIELDS}
+            if "segment_cells" in data:
+                segment_cells = data["segment_cells"]
+            else:
+                # Timelines saved as (cells x segments) arrays padded with segments starting at infinity
+                used = np.isfinite(segments["start"])
+                segment_cells = np.nonzero(used)[0]
+                segments = {name: values[used] for name, values in segments.items()}
+            return cls(
+                data["start"], float(data["interval"]), int(data["samples"]), data["type_codes"],
+                data["capacity_ah"], data["resistance"], json.loads(str(data["process_params"])),
+                segments, segment_cells, data["event_times"], data["event_cells"], data["event_kinds"]
+            )
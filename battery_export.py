@@ -0,0 +1,224 @@
+"""Export of current and historical battery cell data"""
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from battery_engine import CELL_CONFIGS, CELL_TYPES, STATUS_LABELS
+from battery_history import HISTORY_METRICS
+
+# History columns read for historical exports
+EXPORT_COLUMNS = HISTORY_METRICS + ("status_code",)
+# Samples per chunk when streaming historical exports
+EXPORT_CHUNK_SAMPLES = 500
+# Rows (one per cell per sample) in each part of a historical export. Streamlit builds
+# every download in memory, so this bounds the memory one download can take
+EXPORT_PART_ROWS = 1_000_000
+# Seconds after which a leftover export file (e.g. from an interrupted download) is pruned
+EXPORT_MAX_AGE = 3600
+
+# Export formats: file extension and MIME type
+EXPORT_FORMATS = {
+    "CSV": (".csv", "text/csv"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+    "Feather": (".feather", "application/octet-stream"),
+    "Arrow IPC": (".arrow", "application/vnd.apache.arrow.file")
+}
+
+# Typed schema of binary exports: int64 epoch timestamps, categorical labels, float32 readings
+EXPORT_SCHEMA = pa.schema(
+    [("timestamp", pa.int64()),
+     ("cell_id", pa.dictionary(pa.int32(), pa.string())),
+     ("cell_type", pa.dictionary(pa.int8(), pa.string()))]
+    + [(name, pa.float32()) for name in HISTORY_METRICS]
+    + [("status", pa.dictionary(pa.int8(), pa.string())),
+       ("min_voltage", pa.float32()),
+       ("max_voltage", pa.float32())],
+    metadata={"timestamp": "nanoseconds since the epoch"}
+)
+
+def export_to_csv(data, filename_prefix="battery_data"):
+    """Export the current tick frame (see tick_frame) to CSV format"""
+    if data is None or data.empty:
+        return None, None
+
+    df = data.copy()
+
+    # Add timestamp formatting
+    df['formatted_timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    # Reorder columns for better readability
+    columns_order = [
+        'formatted_timestamp', 'cell_id', 'cell_type', 'voltage', 'current',
+        'temperature', 'power', 'capacity', 'soc', 'health', 'status',
+        'min_voltage', 'max_voltage', 'stress_factor'
+    ]
+    df = df[columns_order]
+
+    # Generate filename with timestamp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{filename_prefix}_{timestamp}.csv"
+
+    return df, filename
+
+def historical_frame(timestamps, series, cell_ids, cell_types):
+    """Flatten (samples x cells) history arrays into one row per cell per sample"""
+    num_samples, num_cells = len(timestamps), len(cell_ids)
+    record_timestamps = np.repeat(timestamps, num_cells)
+    # Format each sample's timestamp once instead of once per row
+    formatted = np.repeat(np.char.replace(np.datetime_as_string(timestamps, unit="s"), "T", " "), num_cells)
+
+    frame = {
+        "timestamp": record_timestamps,
+        "cell_id": np.tile(np.array(cell_ids, dtype=object), num_samples),
+        "cell_type": np.tile(np.array(cell_types, dtype=object), num_samples),
+    }
+    for name in HISTORY_METRICS:
+        frame[name] = series[name].ravel()
+    frame["status"] = STATUS_LABELS[series["status_code"].ravel()]
+    frame["min_voltage"] = np.tile([CELL_CONFIGS[t]["min_voltage"] for t in cell_types], num_samples)
+    frame["max_voltage"] = np.tile([CELL_CONFIGS[t]["max_voltage"] for t in cell_types], num_samples)
+    frame["record_timestamp"] = record_timestamps
+    frame["formatted_timestamp"] = formatted
+    frame["formatted_record_timestamp"] = formatted
+    return pd.DataFrame(frame)
+
+def export_historical_to_csv(history, filename_prefix="battery_historical"):
+    """Export historical data to CSV format"""
+    if not history:
+        return None, None
+
+    timestamps, series = history.snapshot(EXPORT_COLUMNS)
+    df = historical_frame(timestamps, series, history.cell_ids, history.cell_types)
+
+    # Generate filename with timestamp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{filename_prefix}_{timestamp}.csv"
+
+    return df, filename
+
+def iter_historical_csv(chunks, cell_ids, cell_types):
+    """Yield historical CSV text chunk by chunk, header first.
+
+    `chunks` yields (timestamps, {column: samples x cells}) as produced by the history
+    buffer or store, so memory use is bounded by one chunk whatever the test length.
+    """
+    header = True
+    for timestamps, series in chunks:
+        if len(timestamps) == 0:
+            continue
+        yield historical_frame(timestamps, series, cell_ids, cell_types).to_csv(index=False, header=header)
+        header = False
+
+def write_historical_csv(path, chunks, cell_ids, cell_types):
+    """Stream historical CSV chunks to a file and return its path"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial_path = path + ".part"
+    with open(partial_path, "w", newline="") as f:
+        for text in iter_historical_csv(chunks, cell_ids, cell_types):
+            f.write(text)
+    os.replace(partial_path, path)
+    return path
+
+def export_parts(start, end, num_cells, sampling_interval, part_rows=EXPORT_PART_ROWS):
+    """Split a run from `start` to `end` into consecutive [start, end) parts of at most part_rows rows.
+
+    The last part ends at `end` itself, inclusive.
+    """
+    span = timedelta(seconds=max(part_rows // max(num_cells, 1), 1) * sampling_interval)
+    parts = []
+    part_start = start
+    while part_start + span < end:
+        parts.append((part_start, part_start + span))
+        part_start += span
+    parts.append((part_start, end))
+    return parts
+
+def prune_exports(directory, max_age=EXPORT_MAX_AGE):
+    """Delete the files and directories in `directory` last modified more than `max_age` seconds ago"""
+    if not os.path.isdir(directory):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) >= cutoff:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+        except OSError:
+            # Removed by another session in the meantime
+            continue
+
+def historical_arrow_table(timestamps, series, cell_ids, cell_types):
+    """Build a typed Arrow table with one row per cell per sample.
+
+    Categorical columns are dictionary-encoded straight from cell and status codes,
+    so no per-row strings are created.
+    """
+    num_samples, num_cells = len(timestamps), len(cell_ids)
+    cell_indices = np.tile(np.arange(num_cells, dtype=np.int32), num_samples)
+    type_codes = np.array([CELL_TYPES.index(t) for t in cell_types], dtype=np.int8)
+    row_type_codes = np.tile(type_codes, num_samples)
+
+    columns = [
+        pa.array(np.repeat(np.asarray(timestamps, dtype="datetime64[ns]").astype(np.int64), num_cells)),
+        pa.DictionaryArray.from_arrays(cell_indices, pa.array(list(cell_ids), pa.string())),
+        pa.DictionaryArray.from_arrays(row_type_codes, pa.array(CELL_TYPES, pa.string()))
+    ]
+    columns += [pa.array(series[name].ravel().astype(np.float32)) for name in HISTORY_METRICS]
+    columns += [
+        pa.DictionaryArray.from_arrays(
+            series["status_code"].ravel().astype(np.int8), pa.array(list(STATUS_LABELS), pa.string())
+        ),
+        pa.array(np.array([CELL_CONFIGS[t]["min_voltage"] for t in CELL_TYPES], dtype=np.float32)[row_type_codes]),
+        pa.array(np.array([CELL_CONFIGS[t]["max_voltage"] for t in CELL_TYPES], dtype=np.float32)[row_type_codes])
+    ]
+    return pa.Table.from_arrays(columns, schema=EXPORT_SCHEMA)
+
+def _open_arrow_writer(sink, export_format):
+    """Open a table writer for a binary export format"""
+    if export_format == "Parquet":
+        return pq.ParquetWriter(sink, EXPORT_SCHEMA, compression="zstd")
+    if export_format == "Feather":
+        # Feather V2 is the Arrow IPC file format with compressed buffers
+        return pa.ipc.new_file(sink, EXPORT_SCHEMA, options=pa.ipc.IpcWriteOptions(compression="lz4"))
+    if export_format == "Arrow IPC":
+        return pa.ipc.new_file(sink, EXPORT_SCHEMA)
+    raise ValueError(f"Unknown export format: {export_format}")
+
+def write_historical_export(path, chunks, cell_ids, cell_types, export_format="CSV"):
+    """Stream historical chunks to a file in the given export format and return its path"""
+    if export_format == "CSV":
+        return write_historical_csv(path, chunks, cell_ids, cell_types)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial_path = path + ".part"
+    writer = _open_arrow_writer(partial_path, export_format)
+    try:
+        for timestamps, series in chunks:
+            if len(timestamps):
+                writer.write_table(historical_arrow_table(timestamps, series, cell_ids, cell_types))
+    finally:
+        writer.close()
+    os.replace(partial_path, path)
+    return path
+
+def export_current_binary(timestamp, batch, cell_ids, cell_types, export_format):
+    """Export the latest sample as bytes in a binary export format"""
+    sink = pa.BufferOutputStream()
+    writer = _open_arrow_writer(sink, export_format)
+    writer.write_table(historical_arrow_table(
+        np.array([np.datetime64(timestamp, "ns")]),
+        {name: np.asarray(batch[name])[None, :] for name in EXPORT_COLUMNS},
+        cell_ids, cell_types
+    ))
+    writer.close()
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,85 @@
+"""Fleet-wide aggregation of many bench/group acquisition workers"""
+import numpy as np
+import pandas as pd
+
+from battery_engine import STATUS_CRITICAL, STATUS_LABELS
+
+# Temperature above which a cell raises a safety alert (°C)
+ALERT_TEMPERATURE = 50
+# Additive columns of a summary row; averages are derived from them after aggregation
+SUMMARY_COUNTS = ("groups", "running", "cells", "excellent", "good", "warning", "critical", "alerts")
+SUMMARY_SUMS = ("health_sum", "voltage_sum", "total_power")
+
+def alert_mask(voltage, temperature, critical, safety_voltage_limit):
+    """Return which cells raise a safety alert: over-voltage, over-temperature or critical status"""
+    return (voltage > safety_voltage_limit) | (temperature > ALERT_TEMPERATURE) | critical
+
+def next_alert_time(worker, after, safety_voltage_limit):
+    """Return the timestamp of the first sample of a worker's run after `after` with a safety alert, or None"""
+    after = np.datetime64(after, "ns")
+    for timestamps, series in worker.iter_history_chunks(["voltage", "temperature", "status_code"]):
+        alerts = alert_mask(
+            series["voltage"], series["temperature"], series["status_code"] == STATUS_CRITICAL, safety_voltage_limit
+        ).any(axis=1) & (timestamps > after)
+        if alerts.any():
+            return timestamps[alerts.argmax()]
+    return None
+
+def worker_state(worker):
+    """Return a short label for the acquisition state of a worker"""
+    if worker.is_completed:
+        return "Completed"
+    if worker.is_monitoring:
+        return "Running"
+    if worker.latest_records is not None:
+        return "Paused"
+    return "Idle"
+
+def summarize_records(records, safety_voltage_limit):
+    """Reduce one tick of SAMPLE_DTYPE records to additive summary counts and sums"""
+    counts = np.bincount(records["status_code"], minlength=len(STATUS_LABELS))
+    alerts = alert_mask(
+        records["voltage"], records["temperature"], records["status_code"] == STATUS_CRITICAL, safety_voltage_limit
+    )
+    return {
+        "cells": len(records),
+        **{label.lower(): int(count) for label, count in zip(STATUS_LABELS, counts)},
+        "alerts": int(alerts.sum()),
+        "health_sum": float(records["health"].sum(dtype=np.float64)),
+        "voltage_sum": float(records["voltage"].sum(dtype=np.float64)),
+        "total_power": float(records["power"].sum(dtype=np.float64))
+    }
+
+def add_averages(summary):
+    """Add avg_health and avg_voltage columns to a frame of summary rows"""
+    cells = summary["cells"].where(summary["cells"] > 0)
+    summary["avg_health"] = summary["health_sum"] / cells
+    summary["avg_voltage"] = summary["voltage_sum"] / cells
+    return summary
+
+def group_summary(workers, safety_voltage_limit):
+    """Return one summary row per bench/group from the latest sample of each worker.
+
+    Only the compact per-tick records are read; no per-cell frames are built.
+    """
+    rows = []
+    for worker in workers:
+        timestamp, records = worker.snapshot()
+        row = {"bench": worker.bench_name, "group": worker.group_num, "state": worker_state(worker),
+               "last_sample": timestamp, "groups": 1, "running": int(worker.is_monitoring)}
+        if records is None:
+            row.update({name: 0 for name in SUMMARY_COUNTS[2:] + SUMMARY_SUMS})
+        else:
+            row.update(summarize_records(records, safety_voltage_limit))
+        rows.append(row)
+    columns = ["bench", "group", "state", "last_sample", *SUMMARY_COUNTS, *SUMMARY_SUMS]
+    return add_averages(pd.DataFrame(rows, columns=columns))
+
+def rollup(groups, by=None):
+    """Aggregate group summary rows per `by` column (e.g. "bench"), or into one fleet row when by is None"""
+    columns = list(SUMMARY_COUNTS + SUMMARY_SUMS)
+    if by is None:
+        totals = groups[columns].sum().to_frame().T
+    else:
+        totals = groups.groupby(by, sort=False)[columns].sum().reset_index()
+    return add_averages(totals)
@@ -0,0 +1,163 @@
+"""Columnar history storage for battery cell samples"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from battery_engine import SAMPLE_DTYPE, STATUS_LABELS
+
+# Per-cell measurements kept for every sample
+HISTORY_METRICS = ("voltage", "current", "temperature", "power", "capacity", "soc", "health", "stress_factor")
+
+class RunningStats:
+    """Per-column count, mean, variance, minimum and maximum of (samples x columns) chunks.
+
+    Chunks are merged with the parallel variance update (Chan et al.), so a whole test
+    reduces one chunk at a time without losing precision on long runs.
+    """
+
+    def __init__(self, num_columns):
+        self.count = 0
+        self.mean = np.zeros(num_columns)
+        self._m2 = np.zeros(num_columns)
+        self.min = np.full(num_columns, np.inf)
+        self.max = np.full(num_columns, -np.inf)
+
+    def add(self, values):
+        """Merge a (samples x columns) chunk"""
+        values = np.asarray(values, dtype=np.float64)
+        count = len(values)
+        if not count:
+            return
+        mean = values.mean(axis=0)
+        m2 = ((values - mean) ** 2).sum(axis=0)
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self._m2 = self._m2 + m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+
+    def std(self, ddof=1):
+        """Per-column standard deviation"""
+        return np.sqrt(self._m2 / max(self.count - ddof, 1))
+
+    def overall(self):
+        """Return (mean, std with ddof=1) over every value of every column"""
+        total = self.count * len(self.mean)
+        mean = self.mean.mean()
+        m2 = self._m2.sum() + (self.count * (self.mean - mean) ** 2).sum()
+        return mean, np.sqrt(m2 / max(total - 1, 1))
+
+class HistoryBuffer:
+    """Fixed-capacity ring buffer of samples stored as (samples x cells) arrays per metric.
+
+    Every sample is written twice, at slot i and slot i + capacity, so the most
+    recent N samples are always one contiguous slice and windows are returned as
+    views instead of copies. Appending is O(1) regardless of how full the buffer is.
+
+    Views are only stable while no new sample is appended; readers that share the
+    buffer with a writer thread should hold `lock` while using them.
+    """
+
+    def __init__(self, cell_ids, cell_types, capacity=1000):
+        self.cell_ids = list(cell_ids)
+        self.cell_types = list(cell_types)
+        self.capacity = capacity
+        self.lock = threading.RLock()
+        num_cells = len(self.cell_ids)
+
+        self._timestamps = np.zeros(2 * capacity, dtype="datetime64[ns]")
+        # One array per SAMPLE_DTYPE field, kept at the field's compact dtype
+        self._metrics = {name: np.zeros((2 * capacity, num_cells), dtype=SAMPLE_DTYPE[name])
+                         for name in SAMPLE_DTYPE.names}
+        self._head = 0
+        self._size = 0
+        self.total_samples = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp, batch):
+        """Store one tick of SAMPLE_DTYPE records (see pack_batch)"""
+        with self.lock:
+            for slot in (self._head, self._head + self.capacity):
+                self._timestamps[slot] = np.datetime64(timestamp, "ns")
+                for name, values in self._metrics.items():
+                    values[slot] = batch[name]
+
+            self._head = (self._head + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            self.total_samples += 1
+
+    def extend(self, timestamps, records):
+        """Store a block of samples given as timestamps and (samples x cells) SAMPLE_DTYPE records"""
+        timestamps = np.asarray(timestamps, dtype="datetime64[ns]")
+        count = len(timestamps)
+        # Only the last `capacity` samples of a long block survive in the ring
+        kept = slice(max(0, count - self.capacity), count)
+        with self.lock:
+            slots = (self._head + np.arange(count)[kept]) % self.capacity
+            for offset in (0, self.capacity):
+                self._timestamps[slots + offset] = timestamps[kept]
+                for name, values in self._metrics.items():
+                    values[slots + offset] = records[name][kept]
+
+            self._head = (self._head + count) % self.capacity
+            self._size = min(self._size + count, self.capacity)
+            self.total_samples += count
+
+    def clear(self):
+        """Drop all samples while keeping the preallocated arrays"""
+        with self.lock:
+            self._head = 0
+            self._size = 0
+            self.total_samples = 0
+
+    def _window(self, last):
+        """Return the slice covering the most recent `last` samples in the mirrored arrays"""
+        count = self._size if last is None else max(0, min(last, self._size))
+        end = self._head + self.capacity if self._size == self.capacity else self._head
+        return slice(end - count, end)
+
+    def timestamps(self, last=None):
+        """Timestamps of the most recent samples, oldest first (view)"""
+        return self._timestamps[self._window(last)]
+
+    def metric(self, name, last=None):
+        """(samples x cells) view of one metric (or "status_code") for the most recent samples, oldest first"""
+        return self._metrics[name][self._window(last)]
+
+    def status_codes(self, last=None):
+        """(samples x cells) view of status codes for the most recent samples"""
+        return self._metrics["status_code"][self._window(last)]
+
+    def snapshot(self, metrics=HISTORY_METRICS, last=None):
+        """Copy the timestamps and (samples x cells) metric arrays of the most recent samples"""
+        with self.lock:
+            timestamps = self.timestamps(last).copy()
+            return timestamps, {name: self.metric(name, last).copy() for name in metrics}
+
+    def iter_chunks(self, metrics=HISTORY_METRICS, chunk_samples=500):
+        """Yield (timestamps, {metric: samples x cells}) in chunks of at most chunk_samples, oldest first"""
+        timestamps, series = self.snapshot(metrics)
+        for start in range(0, len(timestamps), chunk_samples):
+            end = start + chunk_samples
+            yield timestamps[start:end], {name: values[start:end] for name, values in series.items()}
+
+    def to_frame(self, last=None, metrics=HISTORY_METRICS):
+        """Build a long DataFrame with one row per sample per cell"""
+        with self.lock:
+            timestamps = self.timestamps(last)
+            num_samples, num_cells = len(timestamps), len(self.cell_ids)
+
+            frame = {
+                "timestamp": np.repeat(timestamps, num_cells),
+                "cell_id": np.tile(np.array(self.cell_ids, dtype=object), num_samples),
+                "cell_type": np.tile(np.array(self.cell_types, dtype=object), num_samples),
+            }
+            for name in metrics:
+                frame[name] = self.metric(name, last).ravel()
+            frame["status"] = STATUS_LABELS[self.status_codes(last).ravel()]
+            return pd.DataFrame(frame)
@@ -0,0 +1,86 @@
+"""Cell manifests: bulk cell configuration loaded from CSV or JSON files"""
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from battery_engine import CELL_TYPES
+
+# Columns of a validated manifest; "position" is optional in the uploaded file
+MANIFEST_COLUMNS = ("cell_id", "cell_type", "position")
+# Rows quoted back to the user when validation fails
+MANIFEST_ERROR_ROWS = 5
+
+def _error_rows(mask):
+    """Return a short list of 1-based manifest row numbers where mask is set"""
+    rows = (np.flatnonzero(mask) + 1)[:MANIFEST_ERROR_ROWS].tolist()
+    more = ", ..." if mask.sum() > MANIFEST_ERROR_ROWS else ""
+    return f"{', '.join(map(str, rows))}{more}"
+
+def read_manifest(data, filename):
+    """Read a CSV or JSON manifest into a raw DataFrame.
+
+    JSON manifests are either a list of cell objects or an object with a "cells" list.
+    """
+    if filename.lower().endswith(".json"):
+        content = json.loads(data)
+        if isinstance(content, dict):
+            content = content.get("cells")
+        if not isinstance(content, list):
+            raise ValueError('JSON manifest must be a list of cells or an object with a "cells" list')
+        return pd.DataFrame(content)
+    if filename.lower().endswith(".csv"):
+        return pd.read_csv(io.BytesIO(data), dtype=str, skipinitialspace=True)
+    raise ValueError(f"Unsupported manifest file: {filename} (expected .csv or .json)")
+
+def validate_manifest(frame):
+    """Check a raw manifest and return it as cell_id, cell_type and integer position columns.
+
+    Cell types must be known chemistries, and cell IDs and positions must be unique.
+    Positions default to the row order when the column is missing.
+    """
+    frame = frame.rename(columns=lambda name: str(name).strip().lower())
+    missing = [name for name in ("cell_id", "cell_type") if name not in frame.columns]
+    if missing:
+        raise ValueError(f"Manifest is missing required column(s): {', '.join(missing)}")
+    if frame.empty:
+        raise ValueError("Manifest does not list any cells")
+
+    cell_ids = frame["cell_id"].astype("string").str.strip()
+    cell_types = frame["cell_type"].astype("string").str.strip()
+
+    blank = (cell_ids.isna() | (cell_ids == "")).to_numpy()
+    if blank.any():
+        raise ValueError(f"Manifest rows without a cell_id: {_error_rows(blank)}")
+    unknown = (~cell_types.isin(CELL_TYPES)).to_numpy()
+    if unknown.any():
+        raise ValueError(
+            f"Unknown cell_type in manifest rows {_error_rows(unknown)} "
+            f"(expected one of {', '.join(CELL_TYPES)})"
+        )
+    duplicated = cell_ids.duplicated(keep=False).to_numpy()
+    if duplicated.any():
+        raise ValueError(f"Duplicate cell_id in manifest rows {_error_rows(duplicated)}")
+
+    if "position" in frame.columns:
+        positions = pd.to_numeric(frame["position"], errors="coerce")
+        invalid = (positions.isna() | (positions % 1 != 0)).to_numpy()
+        if invalid.any():
+            raise ValueError(f"Manifest position must be an integer in rows {_error_rows(invalid)}")
+        positions = positions.astype(np.int64)
+        duplicated = positions.duplicated(keep=False).to_numpy()
+        if duplicated.any():
+            raise ValueError(f"Duplicate position in manifest rows {_error_rows(duplicated)}")
+    else:
+        positions = pd.Series(np.arange(1, len(frame) + 1))
+
+    return pd.DataFrame({
+        "cell_id": cell_ids.to_numpy(dtype=object),
+        "cell_type": cell_types.to_numpy(dtype=object),
+        "position": positions.to_numpy()
+    })
+
+def load_manifest(data, filename):
+    """Read and validate manifest file contents"""
+    return validate_manifest(read_manifest(data, filename))
@@ -0,0 +1,428 @@
+"""Stateful electrochemical model of many battery cells, stepped together"""
+import numpy as np
+
+from battery_engine import (
+    CAPACITY_HIGHS, CAPACITY_LOWS, CELL_CONFIGS, CELL_TYPES, MAX_VOLTAGES, MIN_VOLTAGES, OCV_SOC_POINTS,
+    STATUS_LABELS, cell_health, classify_status
+)
+from battery_protocol import STEP_CC_CHARGE, STEP_CC_DISCHARGE, STEP_CV_HOLD, STEP_PULSE, ProtocolTable
+from battery_thermal import ThermalGrid
+
+# Per-chemistry lookup tables indexed by cell type code
+OCV_SOC = np.array(OCV_SOC_POINTS)
+OCV_TABLE = np.array([CELL_CONFIGS[t]["ocv_curve"] for t in CELL_TYPES])
+INTERNAL_RESISTANCES = np.array([CELL_CONFIGS[t]["internal_resistance"] for t in CELL_TYPES])
+
+# First-order thermal model: time constant (s) and thermal resistance to ambient (K/W)
+THERMAL_TIME_CONSTANT = 900.0
+THERMAL_RESISTANCE = 8.0
+# Relative noise of the applied current and absolute noise of temperature readings (°C)
+CURRENT_NOISE = 0.01
+TEMPERATURE_NOISE = 0.1
+# Steps integrated at once by CellModel.iter_blocks, the cap on steps x cells held in memory
+# per block, and re-integration passes per block
+SIMULATION_BLOCK_STEPS = 256
+SIMULATION_BLOCK_SIZE = 1 << 18
+MAX_BLOCK_PASSES = 8
+
+def open_circuit_voltage(type_codes, soc):
+    """Interpolate every cell's OCV curve at its state of charge"""
+    soc = np.clip(soc, 0.0, 1.0)
+    upper = np.clip(np.searchsorted(OCV_SOC, soc, side="right"), 1, len(OCV_SOC) - 1)
+    lower = upper - 1
+    v_lower, v_upper = OCV_TABLE[type_codes, lower], OCV_TABLE[type_codes, upper]
+    return v_lower + (v_upper - v_lower) * (soc - OCV_SOC[lower]) / (OCV_SOC[upper] - OCV_SOC[lower])
+
+def next_direction(charging, at_max, at_min, charge_rate, discharge_rate):
+    """Return (charging, held) for the next step from the voltage limits cells reached.
+
+    Cells turn around at a limit when the opposite direction has a current configured and
+    hold there (zero current) otherwise.
+    """
+    if discharge_rate > 0:
+        charging = charging & ~(at_max | (charge_rate <= 0))
+    if charge_rate > 0:
+        charging = charging | at_min | (discharge_rate <= 0)
+    return charging, np.where(charging, at_max, at_min)
+
+def cell_readings(type_codes, capacity_ah, voltage, current, temperature, process_params, rng=None):
+    """Round model outputs like generate_cells_batch and derive health and status.
+
+    Temperature readings get measurement noise drawn from `rng` when one is given.
+    """
+    voltage = np.round(voltage, 3)
+    current = np.round(current, 2)
+    if rng is not None:
+        temperature = temperature + rng.normal(0, TEMPERATURE_NOISE, np.shape(temperature))
+    temperature = np.round(temperature, 1)
+    health, stress_factor = cell_health(type_codes, voltage, current, temperature, process_params)
+    status_code = classify_status(type_codes, voltage, temperature, health)
+    return {
+        "voltage": voltage,
+        "current": current,
+        "temperature": temperature,
+        "power": np.round(voltage * np.abs(current), 2),
+        "capacity": np.broadcast_to(np.round(capacity_ah, 2), np.shape(voltage)),
+        "status": STATUS_LABELS[status_code],
+        "status_code": status_code,
+        "health": health,
+        "stress_factor": np.broadcast_to(stress_factor, np.shape(voltage))
+    }
+
+def spawn_seeds(seed, count):
+    """Return the `count` children seed.spawn(count) gives on a fresh seed, without advancing seed.
+
+    Child i is SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (i,)), so any stream
+    can be re-created from the root entropy and its spawn key alone.
+    """
+    return [np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (i,), pool_size=seed.pool_size)
+            for i in range(count)]
+
+def soc_at_voltage(type_codes, ocv):
+    """Invert the OCV curves: the state of charge at which each cell's OCV equals ocv"""
+    soc = np.empty(len(type_codes))
+    for code in np.unique(type_codes):
+        cells = type_codes == code
+        soc[cells] = np.interp(ocv[cells], OCV_TABLE[code], OCV_SOC)
+    return soc
+
+class CellModel:
+    """State of charge, temperature and charge direction of many cells as arrays.
+
+    SOC is integrated by coulomb counting from the applied current. Terminal voltage
+    is the chemistry's OCV at that SOC plus the IR drop, bounded by min/max_voltage.
+    Temperature relaxes toward target_temperature plus the I²R self-heating rise with
+    a first-order time constant. Cells charge at charge_rate up to max_voltage, then
+    discharge at discharge_rate down to min_voltage, and repeat; a cell holds at a limit
+    when the opposite direction has no current configured. When the process parameters
+    set `thermal_columns`, cells also exchange heat with their neighbours on a bench
+    layout that many positions wide (see ThermalGrid); 0 keeps them independent.
+
+    A `protocol` in the process parameters (see battery_protocol) replaces the constant
+    rates: every cell then runs its own place in the protocol's steps, tracked as
+    step_index, step_elapsed and cycle arrays.
+
+    All randomness derives from `seed` (an int, a SeedSequence, or None for fresh entropy):
+    its first child drives measurement noise for the whole bench, and the children of its
+    second child give every cell its own stream for capacity, resistance and initial SOC.
+    A model built from the same seed and cells reproduces its readings bit for bit.
+    """
+
+    def __init__(self, type_codes, seed=None, initial_soc=(0.3, 0.7), ambient_temperature=25.0, positions=None):
+        self.seed = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.type_codes = np.asarray(type_codes, dtype=np.intp)
+        n = len(self.type_codes)
+        self.positions = np.arange(1, n + 1) if positions is None else np.asarray(positions, dtype=np.int64)
+        self._thermal_grid = None
+        self._protocol_table = None
+
+        noise_seed, cells_seed = spawn_seeds(self.seed, 2)
+        self._rng = np.random.default_rng(noise_seed)
+        # Per-cell draws: capacity, resistance spread and initial SOC, each uniform in [0, 1)
+        draws = np.array([np.random.default_rng(cell_seed).random(3) for cell_seed in spawn_seeds(cells_seed, n)])
+        draws = draws.reshape(n, 3)
+
+        lows, highs = CAPACITY_LOWS[self.type_codes], CAPACITY_HIGHS[self.type_codes]
+        self.capacity_ah = lows + (highs - lows) * draws[:, 0]
+        self.resistance = INTERNAL_RESISTANCES[self.type_codes] * (0.9 + 0.2 * draws[:, 1])
+        self.min_voltage = MIN_VOLTAGES[self.type_codes]
+        self.max_voltage = MAX_VOLTAGES[self.type_codes]
+
+        self.soc = initial_soc[0] + (initial_soc[1] - initial_soc[0]) * draws[:, 2]
+        self.temperature = np.full(n, float(ambient_temperature))
+        self.current = np.zeros(n)
+        self.charging = np.ones(n, dtype=bool)
+        self._at_max = np.zeros(n, dtype=bool)
+        self._at_min = np.zeros(n, dtype=bool)
+        self.step_index = np.zeros(n, dtype=np.intp)
+        self.step_elapsed = np.zeros(n)
+        self.cycle = np.zeros(n, dtype=np.intp)
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    def state(self):
+        """Return a copy of everything step() carries from one step to the next, including the noise stream.
+
+        The per-cell parameters are not included: they are fixed by the seed and cells.
+        """
+        return {
+            "soc": self.soc.copy(),
+            "temperature": self.temperature.copy(),
+            "current": self.current.copy(),
+            "charging": self.charging.copy(),
+            "at_max": self._at_max.copy(),
+            "at_min": self._at_min.copy(),
+            "step_index": self.step_index.copy(),
+            "step_elapsed": self.step_elapsed.copy(),
+            "cycle": self.cycle.copy(),
+            "rng": self._rng.bit_generator.state
+        }
+
+    def restore(self, state):
+        """Return the model to a state() taken from a model with the same seed and cells"""
+        self.soc = state["soc"].copy()
+        self.temperature = state["temperature"].copy()
+        self.current = state["current"].copy()
+        self.charging = state["charging"].copy()
+        self._at_max, self._at_min = state["at_max"].copy(), state["at_min"].copy()
+        self.step_index = state["step_index"].copy()
+        self.step_elapsed = state["step_elapsed"].copy()
+        self.cycle = state["cycle"].copy()
+        self._rng.bit_generator.state = state["rng"]
+
+    def _readings(self, voltage, current, temperature, process_params):
+        """Round model outputs with noisy temperature readings (see cell_readings)"""
+        return cell_readings(self.type_codes, self.capacity_ah, voltage, current, temperature, process_params, self._rng)
+
+    def step(self, dt, process_params=None):
+        """Advance every cell by dt seconds and return its readings as column arrays.
+
+        The columns match generate_cells_batch, plus the state of charge ("soc").
+        """
+        process_params = process_params or {}
+        table = self.protocol_table(process_params)
+        if table is not None:
+            readings = self._advance_protocol(dt, 1, process_params, table)
+            return {name: values[0] for name, values in readings.items()}
+        charge_rate = process_params.get('charge_rate', 0)
+        discharge_rate = process_params.get('discharge_rate', 0)
+
+        self.charging, held = next_direction(self.charging, self._at_max, self._at_min, charge_rate, discharge_rate)
+        noise = 1 + self._rng.normal(0, CURRENT_NOISE, len(self))
+        self.current = np.where(held, 0.0, np.where(self.charging, charge_rate, -discharge_rate) * noise)
+
+        # Coulomb counting
+        self.soc = np.clip(self.soc + self.current * dt / 3600 / self.capacity_ah, 0.0, 1.0)
+
+        voltage = open_circuit_voltage(self.type_codes, self.soc) + self.current * self.resistance
+        self._at_max = (voltage >= self.max_voltage) | (self.soc >= 1.0)
+        self._at_min = (voltage <= self.min_voltage) | (self.soc <= 0.0)
+
+        # First-order thermal response, exact for a constant current over the step
+        steady_state = self._steady_temperature(self.current, process_params)
+        self.temperature += (steady_state - self.temperature) * -np.expm1(-dt / THERMAL_TIME_CONSTANT)
+        grid = self.thermal_grid(process_params)
+        if grid is not None:
+            self.temperature = grid.step(self.temperature, dt)
+
+        readings = self._readings(
+            np.clip(voltage, self.min_voltage, self.max_voltage), self.current, self.temperature, process_params
+        )
+        readings["soc"] = self.soc.copy()
+        return readings
+
+    def thermal_grid(self, process_params):
+        """Return the ThermalGrid for the process parameters' thermal_columns, or None when cells are independent"""
+        columns = int(process_params.get('thermal_columns', 0) or 0)
+        if columns <= 0:
+            return None
+        if self._thermal_grid is None or self._thermal_grid.columns != columns:
+            self._thermal_grid = ThermalGrid(self.positions, columns)
+        return self._thermal_grid
+
+    def protocol_table(self, process_params):
+        """Return the ProtocolTable of the process parameters' protocol, or None for constant rates"""
+        protocol = process_params.get('protocol')
+        if not protocol:
+            return None
+        if self._protocol_table is None or self._protocol_table.protocol != protocol:
+            self._protocol_table = ProtocolTable(protocol)
+        return self._protocol_table
+
+    def protocol_steps(self, process_params):
+        """Return every cell's current protocol step label, or None for constant rates"""
+        table = self.protocol_table(process_params or {})
+        return None if table is None else table.labels[self.step_index]
+
+    def _advance_protocol(self, dt, steps, process_params, table):
+        """Step every cell through its protocol `steps` times and return the readings of all steps.
+
+        Setpoints and end conditions are looked up per cell from the step it is in, so
+        cells advance together however far apart their schedules are; only time is looped.
+        A step's end condition is checked on the sample that reaches it, and the cell
+        starts its next step on the following sample.
+        """
+        n = len(self)
+        noise = 1 + self._rng.normal(0, CURRENT_NOISE, (steps, n))
+        relax = -np.expm1(-dt / THERMAL_TIME_CONSTANT)
+        grid = self.thermal_grid(process_params)
+        current, soc, voltage, temperature = (np.empty((steps, n)) for _ in range(4))
+
+        for j in range(steps):
+            index = self.step_index
+            kind, setpoint = table.kind[index], table.current[index]
+            limit = table.voltage[index]
+            limit = np.where(np.isnan(limit), np.where(kind == STEP_CC_DISCHARGE, self.min_voltage, self.max_voltage),
+                             limit)
+            # CV holds the terminal voltage: the current that puts OCV + I R at the limit, capped by
+            # `current`; a full cell takes no more charge
+            cv_current = np.clip((limit - open_circuit_voltage(self.type_codes, self.soc)) / self.resistance,
+                                 0.0, np.where(np.isnan(setpoint), np.inf, setpoint))
+            cv_current = np.where(self.soc >= 1.0, 0.0, cv_current)
+            pulse_on = self.step_elapsed % table.period[index] < table.on_seconds[index]
+            cell_current = np.select(
+                [kind == STEP_CC_CHARGE, kind == STEP_CC_DISCHARGE, kind == STEP_PULSE, kind == STEP_CV_HOLD],
+                [setpoint * noise[j], -setpoint * noise[j], np.where(pulse_on, setpoint * noise[j], 0.0), cv_current],
+                default=0.0
+            )
+
+            self.soc = np.clip(self.soc + cell_current * dt / 3600 / self.capacity_ah, 0.0, 1.0)
+            cell_voltage = open_circuit_voltage(self.type_codes, self.soc) + cell_current * self.resistance
+            self.temperature = self.temperature + (
+                self._steady_temperature(cell_current, process_params) - self.temperature
+            ) * relax
+            if grid is not None:
+                self.temperature = grid.step(self.temperature, dt)
+
+            # Step transitions, checked for every cell at once
+            self.step_elapsed = self.step_elapsed + dt
+            ended = (
+                (self.step_elapsed >= table.duration[index])
+                | ((kind == STEP_CC_CHARGE) & ((cell_voltage >= limit) | (self.soc >= 1.0)))
+                | ((kind == STEP_CC_DISCHARGE) & ((cell_voltage <= limit) | (self.soc <= 0.0)))
+                | ((kind == STEP_CV_HOLD) & (cell_current <= table.cutoff_current[index]))
+            )
+            self.step_index, self.cycle = table.advance(index, self.cycle, ended)
+            self.step_elapsed = np.where(ended, 0.0, self.step_elapsed)
+
+            current[j], soc[j], voltage[j], temperature[j] = cell_current, self.soc, cell_voltage, self.temperature
+
+        self.current = current[-1].copy()
+        self.charging = np.where(self.current != 0, self.current > 0, self.charging)
+        self._at_max = (voltage[-1] >= self.max_voltage) | (soc[-1] >= 1.0)
+        self._at_min = (voltage[-1] <= self.min_voltage) | (soc[-1] <= 0.0)
+
+        readings = self._readings(
+            np.clip(voltage, self.min_voltage, self.max_voltage), current, temperature, process_params
+        )
+        readings["soc"] = soc
+        return readings
+
+    def _steady_temperature(self, current, process_params):
+        """Temperature each cell settles at under a constant current: ambient plus I²R heating"""
+        return process_params.get('target_temperature', 25) + current ** 2 * self.resistance * THERMAL_RESISTANCE
+
+    def iter_blocks(self, dt, steps, process_params=None, block_steps=SIMULATION_BLOCK_STEPS):
+        """Advance every cell by `steps` steps of dt seconds, yielding (steps x cells) readings per block.
+
+        Statistically equivalent to calling step() repeatedly, but each block is integrated
+        with array operations along time as well as across cells (see _advance_block). The
+        noise is drawn in a different order, so the two paths do not give bit-identical
+        trajectories for the same seed.
+        """
+        process_params = process_params or {}
+        block_steps = min(block_steps, max(1, SIMULATION_BLOCK_SIZE // max(len(self), 1)))
+        if dt > 0:
+            # Keep the closed-form thermal sum (powers of exp(dt / tau)) well inside float range
+            block_steps = min(block_steps, max(1, int(50 * THERMAL_TIME_CONSTANT / dt)))
+        remaining = steps
+        while remaining > 0:
+            readings = self._advance_block(dt, min(block_steps, remaining), process_params)
+            remaining -= len(readings["soc"])
+            yield readings
+
+    def _advance_block(self, dt, steps, process_params):
+        """Integrate up to `steps` steps at once and return the readings of the steps taken.
+
+        Each cell's direction is first assumed constant over the block. Every pass then
+        finds, per cell, the first step whose limits imply a different direction (or hold)
+        from the next step on, and re-integrates only the cells that changed. Passes stop
+        when the block is consistent; if a cell changes direction more often than
+        MAX_BLOCK_PASSES allows, the block is cut short at the first unresolved step.
+        Protocol runs are stepped along time by _advance_protocol instead.
+        """
+        table = self.protocol_table(process_params)
+        if table is not None:
+            return self._advance_protocol(dt, steps, process_params, table)
+        charge_rate = process_params.get('charge_rate', 0)
+        discharge_rate = process_params.get('discharge_rate', 0)
+        n = len(self)
+        rows = np.arange(steps)[:, None]
+        charge_per_amp = dt / 3600 / self.capacity_ah
+
+        first_charging, first_held = next_direction(
+            self.charging, self._at_max, self._at_min, charge_rate, discharge_rate
+        )
+        charging = np.broadcast_to(first_charging, (steps, n)).copy()
+        held = np.broadcast_to(first_held, (steps, n)).copy()
+        noise = 1 + self._rng.normal(0, CURRENT_NOISE, (steps, n))
+        # SOC at the steps where a cell's direction changed (NaN elsewhere). Later steps integrate
+        # from there, so a cell clipped at 0 or 1 continues from the bound as step() would.
+        pinned = np.full((steps, n), np.nan)
+
+        current, soc, voltage = np.empty((steps, n)), np.empty((steps, n)), np.empty((steps, n))
+        at_max, at_min = np.empty((steps, n), dtype=bool), np.empty((steps, n), dtype=bool)
+        active = np.arange(n)
+        for _ in range(MAX_BLOCK_PASSES):
+            columns = np.arange(len(active))
+            cell_charging, cell_held, cell_pinned = charging[:, active], held[:, active], pinned[:, active]
+            cell_current = np.where(
+                cell_held, 0.0, np.where(cell_charging, charge_rate, -discharge_rate) * noise[:, active]
+            )
+            charge = np.cumsum(cell_current * charge_per_amp[active], axis=0)
+            last_pin = np.maximum.accumulate(np.where(np.isnan(cell_pinned), -1, rows), axis=0)
+            pin = np.maximum(last_pin, 0), columns
+            start = np.where(last_pin >= 0, cell_pinned[pin], self.soc[active])
+            cell_soc = np.clip(start + (charge - np.where(last_pin >= 0, charge[pin], 0.0)), 0.0, 1.0)
+            cell_voltage = open_circuit_voltage(self.type_codes[active], cell_soc) + cell_current * self.resistance[active]
+            cell_max = (cell_voltage >= self.max_voltage[active]) | (cell_soc >= 1.0)
+            cell_min = (cell_voltage <= self.min_voltage[active]) | (cell_soc <= 0.0)
+
+            current[:, active], soc[:, active], voltage[:, active] = cell_current, cell_soc, cell_voltage
+            at_max[:, active], at_min[:, active] = cell_max, cell_min
+
+            next_charging, next_held = next_direction(cell_charging, cell_max, cell_min, charge_rate, discharge_rate)
+            mismatch = (next_charging[:-1] != cell_charging[1:]) | (next_held[:-1] != cell_held[1:])
+            changed = mismatch.any(axis=0)
+            if not changed.any():
+                break
+            active, columns = active[changed], columns[changed]
+            first = mismatch[:, changed].argmax(axis=0)
+            tail = rows > first
+            charging[:, active] = np.where(tail, next_charging[first, columns], cell_charging[:, changed])
+            held[:, active] = np.where(tail, next_held[first, columns], cell_held[:, changed])
+            pinned[first, active] = cell_soc[first, columns]
+        else:
+            # Keep the steps up to the first unresolved change; the next block resumes from there
+            steps = int(first.min()) + 1
+            current, soc, voltage = current[:steps], soc[:steps], voltage[:steps]
+            at_max, at_min, charging = at_max[:steps], at_min[:steps], charging[:steps]
+
+        decay = np.exp(-dt / THERMAL_TIME_CONSTANT)
+        steady_state = self._steady_temperature(current, process_params)
+        grid = self.thermal_grid(process_params)
+        if grid is None:
+            # First-order thermal response in closed form: T_j = a^j T_0 + (1 - a) sum_m a^(j-m) T_inf,m
+            powers = decay ** np.arange(1, steps + 1)[:, None]
+            temperature = powers * (self.temperature + (1 - decay) * np.cumsum(steady_state / powers, axis=0))
+        else:
+            # Neighbour exchange couples the cells, so the block is stepped along time
+            temperature = np.empty((steps, n))
+            cell_temperature = self.temperature
+            for j in range(steps):
+                cell_temperature = grid.step(cell_temperature + (steady_state[j] - cell_temperature) * (1 - decay), dt)
+                temperature[j] = cell_temperature
+
+        self.soc = soc[-1].copy()
+        self.current = current[-1].copy()
+        self.temperature = temperature[-1].copy()
+        self.charging = charging[-1].copy()
+        self._at_max, self._at_min = at_max[-1].copy(), at_min[-1].copy()
+
+        readings = self._readings(
+            np.clip(voltage, self.min_voltage, self.max_voltage), current, temperature, process_params
+        )
+        readings["soc"] = soc
+        return readings
+
+    def time_to_limit(self):
+        """Seconds until each cell reaches the voltage limit it is heading for at its present current.
+
+        Charging cells are projected to max_voltage and discharging cells to min_voltage;
+        resting cells return NaN.
+        """
+        limit = np.where(self.current > 0, self.max_voltage, self.min_voltage)
+        target_soc = soc_at_voltage(self.type_codes, limit - self.current * self.resistance)
+        seconds = (target_soc - self.soc) * self.capacity_ah * 3600 / np.where(self.current == 0, np.nan, self.current)
+        return np.maximum(seconds, 0.0)
@@ -0,0 +1,167 @@
+"""Monte Carlo replicates of one test configuration with reproducible random streams.
+
+Replicate i of a run seeded with `seed` simulates from SeedSequence(seed, spawn_key=(i,)),
+the i-th child SeedSequence(seed).spawn() gives, so any replicate can be re-created bit
+for bit from the run seed and its index:
+
+    python battery_montecarlo.py --cells 16 --replicates 200 --seed 42 --output replicates.csv
+"""
+import argparse
+import sys
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from battery_engine import CELL_TYPES, STATUS_CRITICAL, STATUS_LABELS, STATUS_WARNING, cell_type_codes
+from battery_model import CellModel
+from battery_simulation import bench_cells
+from battery_sweep import run_in_pool
+
+# Points recorded per replicate trajectory; longer tests are decimated to this many
+MONTE_CARLO_POINTS = 500
+# Default coverage of the reported bands
+MONTE_CARLO_LEVEL = 0.9
+# Per-replicate summary columns
+REPLICATE_METRICS = ("final_health", "mean_health", "min_health", "warning_hours", "critical_hours",
+                     "peak_temperature")
+
+def replicate_seed(seed, index):
+    """Return the SeedSequence replicate `index` of a run seeded with `seed` is simulated from"""
+    return np.random.SeedSequence(seed, spawn_key=(index,))
+
+def simulate_replicate(cell_types, process_params, seed, points=MONTE_CARLO_POINTS, positions=None):
+    """Simulate one replicate for the full test_duration.
+
+    `positions` places the cells on the bench for thermal coupling (default 1..n).
+    Returns the recorded sample times (hours), mean health and status counts per recorded
+    sample, and the REPLICATE_METRICS of the whole run.
+    """
+    interval = float(process_params.get("sampling_interval", 5))
+    steps = max(1, int(process_params.get("test_duration", 0) * 3600 // interval))
+    stride = -(-steps // points)
+    model = CellModel(
+        cell_type_codes(cell_types), seed=seed, positions=positions,
+        ambient_temperature=process_params.get("target_temperature", 25)
+    )
+
+    health, status_counts = [], []
+    health_sum = 0.0
+    min_health = peak_temperature = None
+    warning_samples = critical_samples = 0
+    done = 0
+    for readings in model.iter_blocks(interval, steps, process_params):
+        recorded = np.flatnonzero((done + np.arange(len(readings["health"]))) % stride == 0)
+        health.append(readings["health"][recorded].mean(axis=1))
+        status_counts.append(np.stack(
+            [np.count_nonzero(readings["status_code"][recorded] == code, axis=1) for code in range(len(STATUS_LABELS))],
+            axis=1
+        ))
+        health_sum += readings["health"].sum()
+        block_min, block_peak = float(readings["health"].min()), float(readings["temperature"].max())
+        min_health = block_min if min_health is None else min(min_health, block_min)
+        peak_temperature = block_peak if peak_temperature is None else max(peak_temperature, block_peak)
+        warning_samples += np.count_nonzero(readings["status_code"] == STATUS_WARNING)
+        critical_samples += np.count_nonzero(readings["status_code"] == STATUS_CRITICAL)
+        final_health = float(readings["health"][-1].mean())
+        done += len(readings["health"])
+
+    num_cells = len(model)
+    cell_hours = interval / 3600 / num_cells
+    return {
+        "hours": (np.arange(0, steps, stride) + 1) * interval / 3600,
+        "health": np.concatenate(health),
+        "status_counts": np.concatenate(status_counts),
+        "final_health": final_health,
+        "mean_health": health_sum / (steps * num_cells),
+        "min_health": min_health,
+        "warning_hours": warning_samples * cell_hours,
+        "critical_hours": critical_samples * cell_hours,
+        "peak_temperature": peak_temperature
+    }
+
+def run_replicates(cell_types, process_params, replicates, seed=0, processes=None, progress=None, positions=None):
+    """Simulate `replicates` independent runs of one test configuration across worker processes.
+
+    Every replicate places the cells at the same bench `positions` (default 1..n).
+    Returns a dict with the recorded sample "hours", "health" (replicates x samples) and
+    "status_counts" (replicates x samples x status) arrays, and a "summary" DataFrame of
+    REPLICATE_METRICS with one row per replicate and the spawn key that re-creates it.
+    """
+    process_params = dict(process_params)
+    results = run_in_pool(
+        simulate_replicate,
+        [(list(cell_types), process_params, replicate_seed(seed, index), MONTE_CARLO_POINTS, positions)
+         for index in range(replicates)],
+        processes, progress
+    )
+    summary = pd.DataFrame([
+        {"replicate": index, "spawn_key": str(replicate_seed(seed, index).spawn_key),
+         **{name: result[name] for name in REPLICATE_METRICS}}
+        for index, result in enumerate(results)
+    ])
+    return {
+        "seed": seed,
+        "hours": results[0]["hours"],
+        "health": np.stack([result["health"] for result in results]),
+        "status_counts": np.stack([result["status_counts"] for result in results]),
+        "summary": summary
+    }
+
+def replicate_bands(hours, values, level=MONTE_CARLO_LEVEL):
+    """Summarize (replicates x samples) values per sample: mean, central `level` band and CI of the mean.
+
+    "lower"/"upper" bound the central `level` fraction of replicates; "mean_lower" and
+    "mean_upper" are the normal-approximation `level` confidence interval of the mean.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    tail = (1 - level) / 2
+    mean = values.mean(axis=0)
+    if len(values) > 1:
+        margin = NormalDist().inv_cdf(1 - tail) * values.std(axis=0, ddof=1) / np.sqrt(len(values))
+    else:
+        margin = np.full_like(mean, np.nan)
+    return pd.DataFrame({
+        "hours": hours,
+        "mean": mean,
+        "lower": np.quantile(values, tail, axis=0),
+        "upper": np.quantile(values, 1 - tail, axis=0),
+        "mean_lower": mean - margin,
+        "mean_upper": mean + margin
+    })
+
+def print_progress(fraction):
+    """Print a one-line progress indicator to stderr"""
+    print(f"\rReplicates... {fraction:6.1%}", end="", file=sys.stderr, flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Monte Carlo replicates of a battery test")
+    parser.add_argument("--cells", type=int, default=16, help="Number of cells")
+    parser.add_argument("--cell-type", choices=CELL_TYPES, help="Chemistry of every cell (default: mixed)")
+    parser.add_argument("--replicates", type=int, default=100, help="Number of replicates")
+    parser.add_argument("--seed", type=int, default=0, help="Run seed; replicate i uses spawn key (i,)")
+    parser.add_argument("--level", type=float, default=MONTE_CARLO_LEVEL, help="Band coverage")
+    parser.add_argument("--test-duration", type=float, default=2.0, help="Test duration (hours)")
+    parser.add_argument("--charge-rate", type=float, default=1.0, help="Charge rate (A)")
+    parser.add_argument("--discharge-rate", type=float, default=1.0, help="Discharge rate (A)")
+    parser.add_argument("--target-temperature", type=float, default=25.0, help="Target temperature (°C)")
+    parser.add_argument("--sampling-interval", type=float, default=5.0, help="Sampling interval (seconds)")
+    parser.add_argument("--processes", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--output", default="replicates.csv", help="CSV file for the per-replicate summary")
+    args = parser.parse_args(argv)
+
+    process_params = {name: getattr(args, name) for name in
+                      ("test_duration", "charge_rate", "discharge_rate", "target_temperature", "sampling_interval")}
+    _, cell_types = bench_cells(args.cells, args.cell_type)
+    results = run_replicates(cell_types, process_params, args.replicates, args.seed, args.processes, print_progress)
+    print(file=sys.stderr)
+    results["summary"].to_csv(args.output, index=False)
+
+    final = replicate_bands([0], results["summary"][["final_health"]].to_numpy(), args.level).iloc[0]
+    print(f"{args.replicates} replicates written to {args.output}")
+    print(f"Final health: mean {final['mean']:.2f}% ({args.level:.0%} CI {final['mean_lower']:.2f}-"
+          f"{final['mean_upper']:.2f}), {args.level:.0%} of replicates in {final['lower']:.2f}-{final['upper']:.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Series/parallel pack topology over a bench's cells, with vectorized pack metrics.
+
+An SxP pack is `parallel` strings connected in parallel, each of `series` cells in
+series. Cells fill the strings in position order, string by string. Metrics are
+computed over the trailing cell axis of the records, so the same code reduces one
+tick or a (samples x cells) block.
+
+The pack is not coupled back into the simulation: every cell still runs at the current
+its own rate or protocol step sets, as on an open bench. Pack current and bus voltage
+are derived from those independent cells, and the string currents that would share the
+bus are not fed back to constrain the cells. The metrics therefore estimate the pack the
+cells would form; they do not simulate a wired SxP pack.
+"""
+import numpy as np
+
+from battery_model import open_circuit_voltage
+
+def pack_topology(positions, parallel, series=None):
+    """Return the cell indices of an SxP pack as a (parallel x series) array.
+
+    `series` defaults to as many cells per string as the bench fills; cells left over
+    beyond series x parallel are not part of the pack.
+    """
+    parallel = int(parallel)
+    series = len(positions) // max(parallel, 1) if series is None else int(series)
+    if parallel < 1 or series < 1 or series * parallel > len(positions):
+        raise ValueError(f"A {series}S{parallel}P pack does not fit {len(positions)} cells")
+    order = np.argsort(positions, kind="stable")
+    return order[:series * parallel].reshape(parallel, series)
+
+def topology_label(strings):
+    """Return the SxP name of a pack topology, e.g. 12S4P"""
+    parallel, series = strings.shape
+    return f"{series}S{parallel}P"
+
+def pack_metrics(strings, records, type_codes, resistance):
+    """Reduce SAMPLE_DTYPE records of the bench to pack metrics for a pack_topology.
+
+    Each string is a voltage source (the sum of its cells' OCVs) behind the sum of
+    their internal resistances. The pack current, the sum of the currents applied to
+    the strings, splits between the strings so they all share one bus voltage:
+
+        V = (I + sum E_j / R_j) / sum 1 / R_j,    I_j = (V - E_j) / R_j
+
+    Usable capacity is limited by the weakest cell of every string, and available
+    charge by the emptiest one. Imbalance is the spread of cell voltage (mV) and state
+    of charge (%) across the pack. Per-string arrays have a trailing string axis.
+    """
+    voltage = np.take(records["voltage"], strings, axis=-1).astype(np.float64)
+    current = np.take(records["current"], strings, axis=-1).astype(np.float64)
+    soc = np.take(records["soc"], strings, axis=-1).astype(np.float64)
+    capacity = np.take(records["capacity"], strings, axis=-1).astype(np.float64)
+
+    emf = open_circuit_voltage(type_codes[strings], soc).sum(axis=-1)
+    conductance = 1 / resistance[strings].sum(axis=-1)
+    pack_current = current.mean(axis=-1).sum(axis=-1)
+    bus_voltage = (pack_current + (emf * conductance).sum(axis=-1)) / conductance.sum(axis=-1)
+    string_current = (bus_voltage[..., None] - emf) * conductance
+
+    charge = soc * capacity
+    weakest = charge.reshape(*charge.shape[:-2], -1).argmin(axis=-1)
+    cell_voltage = voltage.reshape(*voltage.shape[:-2], -1)
+    cell_soc = soc.reshape(*soc.shape[:-2], -1)
+    return {
+        "voltage": bus_voltage,
+        "current": pack_current,
+        "power": bus_voltage * np.abs(pack_current),
+        "capacity": capacity.min(axis=-1).sum(axis=-1),
+        "available": charge.min(axis=-1).sum(axis=-1),
+        "voltage_spread": (cell_voltage.max(axis=-1) - cell_voltage.min(axis=-1)) * 1000,
+        "soc_spread": (cell_soc.max(axis=-1) - cell_soc.min(axis=-1)) * 100,
+        "weakest_cell": strings.ravel()[weakest],
+        "string_voltage": voltage.sum(axis=-1),
+        "string_current": string_current,
+        "string_capacity": capacity.min(axis=-1),
+        "string_available": charge.min(axis=-1)
+    }
@@ -0,0 +1,156 @@
+"""Multi-step test protocols: sequences of CC, CV, rest and pulse steps run by every cell.
+
+A protocol is a JSON object with a list of steps, each a "type" plus its settings:
+
+    cc_charge     charge at `current` (A) until the cell reaches `voltage` (default: max_voltage)
+    cc_discharge  discharge at `current` (A) until the cell falls to `voltage` (default: min_voltage)
+    cv_hold       hold `voltage` (default: max_voltage) until the current tapers to
+                  `cutoff_current` (A); `current` optionally caps the charge current
+    rest          no current
+    pulse         `current` (A, negative discharges) for `on_seconds`, then none for
+                  `off_seconds`, repeated
+
+Any step also ends after `minutes`; rest and pulse steps need it. The steps run `cycles`
+times, after which cells rest. Every cell moves through the protocol on its own, since
+cells reach their voltage limits at different times:
+
+    {"name": "CC-CV", "cycles": 2, "steps": [
+        {"type": "cc_charge", "current": 1.0},
+        {"type": "cv_hold", "cutoff_current": 0.05, "minutes": 60},
+        {"type": "rest", "minutes": 15},
+        {"type": "cc_discharge", "current": 1.0}]}
+"""
+import json
+
+import numpy as np
+
+STEP_TYPES = ("cc_charge", "cc_discharge", "cv_hold", "rest", "pulse")
+STEP_CC_CHARGE, STEP_CC_DISCHARGE, STEP_CV_HOLD, STEP_REST, STEP_PULSE = range(len(STEP_TYPES))
+STEP_LABELS = ("CC Charge", "CC Discharge", "CV Hold", "Rest", "Pulse")
+# Settings a step may have; unset settings are None
+STEP_SETTINGS = ("current", "voltage", "cutoff_current", "minutes", "on_seconds", "off_seconds")
+# Label of cells that finished every cycle
+DONE_LABEL = "Done"
+
+# Protocols offered in the dashboard besides constant charge/discharge rates
+PROTOCOL_PRESETS = {
+    "CC-CV Cycle": {
+        "name": "CC-CV Cycle",
+        "cycles": 3,
+        "steps": [
+            {"type": "cc_charge", "current": 1.0},
+            {"type": "cv_hold", "cutoff_current": 0.05, "minutes": 60},
+            {"type": "rest", "minutes": 15},
+            {"type": "cc_discharge", "current": 1.0},
+            {"type": "rest", "minutes": 15}
+        ]
+    },
+    "Pulse Characterization": {
+        "name": "Pulse Characterization",
+        "cycles": 1,
+        "steps": [
+            {"type": "cc_charge", "current": 1.0},
+            {"type": "rest", "minutes": 30},
+            {"type": "pulse", "current": -2.0, "on_seconds": 10, "off_seconds": 50, "minutes": 30},
+            {"type": "rest", "minutes": 30},
+            {"type": "pulse", "current": 2.0, "on_seconds": 10, "off_seconds": 50, "minutes": 30}
+        ]
+    }
+}
+
+def validate_protocol(content):
+    """Check a protocol (a dict with "steps", or a bare list of steps) and return it normalized.
+
+    The result has "name", "cycles" and "steps", with every setting of every step
+    present as a float or None.
+    """
+    if isinstance(content, list):
+        content = {"steps": content}
+    if not isinstance(content, dict) or not isinstance(content.get("steps"), list) or not content["steps"]:
+        raise ValueError('Protocol must be a list of steps or an object with a non-empty "steps" list')
+    cycles = content.get("cycles", 1)
+    if not isinstance(cycles, int) or cycles < 1:
+        raise ValueError("Protocol cycles must be a positive integer")
+
+    steps = []
+    for number, step in enumerate(content["steps"], 1):
+        if not isinstance(step, dict) or step.get("type") not in STEP_TYPES:
+            raise ValueError(f"Step {number} must have a type (expected one of {', '.join(STEP_TYPES)})")
+        unknown = set(step) - {"type", *STEP_SETTINGS}
+        if unknown:
+            raise ValueError(f"Step {number} has unknown setting(s): {', '.join(sorted(unknown))}")
+        try:
+            settings = {name: None if step.get(name) is None else float(step[name]) for name in STEP_SETTINGS}
+        except (TypeError, ValueError):
+            raise ValueError(f"Step {number} settings must be numbers") from None
+
+        kind = step["type"]
+        if kind in ("cc_charge", "cc_discharge", "pulse") and settings["current"] is None:
+            raise ValueError(f"Step {number} ({kind}) needs a current")
+        if kind in ("cc_charge", "cc_discharge") and settings["current"] <= 0:
+            raise ValueError(f"Step {number} ({kind}) current must be positive; the type sets the direction")
+        if kind == "cv_hold" and settings["cutoff_current"] is None and settings["minutes"] is None:
+            raise ValueError(f"Step {number} (cv_hold) needs a cutoff_current or minutes")
+        if kind in ("rest", "pulse") and settings["minutes"] is None:
+            raise ValueError(f"Step {number} ({kind}) needs minutes")
+        if kind == "pulse" and (settings["on_seconds"] is None or settings["on_seconds"] <= 0):
+            raise ValueError(f"Step {number} (pulse) needs positive on_seconds")
+        if settings["minutes"] is not None and settings["minutes"] <= 0:
+            raise ValueError(f"Step {number} minutes must be positive")
+        steps.append({"type": kind, **settings})
+
+    return {"name": str(content.get("name", "Custom Protocol")), "cycles": cycles, "steps": steps}
+
+def load_protocol(data, filename):
+    """Read and validate a JSON protocol file"""
+    if not filename.lower().endswith(".json"):
+        raise ValueError(f"Unsupported protocol file: {filename} (expected .json)")
+    try:
+        content = json.loads(data)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Protocol is not valid JSON: {e}") from None
+    return validate_protocol(content)
+
+def describe_step(step):
+    """Return a short description of a normalized protocol step"""
+    kind = step["type"]
+    parts = [STEP_LABELS[STEP_TYPES.index(kind)]]
+    if kind == "pulse":
+        parts.append(f"{step['current']:+g}A {step['on_seconds']:g}s on/{step['off_seconds'] or 0:g}s off")
+    elif kind == "cv_hold":
+        parts.append("at limit" if step["voltage"] is None else f"at {step['voltage']:g}V")
+        if step["cutoff_current"] is not None:
+            parts.append(f"to {step['cutoff_current']:g}A")
+    elif kind != "rest":
+        parts.append(f"{step['current']:g}A")
+        parts.append("to limit" if step["voltage"] is None else f"to {step['voltage']:g}V")
+    if step["minutes"] is not None:
+        parts.append(f"{step['minutes']:g} min" if kind in ("rest", "pulse") else f"max {step['minutes']:g} min")
+    return " ".join(parts)
+
+class ProtocolTable:
+    """Per-step settings of a normalized protocol as arrays, indexed by each cell's step.
+
+    Unset settings are NaN. Index len(steps) is an extra rest step without end that
+    cells move to after the last cycle, so per-cell lookups never need a bounds check.
+    """
+
+    def __init__(self, protocol):
+        self.protocol = protocol
+        self.cycles = protocol["cycles"]
+        steps = protocol["steps"] + [{"type": "rest", **dict.fromkeys(STEP_SETTINGS)}]
+        self.num_steps = len(protocol["steps"])
+        self.kind = np.array([STEP_TYPES.index(step["type"]) for step in steps], dtype=np.intp)
+        for name in STEP_SETTINGS:
+            setattr(self, name, np.array([np.nan if step[name] is None else step[name] for step in steps]))
+        self.duration = np.where(np.isnan(self.minutes), np.inf, self.minutes * 60)
+        # Pulse period; other steps never switch, so their period is endless
+        self.period = np.where(np.isnan(self.on_seconds), np.inf, self.on_seconds + np.nan_to_num(self.off_seconds))
+        self.labels = np.array([f"{i + 1}/{self.num_steps} {STEP_LABELS[kind]}"
+                                for i, kind in enumerate(self.kind[:-1])] + [DONE_LABEL], dtype=object)
+
+    def advance(self, step_index, cycle, ended):
+        """Return (step_index, cycle) after the cells flagged `ended` move to their next step"""
+        next_index = step_index + ended
+        wrap = ended & (next_index == self.num_steps) & (cycle + 1 < self.cycles)
+        return np.where(wrap, 0, next_index), cycle + wrap
@@ -0,0 +1,70 @@
+"""Process-wide registry of bench/group acquisition workers"""
+import threading
+import zlib
+
+import numpy as np
+
+from battery_acquisition import AcquisitionWorker
+
+# Registry returned by shared_registry(), created on its first call
+_shared_registry = None
+_shared_registry_lock = threading.Lock()
+
+def bench_seed(root, bench_name, group_num):
+    """Return the SeedSequence of one bench/group: the registry seed keyed by bench name and group"""
+    key = (zlib.crc32(str(bench_name).encode("utf-8")), int(group_num))
+    return np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + key, pool_size=root.pool_size)
+
+class BenchRegistry:
+    """Holds the one authoritative AcquisitionWorker of every bench/group in the process.
+
+    Viewer sessions look workers up here instead of generating data themselves, so
+    sampling cost scales with the number of benches rather than the number of viewers.
+
+    Each bench/group gets its own random stream derived from the registry `seed`, so
+    benches never share or race on a generator.
+    """
+
+    def __init__(self, history_capacity=1000, store_root=None, seed=None):
+        self.history_capacity = history_capacity
+        self.store_root = store_root
+        self.seed = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self._lock = threading.Lock()
+        self._workers = {}
+
+    def get(self, bench_name, group_num):
+        """Return the worker of a bench/group, creating it on first use"""
+        key = (bench_name, int(group_num))
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is None:
+                worker = AcquisitionWorker(
+                    bench_name, key[1], history_capacity=self.history_capacity,
+                    seed=bench_seed(self.seed, bench_name, key[1]), store_root=self.store_root
+                )
+                self._workers[key] = worker
+            return worker
+
+    def workers(self):
+        """Return every registered worker, ordered by bench and group"""
+        with self._lock:
+            return [self._workers[key] for key in sorted(self._workers)]
+
+    def active(self):
+        """Return the (bench_name, group_num) pairs whose cells are initialized"""
+        return [(worker.bench_name, worker.group_num) for worker in self.workers() if worker.cells is not None]
+
+    def remove(self, bench_name, group_num):
+        """Stop a bench/group and drop it from the registry"""
+        with self._lock:
+            worker = self._workers.pop((bench_name, int(group_num)), None)
+        if worker is not None:
+            worker.reset()
+
+def shared_registry(history_capacity=1000, store_root=None):
+    """Return the process-wide BenchRegistry, created with the given settings on the first call"""
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = BenchRegistry(history_capacity=history_capacity, store_root=store_root)
+        return _shared_registry
@@ -0,0 +1,151 @@
+"""Deterministic replay of a cell model run from periodic state checkpoints.
+
+A Replay advances a run's CellModel and keeps only what it needs to recompute any
+sample later: each sample's timestamp and dt, the process parameters in effect and,
+every `checkpoint_samples` samples, a copy of the model state including its noise
+generator. Seeking restores the nearest checkpoint at or before a timestamp into a
+replica model built from the same seed and cells, then steps the replica forward to
+that sample. The replayed readings match the recorded ones bit for bit.
+"""
+import bisect
+import threading
+
+import numpy as np
+
+from battery_model import CellModel
+
+# Samples between checkpoints; a seek re-computes at most this many samples (plus one block)
+REPLAY_CHECKPOINT_SAMPLES = 720
+# Initial capacity of the per-sample timestamp and dt arrays, doubled whenever they fill up
+REPLAY_INITIAL_SAMPLES = 1024
+
+class Replay:
+    """Checkpointed record of one run of `model`, advanced through step() and iter_blocks().
+
+    Samples taken with step() are replayed step by step. A block run checkpoints only
+    between blocks, with the steps it still had to take, so a seek re-runs exactly the
+    blocks (and noise draws) of the original run.
+    """
+
+    def __init__(self, model, checkpoint_samples=REPLAY_CHECKPOINT_SAMPLES):
+        self.model = model
+        self.checkpoint_samples = checkpoint_samples
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._seek_lock = threading.Lock()
+        self._replica = None
+
+        # Timestamps (ns) and dt of every sample in arrays that grow geometrically; recorded
+        # entries are never rewritten, so a seek can search a view without copying it
+        self._timestamps = np.empty(REPLAY_INITIAL_SAMPLES, dtype="datetime64[ns]")
+        self._dts = np.empty(REPLAY_INITIAL_SAMPLES, dtype=np.float64)
+        # (first sample, process parameters) whenever the parameters change
+        self._params = []
+        # (sample, model state before it, (dt, steps left) for block runs or None)
+        self._checkpoints = []
+
+    def __len__(self):
+        return self.samples
+
+    @property
+    def checkpoints(self):
+        return len(self._checkpoints)
+
+    def time_range(self):
+        """Return the first and last sample timestamps as datetime64[ns], or None before any sample"""
+        with self._lock:
+            if not self.samples:
+                return None
+            return self._timestamps[0], self._timestamps[self.samples - 1]
+
+    def _checkpoint(self, block=None):
+        with self._lock:
+            self._checkpoints.append((self.samples, self.model.state(), block))
+
+    def _record(self, timestamps, dts, process_params):
+        with self._lock:
+            if not self._params or self._params[-1][1] != process_params:
+                self._params.append((self.samples, dict(process_params)))
+            end = self.samples + len(timestamps)
+            if end > len(self._timestamps):
+                capacity = max(end, 2 * len(self._timestamps))
+                self._timestamps = np.concatenate(
+                    [self._timestamps[:self.samples], np.empty(capacity - self.samples, dtype="datetime64[ns]")]
+                )
+                self._dts = np.concatenate([self._dts[:self.samples], np.empty(capacity - self.samples)])
+            self._timestamps[self.samples:end] = timestamps
+            self._dts[self.samples:end] = dts
+            self.samples = end
+
+    def step(self, timestamp, dt, process_params):
+        """Advance the model like CellModel.step and record the sample, checkpointing first when due"""
+        last = self._checkpoints[-1] if self._checkpoints else None
+        if last is None or last[2] is not None or self.samples - last[0] >= self.checkpoint_samples:
+            self._checkpoint()
+        readings = self.model.step(dt, process_params)
+        self._record([np.datetime64(timestamp, "ns")], [dt], process_params)
+        return readings
+
+    def iter_blocks(self, timestamps, dt, process_params):
+        """Advance the model through CellModel.iter_blocks, one sample per timestamp.
+
+        Yields (timestamps, readings) per block, recording every block as it is yielded.
+        """
+        timestamps = np.asarray(timestamps, dtype="datetime64[ns]")
+        total = len(timestamps)
+        done = 0
+        self._checkpoint((dt, total))
+        last = self.samples
+        for readings in self.model.iter_blocks(dt, total, process_params):
+            count = len(readings["soc"])
+            block_timestamps = timestamps[done:done + count]
+            self._record(block_timestamps, np.full(count, dt), process_params)
+            done += count
+            yield block_timestamps, readings
+            # The model now holds the state the next block starts from
+            if done < total and self.samples - last >= self.checkpoint_samples:
+                self._checkpoint((dt, total - done))
+                last = self.samples
+
+    def seek(self, timestamp):
+        """Recompute the last sample at or before `timestamp` (the first sample for earlier times).
+
+        Returns (timestamp, readings) with readings as CellModel.step returns them, plus
+        every cell's "protocol_step" label when a protocol was running, or None before
+        any sample was recorded.
+        """
+        with self._lock:
+            if not self.samples:
+                return None
+            timestamps, dts = self._timestamps[:self.samples], self._dts[:self.samples]
+            sample = max(0, int(np.searchsorted(timestamps, np.datetime64(timestamp, "ns"), side="right")) - 1)
+            position = bisect.bisect_right([checkpoint[0] for checkpoint in self._checkpoints], sample) - 1
+            start, state, block = self._checkpoints[position]
+            params = list(self._params)
+        param_starts = [first for first, _ in params]
+
+        def params_at(index):
+            return params[bisect.bisect_right(param_starts, index) - 1][1]
+
+        with self._seek_lock:
+            if self._replica is None:
+                model = self.model
+                self._replica = CellModel(model.type_codes, seed=model.seed, positions=model.positions)
+            replica = self._replica
+            replica.restore(state)
+            if block is None:
+                for index in range(start, sample + 1):
+                    readings = replica.step(dts[index], params_at(index))
+            else:
+                dt, steps = block
+                done = start
+                for readings in replica.iter_blocks(dt, steps, params_at(start)):
+                    done += len(readings["soc"])
+                    if done > sample:
+                        row = sample - done
+                        readings = {name: values[row] for name, values in readings.items()}
+                        break
+            protocol_steps = replica.protocol_steps(params_at(sample))
+        if protocol_steps is not None:
+            readings["protocol_step"] = protocol_steps
+        return timestamps[sample], readings
@@ -0,0 +1,91 @@
+"""Headless accelerated simulation of full battery test runs.
+
+Runs a whole test_duration at sampling_interval resolution as fast as the cell model
+computes, writing every sample to the on-disk history store:
+
+    python battery_simulation.py --cells 1000 --test-duration 24
+    python battery_simulation.py --manifest cells.csv --bench Bench-007 --group 2
+    python battery_simulation.py --protocol cccv.json --test-duration 12
+    python battery_simulation.py --cells 1000 --test-duration 168 --event-driven
+"""
+import argparse
+import os
+import sys
+
+from battery_acquisition import AcquisitionWorker
+from battery_engine import CELL_TYPES
+from battery_manifest import load_manifest
+from battery_protocol import load_protocol
+
+# Same defaults as a bench configured from the dashboard sidebar
+DEFAULT_STORE_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history_store")
+PROCESS_PARAMETER_ARGS = (
+    ("test_duration", 2.0, "Test duration (hours)"),
+    ("charge_rate", 1.0, "Charge rate (A)"),
+    ("discharge_rate", 1.0, "Discharge rate (A)"),
+    ("target_temperature", 25.0, "Target temperature (°C)"),
+    ("sampling_interval", 5.0, "Sampling interval (seconds)"),
+    ("safety_voltage_limit", 4.2, "Safety voltage limit (V)"),
+    ("thermal_columns", 0, "Cell positions per row of the bench layout for thermal coupling (0: off)")
+)
+
+def bench_cells(num_cells, cell_type=None):
+    """Return ids and chemistries of a bench, cycling through every cell type unless one is given"""
+    cell_types = [cell_type or CELL_TYPES[i % len(CELL_TYPES)] for i in range(num_cells)]
+    return [f"Cell_{i+1}_{cell_type}" for i, cell_type in enumerate(cell_types)], cell_types
+
+def print_progress(fraction):
+    """Print a one-line progress indicator to stderr"""
+    print(f"\rSimulating... {fraction:6.1%}", end="", file=sys.stderr, flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate a full battery test run offline")
+    cells = parser.add_mutually_exclusive_group()
+    cells.add_argument("--manifest", help="CSV or JSON cell manifest")
+    cells.add_argument("--cells", type=int, default=16, help="Number of cells when no manifest is given")
+    parser.add_argument("--cell-type", choices=CELL_TYPES, help="Chemistry of every cell (default: mixed)")
+    parser.add_argument("--bench", default="Bench-001", help="Bench name")
+    parser.add_argument("--group", type=int, default=1, help="Group number")
+    parser.add_argument("--store-root", default=DEFAULT_STORE_ROOT, help="History store directory")
+    parser.add_argument("--seed", type=int, help="Bench seed; the same seed and cells reproduce the run")
+    parser.add_argument("--protocol", help="JSON test protocol (default: constant charge/discharge rates)")
+    parser.add_argument("--event-driven", action="store_true",
+                        help="Jump between threshold crossings and store the trajectory instead of every sample")
+    for name, default, help_text in PROCESS_PARAMETER_ARGS:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=default, help=help_text)
+    args = parser.parse_args(argv)
+
+    if args.manifest:
+        with open(args.manifest, "rb") as f:
+            manifest = load_manifest(f.read(), args.manifest)
+        cell_ids, cell_types = manifest["cell_id"].tolist(), manifest["cell_type"].tolist()
+        positions = manifest["position"].to_numpy()
+    else:
+        cell_ids, cell_types = bench_cells(args.cells, args.cell_type)
+        positions = None
+
+    process_params = {name: getattr(args, name) for name, _, _ in PROCESS_PARAMETER_ARGS}
+    if args.protocol:
+        with open(args.protocol, "rb") as f:
+            process_params["protocol"] = load_protocol(f.read(), args.protocol)
+
+    worker = AcquisitionWorker(args.bench, args.group, seed=args.seed, store_root=args.store_root)
+    worker.set_process_parameters(process_params)
+    worker.initialize(cell_ids, cell_types, positions)
+    try:
+        stats = worker.simulate(progress=print_progress, event_driven=args.event_driven)
+    except ValueError as e:
+        parser.error(str(e))
+    print(file=sys.stderr)
+
+    print(f"Run {stats['run_id']} in {worker.store.directory}")
+    print(f"{stats['samples']} samples x {stats['cells']} cells ({stats['simulated_hours']:.2f} h simulated) "
+          f"in {stats['elapsed_seconds']:.2f} s")
+    if "events" in stats:
+        print(f"{stats['events']} events, {stats['segments']} trajectory segments")
+    print(f"{stats['samples_per_second']:,.0f} samples/s, {stats['cell_samples_per_second']:,.0f} cell samples/s "
+          f"({stats['speedup']:,.0f}x real time)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""Append-only on-disk history store for long battery tests"""
+import json
+import os
+import threading
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from battery_events import EventTimeline
+from battery_history import HISTORY_METRICS
+
+# Partition directories hold one hour of samples each
+PARTITION_NS = 3600 * 10**9
+PARTITION_FORMAT = "%Y%m%d_%H"
+# File holding the trajectory of an event-driven run in place of sample partitions
+TIMELINE_FILE = "timeline.npz"
+
+def _safe_name(name):
+    """Make a bench name usable as a directory name"""
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in str(name)) or "bench"
+
+def run_directory(root, bench_name, group_num, run_id):
+    """Return the directory holding one test run of a bench and group"""
+    return os.path.join(root, _safe_name(bench_name), f"group_{group_num}", run_id)
+
+def list_runs(root, bench_name, group_num):
+    """Return the run ids stored for a bench and group, oldest first"""
+    group_dir = os.path.join(root, _safe_name(bench_name), f"group_{group_num}")
+    if not os.path.isdir(group_dir):
+        return []
+    return sorted(name for name in os.listdir(group_dir)
+                  if os.path.isfile(os.path.join(group_dir, name, "cells.json")))
+
+class HistoryStore:
+    """Append-only Parquet history for one test run, partitioned by bench, group and hour.
+
+    Samples are buffered in memory and written in batches of `flush_samples`, one file
+    per hour partition touched by the batch. Rows are stored sample-major (every cell of
+    a sample in cell order), so a time-range query reshapes straight back into
+    (samples x cells) arrays. Only the unflushed batch is kept in RAM.
+
+    The cell table is saved with the run, together with the entropy and spawn key of
+    the SeedSequence the run was simulated from when `seed` is given. An event-driven
+    run saves its EventTimeline instead of samples, and reads evaluate it on demand;
+    samples appended after it (live sampling resumed on the run) are read after it.
+    """
+
+    def __init__(self, root, bench_name, group_num, run_id, cell_ids, cell_types, flush_samples=60, seed=None):
+        self.directory = run_directory(root, bench_name, group_num, run_id)
+        self.run_id = run_id
+        self.cell_ids = list(cell_ids)
+        self.cell_types = list(cell_types)
+        self.flush_samples = flush_samples
+        self._lock = threading.Lock()
+        self._pending_timestamps = []
+        self._pending = {name: [] for name in HISTORY_METRICS + ("status_code",)}
+
+        os.makedirs(self.directory, exist_ok=True)
+        cells = {"cell_ids": self.cell_ids, "cell_types": self.cell_types}
+        if seed is not None:
+            cells["seed"] = {"entropy": seed.entropy, "spawn_key": list(seed.spawn_key)}
+        with open(os.path.join(self.directory, "cells.json"), "w") as f:
+            json.dump(cells, f)
+        timeline_path = os.path.join(self.directory, TIMELINE_FILE)
+        self.timeline = EventTimeline.load(timeline_path) if os.path.exists(timeline_path) else None
+
+    @classmethod
+    def open(cls, root, bench_name, group_num, run_id, flush_samples=60):
+        """Open an existing run using the cell table saved with it"""
+        with open(os.path.join(run_directory(root, bench_name, group_num, run_id), "cells.json")) as f:
+            cells = json.load(f)
+        seed = cells.get("seed")
+        if seed is not None:
+            seed = np.random.SeedSequence(seed["entropy"], spawn_key=tuple(seed["spawn_key"]))
+        return cls(root, bench_name, group_num, run_id, cells["cell_ids"], cells["cell_types"], flush_samples, seed)
+
+    def append(self, timestamp, batch):
+        """Queue one tick of SAMPLE_DTYPE records, writing to disk once a full batch is pending"""
+        with self._lock:
+            self._pending_timestamps.append(np.datetime64(timestamp, "ns"))
+            for name in self._pending:
+                self._pending[name].append(np.asarray(batch[name]))
+            if len(self._pending_timestamps) >= self.flush_samples:
+                self._flush_locked()
+
+    def append_block(self, timestamps, records):
+        """Write a block of samples straight to disk: timestamps and (samples x cells) SAMPLE_DTYPE records"""
+        with self._lock:
+            self._flush_locked()
+            self._write_locked(
+                np.asarray(timestamps, dtype="datetime64[ns]"),
+                {name: records[name] for name in self._pending}
+            )
+
+    def write_timeline(self, timeline):
+        """Save the EventTimeline of an event-driven run; its samples are evaluated from it on every read.
+
+        The timeline must start the run: samples already on disk are read after it.
+        """
+        with self._lock:
+            timeline.save(os.path.join(self.directory, TIMELINE_FILE))
+            self.timeline = timeline
+
+    def flush(self):
+        """Write any pending samples to disk"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending_timestamps:
+            return
+        timestamps = np.array(self._pending_timestamps, dtype="datetime64[ns]")
+        columns = {name: np.stack(values) for name, values in self._pending.items()}
+        self._pending_timestamps = []
+        self._pending = {name: [] for name in self._pending}
+        self._write_locked(timestamps, columns)
+
+    def _write_locked(self, timestamps, columns):
+        """Write (samples x cells) columns to one file per hour partition they cover"""
+        # Split the batch at hour boundaries so every file lives in the partition it covers
+        hours = timestamps.astype(np.int64) // PARTITION_NS
+        boundaries = np.flatnonzero(np.diff(hours)) + 1
+        for part in np.split(np.arange(len(timestamps)), boundaries):
+            part_timestamps = timestamps[part]
+            partition = part_timestamps[0].astype("datetime64[s]").item().strftime(PARTITION_FORMAT)
+            partition_dir = os.path.join(self.directory, partition)
+            os.makedirs(partition_dir, exist_ok=True)
+
+            num_cells = len(self.cell_ids)
+            table = pa.table({
+                "timestamp": pa.array(np.repeat(part_timestamps, num_cells)),
+                "cell_index": pa.array(np.tile(np.arange(num_cells, dtype=np.int32), len(part))),
+                **{name: pa.array(columns[name][part].ravel()) for name in columns}
+            })
+            path = os.path.join(partition_dir, f"part-{part_timestamps[0].astype(np.int64)}.parquet")
+            pq.write_table(table, path)
+
+    def _partition_files(self, start, end):
+        """List data files whose hour partition overlaps [start, end], in time order"""
+        files = []
+        for partition in sorted(os.listdir(self.directory)):
+            partition_dir = os.path.join(self.directory, partition)
+            if not os.path.isdir(partition_dir):
+                continue
+            hour_start = np.datetime64(
+                f"{partition[:4]}-{partition[4:6]}-{partition[6:8]}T{partition[9:11]}", "ns"
+            )
+            if end is not None and hour_start > end:
+                continue
+            if start is not None and hour_start + np.timedelta64(PARTITION_NS, "ns") <= start:
+                continue
+            files.extend(os.path.join(partition_dir, name) for name in sorted(os.listdir(partition_dir)))
+        return files
+
+    def iter_chunks(self, metrics=HISTORY_METRICS):
+        """Yield (timestamps, {metric: samples x cells}) one data file at a time, oldest first.
+
+        Pending samples are flushed first; samples appended while iterating are not included.
+        The samples of an event-driven run's timeline come first, followed by any appended after it.
+        """
+        if self.timeline is not None:
+            yield from self.timeline.iter_chunks(metrics)
+        num_cells = len(self.cell_ids)
+        with self._lock:
+            self._flush_locked()
+            files = self._partition_files(None, None)
+        for path in files:
+            table = pq.read_table(path, columns=["timestamp", *metrics])
+            timestamps = table.column("timestamp").to_numpy()[::num_cells].astype("datetime64[ns]")
+            yield timestamps, {name: table.column(name).to_numpy().reshape(-1, num_cells) for name in metrics}
+
+    def iter_range(self, start=None, end=None, metrics=HISTORY_METRICS):
+        """Yield (timestamps, {metric: samples x cells}) for samples within [start, end] one data file at a time.
+
+        Unlike iter_chunks, pending samples are read from memory without being flushed,
+        as the last chunk, so frequent readers do not split the store into tiny files.
+        """
+        if self.timeline is not None:
+            yield from self.timeline.iter_chunks(metrics, start=start, end=end)
+        start = None if start is None else np.datetime64(start, "ns")
+        end = None if end is None else np.datetime64(end, "ns")
+        num_cells = len(self.cell_ids)
+
+        with self._lock:
+            pending_timestamps = np.array(self._pending_timestamps, dtype="datetime64[ns]")
+            pending = {name: np.stack(self._pending[name]) if self._pending[name] else np.empty((0, num_cells))
+                       for name in metrics}
+            files = self._partition_files(start, end)
+
+        def in_range(timestamps, columns):
+            mask = np.ones(len(timestamps), dtype=bool)
+            if start is not None:
+                mask &= timestamps >= start
+            if end is not None:
+                mask &= timestamps <= end
+            return timestamps[mask], {name: values[mask] for name, values in columns.items()}
+
+        for path in files:
+            table = pq.read_table(path, columns=["timestamp", *metrics])
+            timestamps, columns = in_range(
+                table.column("timestamp").to_numpy()[::num_cells].astype("datetime64[ns]"),
+                {name: table.column(name).to_numpy().reshape(-1, num_cells) for name in metrics}
+            )
+            if len(timestamps):
+                yield timestamps, columns
+        timestamps, columns = in_range(pending_timestamps, pending)
+        if len(timestamps):
+            yield timestamps, columns
+
+    def query(self, start=None, end=None, metrics=HISTORY_METRICS):
+        """Return (timestamps, {metric: samples x cells}) for samples within [start, end]"""
+        chunks = list(self.iter_range(start, end, metrics))
+        if not chunks:
+            return np.array([], dtype="datetime64[ns]"), {name: np.empty((0, len(self.cell_ids))) for name in metrics}
+        return (np.concatenate([timestamps for timestamps, _ in chunks]),
+                {name: np.concatenate([columns[name] for _, columns in chunks]) for name in metrics})
@@ -0,0 +1,236 @@
+"""Parameter sweeps: the cell model run for every combination of process parameters.
+
+Each combination simulates a full test (see CellModel.iter_blocks) in a worker
+process; results are collected into one row per combination and can be reshaped
+into a cube over the sweep axes:
+
+    python battery_sweep.py --charge-rates 0.5:3:6 --discharge-rates 0.5:3:6 \\
+        --target-temperatures 15:45:4 --output sweep.csv
+"""
+import argparse
+import importlib
+import itertools
+import multiprocessing
+import os
+import pickle
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from battery_engine import CELL_TYPES, STATUS_CRITICAL, STATUS_WARNING, cell_type_codes
+from battery_model import CellModel, spawn_seeds
+
+# Axes of the results cube, in cube dimension order
+SWEEP_AXES = ("cell_type", "charge_rate", "discharge_rate", "target_temperature")
+# Per-combination results, averaged over the cells of the combination
+SWEEP_METRICS = ("final_health", "mean_health", "warning_hours", "critical_hours", "peak_temperature")
+# Cells simulated per combination
+SWEEP_CELLS = 16
+# Only command line argument of the process run_in_pool hosts its worker pool in
+POOL_HOST_ARGUMENT = "--pool-host"
+
+def sweep_values(low, high, points):
+    """Return `points` evenly spaced parameter values from low to high, rounded to 0.01"""
+    return np.round(np.linspace(low, high, max(1, int(points))), 2).tolist()
+
+def parse_values(spec):
+    """Parse a comma separated list of values or a low:high:points range"""
+    if ":" in spec:
+        low, high, points = spec.split(":")
+        return sweep_values(float(low), float(high), int(points))
+    return [float(value) for value in spec.split(",")]
+
+def pool_context():
+    """Return the multiprocessing context pool workers are started from.
+
+    Workers start from a fork server where the platform has one and are spawned
+    otherwise, never forked from the caller: a fork copies every lock the caller's other
+    threads hold at that moment (allocator, logging and import locks among them), and
+    a worker forked from a multithreaded process such as the Streamlit server can wait
+    on one of them forever.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+def importable_name(function):
+    """Return the (module, qualified name) a module-level function is imported by in another process"""
+    module = function.__module__
+    if module == "__main__":
+        # A function of a script run directly is imported from the script's module
+        module = os.path.splitext(os.path.basename(sys.modules["__main__"].__file__))[0]
+    return module, function.__qualname__
+
+def host_pool(source, output):
+    """Serve one run_in_pool call: read it from `source` and write (index, result, error) records to `output`.
+
+    Tasks stop at the first error. A caller that stops reading cancels the tasks not
+    yet started.
+    """
+    (module, name), tasks, processes = pickle.load(source)
+    function = getattr(importlib.import_module(module), name)
+    with ProcessPoolExecutor(max_workers=processes, mp_context=pool_context()) as pool:
+        futures = {pool.submit(function, *task): index for index, task in enumerate(tasks)}
+        try:
+            for future in as_completed(futures):
+                error = future.exception()
+                pickle.dump((futures[future], None if error else future.result(), error), output)
+                output.flush()
+                if error is not None:
+                    break
+        except BrokenPipeError:
+            pass
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+def serve_pool():
+    """Entry point of the pool host process started by run_in_pool"""
+    # Workers inherit stdout; their output goes to stderr so it cannot corrupt the records
+    output = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    with output:
+        host_pool(sys.stdin.buffer, output)
+    return 0
+
+def run_in_pool(function, tasks, processes=None, progress=None):
+    """Call function(*task) for every task across worker processes and return the results in task order.
+
+    `processes` defaults to one per CPU; 1 runs the tasks in this process. `progress`,
+    when given, is called with the completed fraction as results arrive. `function`
+    must be defined at module level.
+
+    The pool lives in a `battery_sweep.py --pool-host` process. Fork server and spawned
+    workers re-run the main module of the process that starts them, and under Streamlit
+    that module is the whole dashboard; in the host it is this module, which only
+    sweeps when run as a script.
+    """
+    results = [None] * len(tasks)
+
+    def collect(index, value, done):
+        results[index] = value
+        if progress is not None:
+            progress(done / len(tasks))
+
+    if processes == 1:
+        for index, task in enumerate(tasks):
+            collect(index, function(*task), index + 1)
+        return results
+
+    host = subprocess.Popen([sys.executable, os.path.abspath(__file__), POOL_HOST_ARGUMENT],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    with host:
+        pickle.dump((importable_name(function), tasks, processes), host.stdin)
+        host.stdin.close()
+        for done in range(1, len(tasks) + 1):
+            try:
+                index, value, error = pickle.load(host.stdout)
+            except EOFError:
+                raise RuntimeError(f"Worker pool exited with code {host.wait()} before finishing") from None
+            if error is not None:
+                raise error
+            collect(index, value, done)
+    return results
+
+def simulate_combination(cell_type, charge_rate, discharge_rate, target_temperature, process_params,
+                         num_cells=SWEEP_CELLS, seed=None):
+    """Simulate one combination for the full test_duration and return its SWEEP_METRICS"""
+    process_params = {**process_params, "charge_rate": charge_rate, "discharge_rate": discharge_rate,
+                      "target_temperature": target_temperature}
+    interval = float(process_params.get("sampling_interval", 5))
+    steps = max(1, int(process_params.get("test_duration", 0) * 3600 // interval))
+    model = CellModel(
+        cell_type_codes([cell_type] * num_cells), seed=seed,
+        ambient_temperature=target_temperature
+    )
+
+    health_sum = 0.0
+    warning_samples = critical_samples = 0
+    peak_temperature = -np.inf
+    for readings in model.iter_blocks(interval, steps, process_params):
+        health_sum += readings["health"].sum()
+        warning_samples += np.count_nonzero(readings["status_code"] == STATUS_WARNING)
+        critical_samples += np.count_nonzero(readings["status_code"] == STATUS_CRITICAL)
+        peak_temperature = max(peak_temperature, float(readings["temperature"].max()))
+        final_health = float(readings["health"][-1].mean())
+
+    cell_hours = interval / 3600 / num_cells
+    return {
+        "final_health": final_health,
+        "mean_health": health_sum / (steps * num_cells),
+        "warning_hours": warning_samples * cell_hours,
+        "critical_hours": critical_samples * cell_hours,
+        "peak_temperature": peak_temperature
+    }
+
+def run_sweep(cell_types, charge_rates, discharge_rates, target_temperatures, process_params,
+              num_cells=SWEEP_CELLS, processes=None, seed=0, progress=None):
+    """Simulate every combination of the given values and return one result row per combination.
+
+    Combinations run in a pool of `processes` worker processes (default: one per CPU;
+    1 runs them in this process). Every combination gets its own random stream spawned
+    from `seed`, so results do not depend on scheduling. `progress`, when given, is
+    called with the completed fraction.
+
+    Combinations run at constant rates: a test protocol in `process_params` would set
+    the current itself and leave the rate axes without effect, so it is dropped.
+    """
+    combinations = list(itertools.product(cell_types, charge_rates, discharge_rates, target_temperatures))
+    seeds = spawn_seeds(np.random.SeedSequence(seed), len(combinations))
+    process_params = {name: value for name, value in process_params.items() if name != "protocol"}
+    metrics = run_in_pool(
+        simulate_combination,
+        [(*combination, process_params, num_cells, seeds[index]) for index, combination in enumerate(combinations)],
+        processes, progress
+    )
+    rows = [{**dict(zip(SWEEP_AXES, combination)), **values} for combination, values in zip(combinations, metrics)]
+    return pd.DataFrame(rows, columns=[*SWEEP_AXES, *SWEEP_METRICS])
+
+def sweep_cube(results, metric):
+    """Reshape one metric of run_sweep results into a cube over SWEEP_AXES.
+
+    Returns (axes, cube): the values along each axis, in sweep order, and the array
+    indexed [cell_type, charge_rate, discharge_rate, target_temperature].
+    """
+    axes = {name: pd.unique(results[name]) for name in SWEEP_AXES}
+    index = pd.MultiIndex.from_product(axes.values(), names=SWEEP_AXES)
+    values = results.set_index(list(SWEEP_AXES))[metric].reindex(index).to_numpy()
+    return axes, values.reshape([len(values) for values in axes.values()])
+
+def print_progress(fraction):
+    """Print a one-line progress indicator to stderr"""
+    print(f"\rSweeping... {fraction:6.1%}", end="", file=sys.stderr, flush=True)
+
+def main(argv=None):
+    if (sys.argv[1:] if argv is None else argv) == [POOL_HOST_ARGUMENT]:
+        return serve_pool()
+    parser = argparse.ArgumentParser(description="Sweep the cell model over process parameter combinations")
+    parser.add_argument("--cell-types", nargs="+", choices=CELL_TYPES, default=CELL_TYPES, help="Chemistries")
+    parser.add_argument("--charge-rates", type=parse_values, default="0.5:3:6",
+                        help="Charge rates (A) as a,b,c or low:high:points")
+    parser.add_argument("--discharge-rates", type=parse_values, default="0.5:3:6",
+                        help="Discharge rates (A) as a,b,c or low:high:points")
+    parser.add_argument("--target-temperatures", type=parse_values, default="15:45:4",
+                        help="Target temperatures (°C) as a,b,c or low:high:points")
+    parser.add_argument("--test-duration", type=float, default=2.0, help="Test duration (hours)")
+    parser.add_argument("--sampling-interval", type=float, default=5.0, help="Sampling interval (seconds)")
+    parser.add_argument("--cells", type=int, default=SWEEP_CELLS, help="Cells per combination")
+    parser.add_argument("--processes", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the per-combination random streams")
+    parser.add_argument("--output", default="sweep_results.csv", help="CSV file for the results")
+    args = parser.parse_args(argv)
+
+    process_params = {"test_duration": args.test_duration, "sampling_interval": args.sampling_interval}
+    results = run_sweep(
+        args.cell_types, args.charge_rates, args.discharge_rates, args.target_temperatures, process_params,
+        num_cells=args.cells, processes=args.processes, seed=args.seed, progress=print_progress
+    )
+    print(file=sys.stderr)
+    results.to_csv(args.output, index=False)
+    print(f"{len(results)} combinations written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
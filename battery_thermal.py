@@ -0,0 +1,73 @@
+"""Heat exchange between neighbouring cells of a bench layout.
+
+Cells sit on a grid of `columns` positions per row: position p is in row (p - 1) // columns
+and column (p - 1) % columns. Every cell exchanges heat with the cells directly beside,
+above and below it, at a rate proportional to their temperature difference.
+"""
+import math
+
+import numpy as np
+
+# Time constant (s) over which two neighbouring cells even out their temperature difference
+THERMAL_COUPLING_TIME_CONSTANT = 1800.0
+# Largest share of a neighbour difference exchanged per explicit sub-step, which keeps
+# the diffusion step stable for any dt
+MAX_DIFFUSION_FRACTION = 0.2
+
+def layout_slots(positions, columns):
+    """Return the (row, column) of every cell on a bench layout `columns` positions wide"""
+    slots = np.asarray(positions, dtype=np.int64) - 1
+    return slots // columns, slots % columns
+
+def layout_grid(positions, columns, values):
+    """Arrange per-cell values on the bench layout as a (rows x columns) array, NaN where no cell sits"""
+    rows, cols = layout_slots(positions, columns)
+    grid = np.full((rows.max() - rows.min() + 1, columns), np.nan)
+    grid[rows - rows.min(), cols] = values
+    return grid
+
+class ThermalGrid:
+    """Neighbour pairs of a bench layout and the diffusion step between them.
+
+    The pairs are the edge list of the layout's adjacency graph. A diffusion step applies
+    its graph Laplacian with two bincounts over the edges, so it costs O(cells) however
+    large the bench is.
+    """
+
+    def __init__(self, positions, columns, time_constant=THERMAL_COUPLING_TIME_CONSTANT):
+        self.columns = int(columns)
+        self.time_constant = time_constant
+        rows, cols = layout_slots(positions, self.columns)
+        slots = rows * self.columns + cols
+        n = len(slots)
+
+        order = np.argsort(slots, kind="stable")
+        sorted_slots = slots[order]
+
+        def cell_at(candidates):
+            found = np.minimum(np.searchsorted(sorted_slots, candidates), n - 1)
+            return np.where(sorted_slots[found] == candidates, order[found], -1)
+
+        right = np.where(cols < self.columns - 1, cell_at(slots + 1), -1)
+        below = cell_at(slots + self.columns)
+        cells = np.arange(n)
+        self.first = np.concatenate([cells[right >= 0], cells[below >= 0]])
+        self.second = np.concatenate([right[right >= 0], below[below >= 0]])
+        self.num_cells = n
+        self.degree = np.bincount(np.concatenate([self.first, self.second]), minlength=n)
+
+    def __len__(self):
+        return len(self.first)
+
+    def step(self, temperature, dt):
+        """Return the temperatures after neighbouring cells exchanged heat for dt seconds"""
+        if not len(self) or dt <= 0:
+            return temperature
+        rate = dt / self.time_constant
+        substeps = max(1, math.ceil(rate * self.degree.max() / MAX_DIFFUSION_FRACTION))
+        fraction = rate / substeps
+        for _ in range(substeps):
+            flow = (temperature[self.second] - temperature[self.first]) * fraction
+            temperature = (temperature + np.bincount(self.first, flow, self.num_cells)
+                           - np.bincount(self.second, flow, self.num_cells))
+        return temperature
@@ -3,12 +3,101 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import random
-import time
 from datetime import datetime, timedelta
 import numpy as np
 import io
-import base64
+import os
+import tempfile
+import time
+
+from battery_downsample import DOWNSAMPLE_MODES, BucketDownsampler
+from battery_engine import CELL_CONFIGS
+from battery_history import RunningStats
+from battery_fleet import ALERT_TEMPERATURE, alert_mask, group_summary, next_alert_time, rollup
+from battery_manifest import MANIFEST_COLUMNS, load_manifest
+from battery_pack import pack_topology, topology_label
+from battery_protocol import PROTOCOL_PRESETS, describe_step, load_protocol, validate_protocol
+from battery_thermal import layout_grid
+from battery_montecarlo import MONTE_CARLO_LEVEL, REPLICATE_METRICS, replicate_bands, run_replicates
+from battery_registry import shared_registry
+from battery_sweep import SWEEP_METRICS, run_sweep, sweep_cube, sweep_values
+from battery_export import (
+    EXPORT_COLUMNS, EXPORT_FORMATS, EXPORT_PART_ROWS, export_current_binary, export_parts, export_to_csv,
+    prune_exports, write_historical_export
+)
+
+# Number of samples kept in the in-memory history ring buffer
+HISTORY_CAPACITY = 1000
+# Process parameters of a bench that no session has configured yet
+DEFAULT_PROCESS_PARAMETERS = {
+    'test_duration': 2.0,
+    'charge_rate': 1.0,
+    'discharge_rate': 1.0,
+    'target_temperature': 25,
+    'sampling_interval': 5,
+    'safety_voltage_limit': 4.2,
+    'thermal_columns': 0,
+    'protocol': None
+}
+# Protocol choices besides the presets: constant rates (no protocol) and an uploaded file
+CONSTANT_RATES = "Constant Rates"
+CUSTOM_PROTOCOL = "Custom (JSON)"
+# Directory of the on-disk history store holding complete test runs
+HISTORY_STORE_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history_store")
+# Directory historical exports are written into before download; each download gets its
+# own temporary directory there, removed once the file has been read
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "exports")
+
+# Historical trend panels: (metric, trace suffix, subplot title, axis title, row, column)
+TREND_PANELS = [
+    ("voltage", "V", "⚡ Voltage Trends", "Voltage (V)", 1, 1),
+    ("current", "I", "🔄 Current Trends", "Current (A)", 1, 2),
+    ("temperature", "T", "🌡️ Temperature Trends", "Temperature (°C)", 2, 1),
+    ("health", "H", "💚 Health Trends", "Health (%)", 2, 2)
+]
+TREND_COLORS = ['#00ff88', '#ff416c', '#f093fb', '#667eea', '#ffa726', '#ab47bc', '#26c6da', '#66bb6a']
+# Trend ranges: (label, samples from memory, hours from the history store); neither means the entire test
+TREND_RANGES = [
+    ("100 samples", 100, None),
+    ("500 samples", 500, None),
+    ("1 hour", None, 1),
+    ("6 hours", None, 6),
+    ("24 hours", None, 24),
+    ("Entire test", None, None)
+]
+# Maximum points drawn per trend trace after downsampling
+TREND_MAX_POINTS = 1000
+# Larger benches plot min/mean/max envelopes across cells, or one page of this many cells
+TREND_MAX_CELLS = len(TREND_COLORS)
+# Envelope traces of a trend panel: (statistic, line width, dash)
+TREND_ENVELOPE = [("Min", 1, "dot"), ("Mean", 3, "solid"), ("Max", 1, "dot")]
+
+# Health gauge grid layout
+GAUGE_COLUMNS = 4
+GAUGE_ROW_HEIGHT = 260
+GAUGES_PER_PAGE = 32
+# Summary table columns of the fleet view, per aggregation level
+FLEET_COLUMNS = ["groups", "running", "cells", "excellent", "good", "warning", "critical",
+                 "alerts", "avg_health", "avg_voltage", "total_power"]
+FLEET_GROUP_COLUMNS = ["group", "state", "cells", "excellent", "good", "warning", "critical",
+                       "alerts", "avg_health", "avg_voltage", "total_power", "last_sample"]
+FLEET_CELL_COLUMNS = ["cell_id", "cell_type", "position", "alert", "status", "health", "voltage",
+                      "temperature", "power"]
+# Parameter sweep inputs: (process parameter, label, slider bounds, default range, default points, step)
+SWEEP_RANGES = [
+    ("charge_rate", "Charge Rate (A)", (0.0, 10.0), (0.5, 3.0), 6, 0.1),
+    ("discharge_rate", "Discharge Rate (A)", (0.0, 10.0), (0.5, 3.0), 6, 0.1),
+    ("target_temperature", "Target Temperature (°C)", (-40.0, 80.0), (15.0, 45.0), 4, 1.0)
+]
+# Status colors of the Monte Carlo status count bands
+STATUS_COLORS = {"Excellent": "#00ff88", "Good": "#667eea", "Warning": "#f093fb", "Critical": "#ff416c"}
+GAUGE_STEPS = [
+    {'range': [0, 25], 'color': "rgba(255, 65, 108, 0.2)"},
+    {'range': [25, 50], 'color': "rgba(240, 147, 251, 0.2)"},
+    {'range': [50, 75], 'color': "rgba(102, 126, 234, 0.2)"},
+    {'range': [75, 90], 'color': "rgba(17, 153, 142, 0.2)"},
+    {'range': [90, 100], 'color': "rgba(0, 255, 136, 0.3)"}
+]
 
 # Page configuration
 st.set_page_config(
@@ -239,60 +328,98 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Initialize session state
-if 'cells_data' not in st.session_state:
-    st.session_state.cells_data = {}
-if 'historical_data' not in st.session_state:
-    st.session_state.historical_data = []
-if 'is_monitoring' not in st.session_state:
-    st.session_state.is_monitoring = False
-if 'process_start_time' not in st.session_state:
-    st.session_state.process_start_time = None
 if 'process_parameters' not in st.session_state:
     st.session_state.process_parameters = {}
 if 'total_test_duration' not in st.session_state:
     st.session_state.total_test_duration = 0
 if 'elapsed_time' not in st.session_state:
     st.session_state.elapsed_time = 0
+if 'completion_announced' not in st.session_state:
+    st.session_state.completion_announced = False
+if 'sweep_results' not in st.session_state:
+    st.session_state.sweep_results = None
+if 'monte_carlo_results' not in st.session_state:
+    st.session_state.monte_carlo_results = None
+if 'pack_parallel' not in st.session_state:
+    st.session_state.pack_parallel = 1
+if 'protocol_choice' not in st.session_state:
+    st.session_state.protocol_choice = CONSTANT_RATES
+# Bench inputs are seeded here rather than through widget defaults so that joining a
+# running bench can set them
+if 'bench_name' not in st.session_state:
+    st.session_state.bench_name = "Bench-001"
+if 'group_num' not in st.session_state:
+    st.session_state.group_num = 1
 
-# Cell type configurations with enhanced colors
-CELL_CONFIGS = {
-    "LFP": {
-        "nominal_voltage": 3.2,
-        "min_voltage": 2.8,
-        "max_voltage": 3.6,
-        "color": "#00ff88",
-        "gradient": "linear-gradient(135deg, #11998e 0%, #38ef7d 100%)",
-        "capacity_range": (2.5, 3.5),
-        "temp_range": (-20, 60)
-    },
-    "NMC": {
-        "nominal_voltage": 3.6,
-        "min_voltage": 3.2,
-        "max_voltage": 4.0,
-        "color": "#ff6b6b",
-        "gradient": "linear-gradient(135deg, #ff416c 0%, #ff4b2b 100%)",
-        "capacity_range": (2.8, 3.2),
-        "temp_range": (-10, 50)
-    },
-    "LTO": {
-        "nominal_voltage": 2.4,
-        "min_voltage": 1.5,
-        "max_voltage": 2.8,
-        "color": "#ffa726",
-        "gradient": "linear-gradient(135deg, #f093fb 0%, #f5576c 100%)",
-        "capacity_range": (1.8, 2.8),
-        "temp_range": (-30, 55)
-    },
-    "LiCoO2": {
-        "nominal_voltage": 3.7,
-        "min_voltage": 3.0,
-        "max_voltage": 4.2,
-        "color": "#ab47bc",
-        "gradient": "linear-gradient(135deg, #667eea 0%, #764ba2 100%)",
-        "capacity_range": (2.0, 3.0),
-        "temp_range": (0, 45)
-    }
-}
+def get_bench_registry():
+    """Return the registry of acquisition workers shared by every session in this process"""
+    return shared_registry(history_capacity=HISTORY_CAPACITY, store_root=HISTORY_STORE_ROOT)
+
+def get_acquisition_worker(bench_name, group_num):
+    """Return the acquisition worker shared by every session viewing this bench and group"""
+    return get_bench_registry().get(bench_name, group_num)
+
+def sync_process_parameters(workers):
+    """Load the shared process parameters of the viewed workers into this session's widgets.
+
+    Runs only when the workers' parameters changed since this session last saw them (or
+    the session switched benches). Workers nobody has configured yet take this session's
+    current values instead.
+    """
+    versions = [worker.params_version for worker in workers]
+    if st.session_state.get("params_versions") == versions:
+        return
+    shared = next((worker.process_params for worker in workers if worker.process_params), None)
+    if shared:
+        params = {**DEFAULT_PROCESS_PARAMETERS, **shared}
+    else:
+        params = {name: st.session_state.get(f"param_{name}", default)
+                  for name, default in DEFAULT_PROCESS_PARAMETERS.items()}
+    for name, value in params.items():
+        st.session_state[f"param_{name}"] = value
+    st.session_state.protocol_choice = protocol_choice(params['protocol'])
+    for worker in workers:
+        worker.set_process_parameters(params)
+    st.session_state.params_versions = [worker.params_version for worker in workers]
+
+def apply_process_parameters(workers):
+    """Push this session's process parameter widgets to the shared workers"""
+    params = {name: st.session_state[f"param_{name}"] for name in DEFAULT_PROCESS_PARAMETERS}
+    for worker in workers:
+        worker.set_process_parameters(params)
+    st.session_state.params_versions = [worker.params_version for worker in workers]
+
+def protocol_choice(protocol):
+    """Return the protocol selector option matching a protocol process parameter"""
+    if protocol is None:
+        return CONSTANT_RATES
+    return next((name for name, preset in PROTOCOL_PRESETS.items() if validate_protocol(preset) == protocol),
+                CUSTOM_PROTOCOL)
+
+def select_protocol(workers):
+    """Run the protocol picked in the sidebar; a custom protocol waits for its file"""
+    choice = st.session_state.protocol_choice
+    if choice == CUSTOM_PROTOCOL:
+        return
+    st.session_state.param_protocol = None if choice == CONSTANT_RATES else validate_protocol(PROTOCOL_PRESETS[choice])
+    apply_process_parameters(workers)
+
+def join_running_bench(running_benches):
+    """Switch the bench and group inputs to the running bench picked in the sidebar"""
+    selected = st.session_state.join_bench
+    if selected is not None:
+        st.session_state.bench_name, st.session_state.group_num = running_benches[selected]
+    st.session_state.join_bench = None
+
+@st.cache_data(show_spinner=False)
+def load_cell_manifest(data, filename):
+    """Validate an uploaded cell manifest once per distinct file"""
+    return load_manifest(data, filename)
+
+@st.cache_data(show_spinner=False)
+def load_test_protocol(data, filename):
+    """Validate an uploaded test protocol once per distinct file"""
+    return load_protocol(data, filename)
 
 def get_battery_icon(health):
     """Return battery icon based on health percentage"""
@@ -329,458 +456,131 @@ def get_status_class(status):
     else:
         return "status-critical"
 
-def generate_cell_data(cell_type, cell_id, current_time, process_params=None):
-    """Generate realistic battery cell data with enhanced status based on process parameters"""
-    config = CELL_CONFIGS[cell_type]
-    
-    # Apply process parameters if available
-    if process_params:
-        # Simulate effects of process parameters
-        voltage_offset = 0
-        temp_offset = 0
-        
-        # Charging/Discharging rate effects
-        if process_params.get('charge_rate', 0) > 2:
-            voltage_offset += random.uniform(0.02, 0.05)
-            temp_offset += random.uniform(2, 5)
-        elif process_params.get('discharge_rate', 0) > 2:
-            voltage_offset -= random.uniform(0.02, 0.05)
-            temp_offset += random.uniform(1, 3)
-            
-        # Temperature control effects
-        target_temp = process_params.get('target_temperature', 25)
-        temp_variation = random.uniform(-2, 2)
-        temperature = target_temp + temp_variation + temp_offset
-        
-        # Voltage with process effects
-        base_voltage = config["nominal_voltage"] + voltage_offset
-        voltage_variation = random.uniform(-0.05, 0.05)
-        voltage = round(base_voltage + voltage_variation, 3)
-    else:
-        # Default behavior
-        base_voltage = config["nominal_voltage"]
-        voltage_variation = random.uniform(-0.1, 0.1)
-        voltage = round(base_voltage + voltage_variation, 3)
-        
-        base_temp = 25
-        temp_variation = random.uniform(-2, 8)
-        temperature = round(base_temp + temp_variation, 1)
-    
-    # Simulate current based on process parameters
-    if process_params:
-        charge_rate = process_params.get('charge_rate', 0)
-        discharge_rate = process_params.get('discharge_rate', 0)
-        
-        if charge_rate > 0:
-            current = round(random.uniform(charge_rate * 0.8, charge_rate * 1.2), 2)
-        elif discharge_rate > 0:
-            current = round(random.uniform(-discharge_rate * 1.2, -discharge_rate * 0.8), 2)
-        else:
-            current = round(random.uniform(-5.0, 5.0), 2)
-    else:
-        current = round(random.uniform(-5.0, 5.0), 2)
-    
-    # Calculate power and capacity
-    power = round(voltage * abs(current), 2)
-    capacity = round(random.uniform(*config["capacity_range"]), 2)
-    
-    # Enhanced health calculation with process parameter effects
-    voltage_health = 100 * (1 - abs(voltage - config["nominal_voltage"]) / config["nominal_voltage"])
-    temp_health = 100 * max(0, 1 - max(0, temperature - 35) / 20)
-    
-    # Process stress factor
-    stress_factor = 1.0
-    if process_params:
-        if abs(current) > 3:
-            stress_factor *= 0.98
-        if temperature > 40:
-            stress_factor *= 0.95
-    
-    overall_health = round((voltage_health + temp_health) / 2 * stress_factor, 1)
-    
-    # Enhanced status determination
-    if voltage < config["min_voltage"] or voltage > config["max_voltage"] or temperature > 50:
-        status = "Critical"
-    elif temperature > 45 or overall_health < 75:
-        status = "Warning"
-    elif overall_health >= 90:
-        status = "Excellent"
+def get_gauge_colors(health):
+    """Return gauge and bar colors based on health percentage"""
+    if health >= 90:
+        return "#00ff88", "#11998e"
+    elif health >= 75:
+        return "#667eea", "#764ba2"
+    elif health >= 50:
+        return "#f093fb", "#f5576c"
     else:
-        status = "Good"
-    
-    return {
-        "cell_id": cell_id,
-        "cell_type": cell_type,
-        "voltage": voltage,
-        "current": current,
-        "temperature": temperature,
-        "power": power,
-        "capacity": capacity,
-        "health": overall_health,
-        "status": status,
-        "timestamp": current_time,
-        "min_voltage": config["min_voltage"],
-        "max_voltage": config["max_voltage"],
-        "stress_factor": stress_factor
-    }
+        return "#ff416c", "#ff4b2b"
 
-def export_to_csv(data, filename_prefix="battery_data"):
-    """Export data to CSV format"""
-    if not data:
-        return None, None
-    
-    # Create DataFrame from current data
-    df = pd.DataFrame(data.values())
-    
-    # Add timestamp formatting
-    df['formatted_timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
-    
-    # Reorder columns for better readability
-    columns_order = [
-        'formatted_timestamp', 'cell_id', 'cell_type', 'voltage', 'current', 
-        'temperature', 'power', 'capacity', 'health', 'status', 
-        'min_voltage', 'max_voltage', 'stress_factor'
-    ]
-    df = df[columns_order]
-    
-    # Generate filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{filename_prefix}_{timestamp}.csv"
-    
-    return df, filename
-
-def export_historical_to_csv(historical_data, filename_prefix="battery_historical"):
-    """Export historical data to CSV format"""
-    if not historical_data:
-        return None, None
-    
-    # Flatten historical data
-    flattened_data = []
-    for record in historical_data:
-        for cell_id, cell_data in record["data"].items():
-            row = cell_data.copy()
-            row['record_timestamp'] = record["timestamp"]
-            flattened_data.append(row)
-    
-    df = pd.DataFrame(flattened_data)
-    
-    # Format timestamps
-    df['formatted_timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
-    df['formatted_record_timestamp'] = df['record_timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
-    
-    # Generate filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{filename_prefix}_{timestamp}.csv"
-    
-    return df, filename
+def build_health_gauge_figure(cell_ids, health_values, columns=GAUGE_COLUMNS):
+    """Build a single figure with one health gauge per cell laid out on a domain grid"""
+    rows = max(1, -(-len(cell_ids) // columns))
+    indicators = []
+    
+    for i, (cell_id, health_value) in enumerate(zip(cell_ids, health_values)):
+        gauge_color, bar_color = get_gauge_colors(health_value)
+        indicators.append(go.Indicator(
+            mode = "gauge+number+delta",
+            value = health_value,
+            domain = {'row': i // columns, 'column': i % columns},
+            title = {'text': f"🔋 {cell_id}", 'font': {'size': 14, 'color': '#333'}},
+            delta = {'reference': 100, 'increasing': {'color': gauge_color}},
+            gauge = {
+                'axis': {'range': [None, 100], 'tickcolor': '#666'},
+                'bar': {'color': bar_color, 'thickness': 0.8},
+                'bgcolor': "rgba(255,255,255,0.1)",
+                'borderwidth': 3,
+                'bordercolor': gauge_color,
+                'steps': GAUGE_STEPS,
+                'threshold': {
+                    'line': {'color': gauge_color, 'width': 4},
+                    'thickness': 0.75,
+                    'value': 90
+                }
+            }
+        ))
+    
+    fig = go.Figure(indicators)
+    fig.update_layout(
+        grid={'rows': rows, 'columns': columns, 'pattern': 'independent', 'ygap': 0.35},
+        height=GAUGE_ROW_HEIGHT * rows,
+        margin={'t': 40, 'b': 10, 'l': 30, 'r': 30},
+        font={'color': "#333", 'size': 12},
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        # Keep the layout revision fixed so refreshes only restyle the gauge values
+        uirevision="health-gauges"
+    )
+    return fig
 
-# Main Dashboard
-st.markdown('<h1 class="main-header">🔋 Battery Cell Monitoring Dashboard</h1>', unsafe_allow_html=True)
+def reduce_history(chunks, metrics, start, end, num_cells, downsample_mode="LTTB", cells=None):
+    """Reduce (timestamps, {metric: samples x cells}) chunks between start and end, one chunk at a time.
 
-# Sidebar for configuration
-with st.sidebar:
-    st.header("⚙️ Configuration")
-    
-    # Bench and group information
-    bench_name = st.text_input("Bench Name", value="Bench-001", key="bench_name")
-    group_num = st.number_input("Group Number", min_value=1, max_value=100, value=1, key="group_num")
-    
-    st.divider()
-    
-    # Process Parameters Section
-    st.subheader("🔧 Process Parameters")
-    with st.expander("⚙️ Test Configuration", expanded=True):
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            test_duration = st.number_input(
-                "Test Duration (hours)", 
-                min_value=0.1, 
-                max_value=168.0, 
-                value=2.0, 
-                step=0.1,
-                help="Total duration for the battery test"
-            )
-            
-            charge_rate = st.number_input(
-                "Charge Rate (A)", 
-                min_value=0.0, 
-                max_value=10.0, 
-                value=1.0, 
-                step=0.1,
-                help="Charging current in Amperes"
-            )
-            
-            target_temperature = st.number_input(
-                "Target Temperature (°C)", 
-                min_value=-40, 
-                max_value=80, 
-                value=25, 
-                step=1,
-                help="Target operating temperature"
-            )
-        
-        with col2:
-            discharge_rate = st.number_input(
-                "Discharge Rate (A)", 
-                min_value=0.0, 
-                max_value=10.0, 
-                value=1.0, 
-                step=0.1,
-                help="Discharging current in Amperes"
-            )
-            
-            sampling_interval = st.number_input(
-                "Sampling Interval (seconds)", 
-                min_value=1, 
-                max_value=60, 
-                value=5, 
-                step=1,
-                help="Data collection frequency"
-            )
-            
-            safety_voltage_limit = st.number_input(
-                "Safety Voltage Limit (V)", 
-                min_value=2.0, 
-                max_value=5.0, 
-                value=4.2, 
-                step=0.1,
-                help="Maximum safe voltage threshold"
-            )
-    
-    # Store process parameters
-    st.session_state.process_parameters = {
-        'test_duration': test_duration,
-        'charge_rate': charge_rate,
-        'discharge_rate': discharge_rate,
-        'target_temperature': target_temperature,
-        'sampling_interval': sampling_interval,
-        'safety_voltage_limit': safety_voltage_limit
-    }
-    st.session_state.total_test_duration = test_duration
-    
-    st.divider()
-    
-    # Cell configuration
-    st.subheader("🔋 Cell Configuration")
-    num_cells = st.slider("Number of Cells", min_value=1, max_value=16, value=8)
-    
-    cell_types = []
-    for i in range(num_cells):
-        cell_type = st.selectbox(
-            f"Cell {i+1} Type",
-            options=list(CELL_CONFIGS.keys()),
-            key=f"cell_type_{i}",
-            help=f"Select battery chemistry for Cell {i+1}"
-        )
-        cell_types.append(cell_type)
-    
-    st.divider()
-    
-    # Control panel
-    st.subheader("🎛️ Control Panel")
-    
-    if st.button("🚀 Initialize Test", type="primary", use_container_width=True):
-        current_time = datetime.now()
-        st.session_state.cells_data = {}
-        st.session_state.historical_data = []
-        st.session_state.process_start_time = current_time
-        st.session_state.elapsed_time = 0
-        
-        for i, cell_type in enumerate(cell_types):
-            cell_id = f"Cell_{i+1}_{cell_type}"
-            st.session_state.cells_data[cell_id] = generate_cell_data(
-                cell_type, cell_id, current_time, st.session_state.process_parameters
-            )
-        st.success("🎉 Test initialized successfully!")
-    
-    # Process status display
-    if st.session_state.process_start_time:
-        current_time = datetime.now()
-        elapsed = (current_time - st.session_state.process_start_time).total_seconds() / 3600
-        st.session_state.elapsed_time = elapsed
-        
-        progress = min(elapsed / st.session_state.total_test_duration, 1.0)
-        remaining_time = max(st.session_state.total_test_duration - elapsed, 0)
-        
-        if st.session_state.is_monitoring:
-            if progress >= 1.0:
-                st.markdown("""
-                <div class="process-status status-completed">
-                    ✅ Test Completed
-                </div>
-                """, unsafe_allow_html=True)
+    Returns {metric: (x, y)} points downsampled to TREND_MAX_POINTS per column and the
+    RunningStats of every metric over all cells, so a window of any length never becomes
+    one array. The columns are the `cells` indices given, or the min, mean and max
+    across all cells when `cells` is None.
+    """
+    columns = len(TREND_ENVELOPE) if cells is None else len(cells)
+    reducers = {name: BucketDownsampler(start, end, columns, TREND_MAX_POINTS, downsample_mode) for name in metrics}
+    stats = {name: RunningStats(num_cells) for name in metrics}
+    for timestamps, series in chunks:
+        for name in metrics:
+            values = series[name]
+            if cells is None:
+                plotted = np.column_stack([values.min(axis=1), values.mean(axis=1), values.max(axis=1)])
             else:
-                st.markdown("""
-                <div class="process-status status-running">
-                    🔄 Test In Progress
-                </div>
-                """, unsafe_allow_html=True)
-        else:
-            st.markdown("""
-            <div class="process-status status-stopped">
-                ⏸️ Test Paused
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # Progress bar
-        st.progress(progress)
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            st.metric("⏱️ Elapsed", f"{elapsed:.1f}h")
-        with col2:
-            st.metric("⏳ Remaining", f"{remaining_time:.1f}h")
-    
-    # Monitoring controls
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("▶️ Start", use_container_width=True):
-            st.session_state.is_monitoring = True
-            if not st.session_state.process_start_time:
-                st.session_state.process_start_time = datetime.now()
-            st.success("Monitoring started!")
-    
-    with col2:
-        if st.button("⏸️ Pause", use_container_width=True):
-            st.session_state.is_monitoring = False
-            st.info("Monitoring paused!")
-    
-    # Reset button
-    if st.button("🔄 Reset Test", use_container_width=True, type="secondary"):
-        st.session_state.is_monitoring = False
-        st.session_state.process_start_time = None
-        st.session_state.elapsed_time = 0
-        st.session_state.cells_data = {}
-        st.session_state.historical_data = []
-        st.info("Test reset successfully!")
-    
-    st.divider()
-    
-    # Export Section
-    st.subheader("💾 Data Export")
-    
-    # Current data export
-    if st.session_state.cells_data:
-        if st.button("📊 Export Current Data", use_container_width=True):
-            df, filename = export_to_csv(st.session_state.cells_data, f"{bench_name}_Group{group_num}_current")
-            if df is not None and filename is not None:
-                csv_buffer = io.StringIO()
-                df.to_csv(csv_buffer, index=False)
-                csv_data = csv_buffer.getvalue()
-                
-                st.download_button(
-                    label="⬇️ Download Current Data CSV",
-                    data=csv_data,
-                    file_name=filename,
-                    mime="text/csv",
-                    use_container_width=True
-                )
-                st.success(f"📁 Current data ready for download!")
-    
-    # Historical data export
-    if st.session_state.historical_data:
-        if st.button("📈 Export Historical Data", use_container_width=True):
-            df, filename = export_historical_to_csv(st.session_state.historical_data, f"{bench_name}_Group{group_num}_historical")
-            if df is not None and filename is not None:
-                csv_buffer = io.StringIO()
-                df.to_csv(csv_buffer, index=False)
-                csv_data = csv_buffer.getvalue()
-                
-                st.download_button(
-                    label="⬇️ Download Historical Data CSV",
-                    data=csv_data,
-                    file_name=filename,
-                    mime="text/csv",
-                    use_container_width=True
-                )
-                st.success(f"📁 Historical data ready for download!")
-        
-        # Data summary
-        st.info(f"📊 Records: {len(st.session_state.historical_data)}")
-    
-    # Auto-refresh control
-    st.divider()
-    auto_refresh = st.checkbox("🔄 Auto Refresh", value=True)
-    refresh_interval = st.selectbox(
-        "Refresh Interval",
-        options=[1, 3, 5, 10, 30],
-        index=2,
-        format_func=lambda x: f"{x}s"
+                plotted = values[:, cells]
+            reducers[name].add(timestamps, plotted)
+            stats[name].add(values)
+    return {name: reducer.result() for name, reducer in reducers.items()}, stats
+
+def build_trends_figure(points, cell_ids=None):
+    """Build the 2x2 trend figure from downsampled (points x columns) arrays from reduce_history.
+
+    Draws one WebGL trace per cell in `cell_ids` per metric, or the min/mean/max
+    envelope across cells when `cell_ids` is None.
+    """
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=[panel[2] for panel in TREND_PANELS],
+        vertical_spacing=0.08
     )
     
-    if auto_refresh and st.session_state.is_monitoring:
-        time.sleep(refresh_interval)
-        st.rerun()
+    if cell_ids is None:
+        names = [statistic for statistic, _, _ in TREND_ENVELOPE]
+        lines = [dict(width=width, dash=dash, color=TREND_COLORS[0]) for _, width, dash in TREND_ENVELOPE]
+    else:
+        names = list(cell_ids)
+        lines = [dict(width=3, color=TREND_COLORS[i % len(TREND_COLORS)]) for i in range(len(names))]
+    traces, rows, cols = [], [], []
+    for panel, (metric, suffix, _, _, row, col) in enumerate(TREND_PANELS):
+        x, values = points[metric]
+        for i, name in enumerate(names):
+            traces.append(go.Scattergl(
+                x=x[:, i],
+                y=values[:, i],
+                name=f"{name}_{suffix}",
+                legendgroup=name,
+                showlegend=panel == 0,
+                mode="lines",
+                line=lines[i]
+            ))
+            rows.append(row)
+            cols.append(col)
+    # Adding all traces in one call avoids re-validating the figure once per trace
+    fig.add_traces(traces, rows=rows, cols=cols)
+    
+    fig.update_layout(
+        height=600, 
+        title_text="📈 Historical Data Trends",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='#333'
+    )
+    fig.update_xaxes(title_text="Time")
+    for _, _, _, axis_title, row, col in TREND_PANELS:
+        fig.update_yaxes(title_text=axis_title, row=row, col=col)
+    return fig
 
-# Main content area
-if st.session_state.cells_data:
-    
-    # Update data if monitoring
-    if st.session_state.is_monitoring:
-        current_time = datetime.now()
-        
-        # Check if test duration exceeded
-        if st.session_state.process_start_time:
-            elapsed_hours = (current_time - st.session_state.process_start_time).total_seconds() / 3600
-            if elapsed_hours >= st.session_state.total_test_duration:
-                st.session_state.is_monitoring = False
-                st.balloons()
-                st.success("🎉 Test completed successfully!")
-        
-        # Update cell data with process parameters
-        for cell_id in st.session_state.cells_data.keys():
-            cell_type = st.session_state.cells_data[cell_id]["cell_type"]
-            st.session_state.cells_data[cell_id] = generate_cell_data(
-                cell_type, cell_id, current_time, st.session_state.process_parameters
-            )
-        
-        # Store historical data
-        st.session_state.historical_data.append({
-            "timestamp": current_time,
-            "data": st.session_state.cells_data.copy(),
-            "process_params": st.session_state.process_parameters.copy()
-        })
-        
-        # Keep only reasonable amount of historical data
-        if len(st.session_state.historical_data) > 1000:
-            st.session_state.historical_data = st.session_state.historical_data[-1000:]
-    
-    # System overview with enhanced styling
-    st.header(f"📊 System Overview - {bench_name} (Group {group_num})")
-    
-    # Process Parameters Display
-    with st.expander("🔧 Current Process Parameters", expanded=False):
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown("**⚡ Electrical Parameters**")
-            st.write(f"Charge Rate: {st.session_state.process_parameters['charge_rate']} A")
-            st.write(f"Discharge Rate: {st.session_state.process_parameters['discharge_rate']} A")
-            st.write(f"Safety Limit: {st.session_state.process_parameters['safety_voltage_limit']} V")
-        
-        with col2:
-            st.markdown("**🌡️ Environmental Parameters**")
-            st.write(f"Target Temperature: {st.session_state.process_parameters['target_temperature']} °C")
-            st.write(f"Test Duration: {st.session_state.process_parameters['test_duration']} hours")
-        
-        with col3:
-            st.markdown("**📊 Data Collection**")
-            st.write(f"Sampling Interval: {st.session_state.process_parameters['sampling_interval']} seconds")
-            if st.session_state.process_start_time:
-                st.write(f"Test Progress: {(st.session_state.elapsed_time/st.session_state.total_test_duration*100):.1f}%")
-    
-    # Summary metrics with enhanced cards
-    total_cells = len(st.session_state.cells_data)
-    excellent_cells = sum(1 for cell in st.session_state.cells_data.values() if cell["status"] == "Excellent")
-    good_cells = sum(1 for cell in st.session_state.cells_data.values() if cell["status"] == "Good")
-    warning_cells = sum(1 for cell in st.session_state.cells_data.values() if cell["status"] == "Warning")
-    critical_cells = sum(1 for cell in st.session_state.cells_data.values() if cell["status"] == "Critical")
-    avg_health = np.mean([cell["health"] for cell in st.session_state.cells_data.values()])
-    total_power = sum([cell["power"] for cell in st.session_state.cells_data.values()])
-    avg_voltage = np.mean([cell["voltage"] for cell in st.session_state.cells_data.values()])
-    avg_temperature = np.mean([cell["temperature"] for cell in st.session_state.cells_data.values()])
-    
+def render_summary_cards(total_cells, excellent_cells, good_cells, warning_cells, critical_cells,
+                         avg_health, total_power, avg_voltage):
+    """Render the row of overview cards shared by the bench and fleet views"""
     col1, col2, col3, col4, col5, col6, col7, col8 = st.columns(8)
     
     with col1:
@@ -846,549 +646,1464 @@ if st.session_state.cells_data:
             <span class="overview-label">Avg Voltage</span>
         </div>
         """, unsafe_allow_html=True)
+
+def render_pack_cards(worker, df):
+    """Render the pack-level cards and string detail for the configured SxP topology.
+
+    The cells are simulated independently, so the pack figures are an estimate of the
+    pack they would form (see battery_pack).
+    """
+    strings = pack_topology(df["position"].to_numpy(), min(st.session_state.pack_parallel, len(df)))
+    pack = worker.pack_metrics(strings)
+    if pack is None:
+        return
+    
+    cards = [
+        (topology_label(strings), "Pack Topology"),
+        (f"{pack['voltage']:.2f}V", "Pack Voltage"),
+        (f"{pack['current']:+.2f}A", "Pack Current"),
+        (f"{pack['power']:.1f}W", "Pack Power"),
+        (f"{pack['capacity']:.2f}Ah", "Usable Capacity"),
+        (f"{pack['available']:.2f}Ah", "Available Charge"),
+        (f"{pack['voltage_spread']:.0f}mV", "Voltage Imbalance"),
+        (f"{pack['soc_spread']:.1f}%", "SOC Spread")
+    ]
+    for col, (value, label) in zip(st.columns(len(cards)), cards):
+        with col:
+            st.markdown(f"""
+            <div class="overview-card" style="background: linear-gradient(135deg, #0f2027 0%, #2c5364 100%);">
+                <span class="overview-number">{value}</span>
+                <span class="overview-label">{label}</span>
+            </div>
+            """, unsafe_allow_html=True)
+    
+    with st.expander(f"🔗 String Detail • weakest cell {df['cell_id'].iloc[pack['weakest_cell']]}"):
+        st.caption("Cells are simulated independently; pack current and voltage estimate the pack they would form.")
+        st.dataframe(pd.DataFrame({
+            "string": np.arange(1, len(strings) + 1),
+            "first_cell": df["cell_id"].to_numpy()[strings[:, 0]],
+            "last_cell": df["cell_id"].to_numpy()[strings[:, -1]],
+            "voltage": pack["string_voltage"].round(3),
+            "current": pack["string_current"].round(3),
+            "usable_capacity": pack["string_capacity"].round(2),
+            "available_charge": pack["string_available"].round(2)
+        }), use_container_width=True, hide_index=True)
+
+def render_overview(worker, was_monitoring):
+    """Render the summary cards and safety alerts from the latest sample"""
+    # Monitoring stopped since the last full run (paused or completed): rerun the whole page
+    if was_monitoring and not worker.is_monitoring:
+        st.rerun()
     
-    # Safety alerts
+    df = worker.latest_frame()
+    if df is None:
+        return
+    
+    # Summary metrics with enhanced cards
+    total_cells = len(df)
+    status_counts = df["status"].value_counts()
+    excellent_cells = status_counts.get("Excellent", 0)
+    good_cells = status_counts.get("Good", 0)
+    warning_cells = status_counts.get("Warning", 0)
+    critical_cells = status_counts.get("Critical", 0)
+    avg_health = df["health"].mean()
+    total_power = df["power"].sum()
+    avg_voltage = df["voltage"].mean()
+    
+    render_summary_cards(
+        total_cells, excellent_cells, good_cells, warning_cells, critical_cells,
+        avg_health, total_power, avg_voltage
+    )
+    render_pack_cards(worker, df)
+    if "protocol_step" in df:
+        step_counts = df["protocol_step"].value_counts()
+        st.caption("🧭 Protocol steps: " + " • ".join(f"{step}: {count}" for step, count in step_counts.items()))
+    
+    # Safety alerts: flag every cell at once, then describe only the first few
+    safety_voltage_limit = st.session_state.process_parameters["safety_voltage_limit"]
+    alerts = alert_mask(df["voltage"], df["temperature"], df["status"] == "Critical", safety_voltage_limit)
+    alert_count = int(alerts.sum())
     safety_alerts = []
-    for cell_id, cell_data in st.session_state.cells_data.items():
-        if cell_data["voltage"] > st.session_state.process_parameters["safety_voltage_limit"]:
-            safety_alerts.append(f"⚠️ {cell_id}: Voltage ({cell_data['voltage']}V) exceeds safety limit!")
-        if cell_data["temperature"] > 50:
-            safety_alerts.append(f"🔥 {cell_id}: High temperature ({cell_data['temperature']}°C)!")
-        if cell_data["status"] == "Critical":
-            safety_alerts.append(f"🚨 {cell_id}: Critical status detected!")
+    # Every flagged cell raises at least one alert, so five cells cover the five shown
+    for cell in df[alerts].head(5).itertuples(index=False):
+        if cell.voltage > safety_voltage_limit:
+            safety_alerts.append(f"⚠️ {cell.cell_id}: Voltage ({cell.voltage:.3f}V) exceeds safety limit!")
+        if cell.temperature > ALERT_TEMPERATURE:
+            safety_alerts.append(f"🔥 {cell.cell_id}: High temperature ({cell.temperature:.1f}°C)!")
+        if cell.status == "Critical":
+            safety_alerts.append(f"🚨 {cell.cell_id}: Critical status detected!")
     
     if safety_alerts:
-        st.error("🚨 Safety Alerts:")
+        st.error(f"🚨 Safety Alerts ({alert_count} cells):")
         for alert in safety_alerts[:5]:  # Show max 5 alerts
             st.error(alert)
+
+def format_summary_table(summary, columns):
+    """Select and round summary columns for display"""
+    table = summary[columns].copy()
+    for column, decimals in (("avg_health", 1), ("avg_voltage", 3), ("total_power", 1)):
+        table[column] = table[column].astype(float).round(decimals)
+    return table
+
+def render_fleet_view(workers, was_monitoring):
+    """Render fleet, bench, group and cell level summaries of every fleet worker.
+
+    Group rows are reduced straight from each worker's latest records. Bench detail is
+    only built while its expander is open, and per-cell frames only for the selected group.
+    """
+    # Monitoring stopped since the last full run: rerun the whole page to update the sidebar
+    if was_monitoring and not any(worker.is_monitoring for worker in workers):
+        st.rerun()
     
-    # Tabs for different views
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📈 Real-time Data", "🔋 Enhanced Health", "🔥 Temperature Monitor", "⚡ Historical Trends", "📊 Process Analysis"])
+    safety_voltage_limit = st.session_state.process_parameters["safety_voltage_limit"]
+    groups = group_summary(workers, safety_voltage_limit)
+    fleet = rollup(groups).iloc[0]
+    if not fleet["cells"]:
+        return
     
-    with tab1:
-        st.subheader("📊 Real-time Cell Data")
-        
-        # Create DataFrame for display
-        df = pd.DataFrame(st.session_state.cells_data.values())
-        
-        # Enhanced data table with better formatting
-        df_display = df[["cell_id", "cell_type", "voltage", "current", "temperature", "power", "capacity", "health", "status"]].copy()
-        df_display["voltage"] = df_display["voltage"].round(3)
-        df_display["current"] = df_display["current"].round(2)
-        df_display["temperature"] = df_display["temperature"].round(1)
-        df_display["power"] = df_display["power"].round(2)
-        df_display["capacity"] = df_display["capacity"].round(2)
-        df_display["health"] = df_display["health"].round(1)
-        
-        # Color-code the dataframe based on status
-        def highlight_status(row):
-            if row['status'] == 'Critical':
-                return ['background-color: #ffebee'] * len(row)
-            elif row['status'] == 'Warning':
-                return ['background-color: #fff3e0'] * len(row)
-            elif row['status'] == 'Excellent':
-                return ['background-color: #e8f5e8'] * len(row)
-            else:
-                return [''] * len(row)
-        
-        styled_df = df_display.style.apply(highlight_status, axis=1)
-        st.dataframe(styled_df, use_container_width=True)
-        
-        # Enhanced voltage comparison chart
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            fig_voltage = px.bar(
-                df, 
-                x="cell_id", 
-                y="voltage", 
-                color="cell_type",
-                title="🔋 Cell Voltage Comparison",
-                color_discrete_map={cell_type: config["color"] for cell_type, config in CELL_CONFIGS.items()}
-            )
-            
-            # Add safety limit line
-            fig_voltage.add_hline(
-                y=st.session_state.process_parameters["safety_voltage_limit"], 
-                line_dash="dash", 
-                line_color="red",
-                annotation_text="Safety Limit"
+    render_summary_cards(
+        int(fleet["cells"]), int(fleet["excellent"]), int(fleet["good"]), int(fleet["warning"]),
+        int(fleet["critical"]), fleet["avg_health"], fleet["total_power"], fleet["avg_voltage"]
+    )
+    if fleet["alerts"]:
+        st.error(f"🚨 {int(fleet['alerts'])} cells with safety alerts across the fleet")
+    
+    # Bench level
+    st.subheader("🏭 Bench Summary")
+    benches = rollup(groups, by="bench")
+    st.dataframe(
+        format_summary_table(benches, ["bench"] + FLEET_COLUMNS),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    # Group and cell level, materialized only for expanded benches
+    workers_by_group = {(worker.bench_name, worker.group_num): worker for worker in workers}
+    for bench in benches["bench"]:
+        bench_groups = groups[groups["bench"] == bench]
+        alerts = int(bench_groups["alerts"].sum())
+        label = f"🔍 {bench}" + (f" • 🚨 {alerts} alerts" if alerts else "")
+        bench_expander = st.expander(label, key=f"fleet_bench_{bench}", on_change="rerun")
+        with bench_expander:
+            if bench_expander.open is False:
+                continue
+            selection = st.dataframe(
+                format_summary_table(bench_groups, FLEET_GROUP_COLUMNS),
+                use_container_width=True,
+                hide_index=True,
+                on_select="rerun",
+                selection_mode="single-row",
+                key=f"fleet_groups_{bench}"
             )
+            if not selection.selection.rows:
+                st.caption("Select a group to see its cells")
+                continue
             
-            fig_voltage.update_traces(marker_line_width=2, marker_line_color='white')
-            fig_voltage.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='#333',
-                title_font_size=18
+            group_num = int(bench_groups.iloc[selection.selection.rows[0]]["group"])
+            df = workers_by_group[(bench, group_num)].latest_frame()
+            if df is None:
+                continue
+            df["alert"] = alert_mask(
+                df["voltage"], df["temperature"], df["status"] == "Critical", safety_voltage_limit
             )
-            st.plotly_chart(fig_voltage, use_container_width=True)
-        
-        with col2:
-            # Current vs Power scatter plot
-            fig_current_power = px.scatter(
-                df, 
-                x="current", 
-                y="power", 
-                color="cell_type",
-                size="health",
-                title="⚡ Current vs Power Analysis",
-                hover_data=["cell_id", "voltage", "temperature"],
-                color_discrete_map={cell_type: config["color"] for cell_type, config in CELL_CONFIGS.items()}
-            )
-            fig_current_power.update_traces(marker_line_width=2, marker_line_color='white')
-            fig_current_power.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='#333',
-                title_font_size=18
-            )
-            st.plotly_chart(fig_current_power, use_container_width=True)
+            df = df.sort_values(["alert", "health"], ascending=[False, True])
+            st.markdown(f"**Group {group_num} cells** (alerts first)")
+            decimals = {"health": 1, "voltage": 3, "temperature": 1, "power": 2}
+            cells = df[FLEET_CELL_COLUMNS].astype(dict.fromkeys(decimals, float)).round(decimals)
+            st.dataframe(cells, use_container_width=True, hide_index=True)
+
+def render_realtime_tab(worker):
+    """Render the real-time data table and comparison charts"""
+    df = worker.latest_frame()
+    if df is None:
+        return
+    
+    st.subheader("📊 Real-time Cell Data")
+    
+    # Enhanced data table with better formatting
+    columns = ["cell_id", "cell_type", "position", "voltage", "current", "temperature", "power", "capacity",
+               "soc", "hours_to_limit", "health", "status"]
+    if "protocol_step" in df:
+        columns.insert(3, "protocol_step")
+    df_display = df[columns].copy()
+    df_display["voltage"] = df_display["voltage"].astype(float).round(3)
+    df_display["current"] = df_display["current"].astype(float).round(2)
+    df_display["temperature"] = df_display["temperature"].astype(float).round(1)
+    df_display["power"] = df_display["power"].astype(float).round(2)
+    df_display["capacity"] = df_display["capacity"].astype(float).round(2)
+    df_display["soc"] = (df_display["soc"].astype(float) * 100).round(1)
+    df_display["hours_to_limit"] = df_display["hours_to_limit"].round(2)
+    df_display["health"] = df_display["health"].astype(float).round(1)
+    
+    # Color-code the dataframe based on status
+    def highlight_status(row):
+        if row['status'] == 'Critical':
+            return ['background-color: #ffebee'] * len(row)
+        elif row['status'] == 'Warning':
+            return ['background-color: #fff3e0'] * len(row)
+        elif row['status'] == 'Excellent':
+            return ['background-color: #e8f5e8'] * len(row)
+        else:
+            return [''] * len(row)
     
-    with tab2:
-        st.subheader("🔋 Enhanced Battery Health Indicators")
-        
-        # Enhanced health cards with animations and better visuals
-        cols = st.columns(4)
-        for i, (cell_id, cell_data) in enumerate(st.session_state.cells_data.items()):
-            with cols[i % 4]:
-                health_class = get_health_class(cell_data["health"])
-                battery_icon = get_battery_icon(cell_data["health"])
-                status_class = get_status_class(cell_data["status"])
-                
-                st.markdown(f"""
-                <div class="health-card {health_class}">
-                    <div class="battery-icon">{battery_icon}</div>
-                    <div class="cell-name">{cell_id}</div>
-                    <div class="health-percentage">{cell_data["health"]:.1f}%</div>
-                    <div class="{status_class}" style="margin-top: 10px; font-size: 1.1rem;">
-                        {cell_data["status"]}
-                    </div>
-                    <div style="margin-top: 8px; font-size: 0.9rem; opacity: 0.8;">
-                        {cell_data["cell_type"]} • {cell_data["voltage"]}V • {cell_data["temperature"]}°C
-                    </div>
-                    <div style="margin-top: 5px; font-size: 0.8rem; opacity: 0.7;">
-                        Stress Factor: {cell_data["stress_factor"]:.3f}
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-        
-        # Enhanced circular health indicators
-        st.subheader("🎯 Health Overview Gauges")
-        gauge_cols = st.columns(4)
-        
-        for i, (cell_id, cell_data) in enumerate(st.session_state.cells_data.items()):
-            with gauge_cols[i % 4]:
-                health_value = cell_data["health"]
-                
-                # Determine colors based on health
-                if health_value >= 90:
-                    gauge_color = "#00ff88"
-                    bar_color = "#11998e"
-                elif health_value >= 75:
-                    gauge_color = "#667eea"
-                    bar_color = "#764ba2"
-                elif health_value >= 50:
-                    gauge_color = "#f093fb"
-                    bar_color = "#f5576c"
-                else:
-                    gauge_color = "#ff416c"
-                    bar_color = "#ff4b2b"
-                
-                fig_gauge = go.Figure(go.Indicator(
-                    mode = "gauge+number+delta",
-                    value = health_value,
-                    domain = {'x': [0, 1], 'y': [0, 1]},
-                    title = {'text': f"🔋 {cell_id}", 'font': {'size': 14, 'color': '#333'}},
-                    delta = {'reference': 100, 'increasing': {'color': gauge_color}},
-                    gauge = {
-                        'axis': {'range': [None, 100], 'tickcolor': '#666'},
-                        'bar': {'color': bar_color, 'thickness': 0.8},
-                        'bgcolor': "rgba(255,255,255,0.1)",
-                        'borderwidth': 3,
-                        'bordercolor': gauge_color,
-                        'steps': [
-                            {'range': [0, 25], 'color': "rgba(255, 65, 108, 0.2)"},
-                            {'range': [25, 50], 'color': "rgba(240, 147, 251, 0.2)"},
-                            {'range': [50, 75], 'color': "rgba(102, 126, 234, 0.2)"},
-                            {'range': [75, 90], 'color': "rgba(17, 153, 142, 0.2)"},
-                            {'range': [90, 100], 'color': "rgba(0, 255, 136, 0.3)"}
-                        ],
-                        'threshold': {
-                            'line': {'color': gauge_color, 'width': 4},
-                            'thickness': 0.75,
-                            'value': 90
-                        }
-                    }
-                ))
-                
-                fig_gauge.update_layout(
-                    height=280,
-                    font={'color': "#333", 'size': 12},
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)'
-                )
-                st.plotly_chart(fig_gauge, use_container_width=True)
+    styled_df = df_display.style.apply(highlight_status, axis=1)
+    st.dataframe(styled_df, use_container_width=True)
+    
+    # Enhanced voltage comparison chart
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        fig_voltage = px.bar(
+            df, 
+            x="cell_id", 
+            y="voltage", 
+            color="cell_type",
+            title="🔋 Cell Voltage Comparison",
+            color_discrete_map={cell_type: config["color"] for cell_type, config in CELL_CONFIGS.items()}
+        )
+        
+        # Add safety limit line
+        fig_voltage.add_hline(
+            y=st.session_state.process_parameters["safety_voltage_limit"], 
+            line_dash="dash", 
+            line_color="red",
+            annotation_text="Safety Limit"
+        )
+        
+        fig_voltage.update_traces(marker_line_width=2, marker_line_color='white')
+        fig_voltage.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font_color='#333',
+            title_font_size=18
+        )
+        st.plotly_chart(fig_voltage, use_container_width=True)
+    
+    with col2:
+        # Current vs Power scatter plot
+        fig_current_power = px.scatter(
+            df, 
+            x="current", 
+            y="power", 
+            color="cell_type",
+            size="health",
+            title="⚡ Current vs Power Analysis",
+            hover_data=["cell_id", "voltage", "temperature"],
+            color_discrete_map={cell_type: config["color"] for cell_type, config in CELL_CONFIGS.items()}
+        )
+        fig_current_power.update_traces(marker_line_width=2, marker_line_color='white')
+        fig_current_power.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font_color='#333',
+            title_font_size=18
+        )
+        st.plotly_chart(fig_current_power, use_container_width=True)
+
+def render_health_tab(worker):
+    """Render the health cards, gauges and health distribution charts"""
+    df = worker.latest_frame()
+    if df is None:
+        return
+    
+    st.subheader("🔋 Enhanced Battery Health Indicators")
+    
+    # Cards and gauges show one page of cells so manifest-sized benches stay bounded
+    cell_ids = df["cell_id"].tolist()
+    num_pages = max(1, -(-len(cell_ids) // GAUGES_PER_PAGE))
+    page = 1
+    if num_pages > 1:
+        page = st.number_input("Cell Page", min_value=1, max_value=num_pages, value=1, key="gauge_page")
+    page_slice = slice((page - 1) * GAUGES_PER_PAGE, page * GAUGES_PER_PAGE)
+    
+    # Enhanced health cards with animations and better visuals
+    cols = st.columns(4)
+    for i, cell in enumerate(df.iloc[page_slice].itertuples(index=False)):
+        with cols[i % 4]:
+            health_class = get_health_class(cell.health)
+            battery_icon = get_battery_icon(cell.health)
+            status_class = get_status_class(cell.status)
+            
+            st.markdown(f"""
+            <div class="health-card {health_class}">
+                <div class="battery-icon">{battery_icon}</div>
+                <div class="cell-name">{cell.cell_id}</div>
+                <div class="health-percentage">{cell.health:.1f}%</div>
+                <div class="{status_class}" style="margin-top: 10px; font-size: 1.1rem;">
+                    {cell.status}
+                </div>
+                <div style="margin-top: 8px; font-size: 0.9rem; opacity: 0.8;">
+                    {cell.cell_type} • {cell.voltage:.3f}V • {cell.temperature:.1f}°C
+                </div>
+                <div style="margin-top: 5px; font-size: 0.8rem; opacity: 0.7;">
+                    SOC: {cell.soc * 100:.0f}% • Stress Factor: {cell.stress_factor:.3f}
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+    
+    # Enhanced circular health indicators
+    st.subheader("🎯 Health Overview Gauges")
+    
+    # All gauges of the page share one figure
+    fig_gauges = build_health_gauge_figure(cell_ids[page_slice], df["health"].to_numpy()[page_slice])
+    st.plotly_chart(fig_gauges, use_container_width=True, key="health_gauges")
+    
+    # Enhanced health distribution
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        fig_health = px.histogram(
+            df, 
+            x="health", 
+            nbins=15, 
+            title="🎯 Health Distribution Analysis",
+            color="status",
+            color_discrete_map={
+                "Excellent": "#00ff88", 
+                "Good": "#667eea", 
+                "Warning": "#f093fb", 
+                "Critical": "#ff416c"
+            }
+        )
+        fig_health.update_traces(marker_line_width=2, marker_line_color='white')
+        fig_health.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font_color='#333',
+            title_font_size=18
+        )
+        st.plotly_chart(fig_health, use_container_width=True)
+    
+    with col2:
+        # Health vs Stress Factor correlation
+        fig_stress = px.scatter(
+            df, 
+            x="stress_factor", 
+            y="health", 
+            color="status",
+            size="temperature",
+            title="📊 Health vs Stress Factor",
+            hover_data=["cell_id", "voltage", "current"],
+            color_discrete_map={
+                "Excellent": "#00ff88", 
+                "Good": "#667eea", 
+                "Warning": "#f093fb", 
+                "Critical": "#ff416c"
+            }
+        )
+        fig_stress.update_traces(marker_line_width=2, marker_line_color='white')
+        fig_stress.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font_color='#333',
+            title_font_size=18
+        )
+        st.plotly_chart(fig_stress, use_container_width=True)
+
+def render_temperature_tab(worker):
+    """Render the temperature heatmap and distribution charts"""
+    df = worker.latest_frame()
+    if df is None:
+        return
+    
+    st.subheader("🔥 Temperature Monitoring")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        # Enhanced temperature heatmap
+        temp_data = df.pivot_table(values='temperature', index='cell_type', columns='cell_id', fill_value=0)
+        fig_temp = px.imshow(
+            temp_data, 
+            title="🌡️ Temperature Heatmap",
+            color_continuous_scale="plasma",
+            aspect="auto"
+        )
+        # Add target temperature line
+        fig_temp.add_hline(
+            y=st.session_state.process_parameters["target_temperature"], 
+            line_dash="dash", 
+            line_color="white",
+            annotation_text="Target Temp"
+        )
+        fig_temp.update_layout(
+            title_font_size=18,
+            font_color='#333'
+        )
+        st.plotly_chart(fig_temp, use_container_width=True)
+    
+    with col2:
+        # Temperature distribution by cell type
+        fig_temp_dist = px.box(
+            df, 
+            x="cell_type", 
+            y="temperature", 
+            color="cell_type",
+            title="🌡️ Temperature Distribution by Cell Type",
+            color_discrete_map={cell_type: config["color"] for cell_type, config in CELL_CONFIGS.items()}
+        )
+        fig_temp_dist.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font_color='#333',
+            title_font_size=18
+        )
+        st.plotly_chart(fig_temp_dist, use_container_width=True)
+    
+    # Enhanced temperature vs power scatter
+    fig_scatter = px.scatter(
+        df, 
+        x="temperature", 
+        y="power", 
+        color="cell_type",
+        size="health",
+        title="🔥 Temperature vs Power Analysis",
+        hover_data=["cell_id", "voltage", "current", "status"],
+        color_discrete_map={cell_type: config["color"] for cell_type, config in CELL_CONFIGS.items()}
+    )
+    
+    # Add target temperature line
+    fig_scatter.add_vline(
+        x=st.session_state.process_parameters["target_temperature"], 
+        line_dash="dash", 
+        line_color="gray",
+        annotation_text="Target Temperature"
+    )
+    
+    fig_scatter.update_traces(marker_line_width=2, marker_line_color='white')
+    fig_scatter.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='#333',
+        title_font_size=18
+    )
+    st.plotly_chart(fig_scatter, use_container_width=True)
+    
+    # Bench layout of a thermally coupled bench, where heat spreads between neighbours
+    thermal_columns = st.session_state.process_parameters["thermal_columns"]
+    if thermal_columns:
+        positions = df["position"].to_numpy()
+        fig_layout = px.imshow(
+            layout_grid(positions, thermal_columns, df["temperature"].to_numpy()),
+            title=f"🧱 Bench Layout Temperature ({thermal_columns} columns)",
+            labels={"x": "Column", "y": "Row", "color": "°C"},
+            color_continuous_scale="plasma",
+            text_auto=".1f",
+            aspect="auto"
+        )
+        fig_layout.update_layout(title_font_size=18, font_color='#333')
+        st.plotly_chart(fig_layout, use_container_width=True)
+
+def render_trends_tab(worker):
+    """Render the historical trend charts and statistics"""
+    st.subheader("⚡ Historical Trends")
+    
+    history = worker.history
+    if history is not None and len(history) > 1:
+        # Sample windows come from the ring buffer, time ranges from the on-disk store
+        trend_range = st.select_slider(
+            "Trend Range",
+            options=[label for label, _, _ in TREND_RANGES],
+            value=TREND_RANGES[0][0],
+            key="trend_range"
+        )
+        _, last_samples, hours = next(item for item in TREND_RANGES if item[0] == trend_range)
+        metrics = [panel[0] for panel in TREND_PANELS]
+        
+        # Large benches plot an envelope across cells or one page of cells, never a trace per cell
+        cell_ids = history.cell_ids
+        cells = None if len(cell_ids) > TREND_MAX_CELLS else list(range(len(cell_ids)))
+        if cells is None:
+            num_pages = -(-len(cell_ids) // TREND_MAX_CELLS)
+            page = st.selectbox(
+                "Trend Cells",
+                range(num_pages + 1),
+                format_func=lambda page: "All cells (min / mean / max)" if not page else
+                f"{cell_ids[(page - 1) * TREND_MAX_CELLS]} – {cell_ids[min(page * TREND_MAX_CELLS, len(cell_ids)) - 1]}",
+                key="trend_cells"
+            )
+            if page:
+                cells = list(range((page - 1) * TREND_MAX_CELLS, min(page * TREND_MAX_CELLS, len(cell_ids))))
+        if last_samples is not None:
+            timestamps, series = worker.history_window(metrics, last=last_samples)
+            chunks = [(timestamps, series)] if len(timestamps) else []
+            start, end = (timestamps[0], timestamps[-1]) if len(timestamps) else (None, None)
+        else:
+            # Time ranges can reach far past the ring buffer, so they are reduced chunk by chunk
+            since = worker.process_start_time
+            if hours is not None:
+                since = max(since, datetime.now() - timedelta(hours=hours))
+            chunks = worker.iter_history_window(metrics, since)
+            start, end = since, worker.latest_timestamp
+        if start is None:
+            st.info("No samples in the selected range yet...")
+            return
+        points, stats = reduce_history(
+            chunks, metrics, start, end, len(cell_ids), st.session_state.downsample_mode, cells
+        )
+        if not stats["voltage"].count:
+            st.info("No samples in the selected range yet...")
+            return
+        fig_trends = build_trends_figure(points, None if cells is None else [cell_ids[i] for i in cells])
+        st.plotly_chart(fig_trends, use_container_width=True)
+        
+        # Historical statistics
+        st.subheader("📊 Historical Statistics")
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("📈 Max Voltage", f"{stats['voltage'].max.max():.3f}V")
+            st.metric("📉 Min Voltage", f"{stats['voltage'].min.min():.3f}V")
+        
+        with col2:
+            st.metric("⚡ Max Current", f"{stats['current'].max.max():.2f}A")
+            st.metric("⚡ Min Current", f"{stats['current'].min.min():.2f}A")
+        
+        with col3:
+            st.metric("🌡️ Max Temperature", f"{stats['temperature'].max.max():.1f}°C")
+            st.metric("🌡️ Min Temperature", f"{stats['temperature'].min.min():.1f}°C")
+        
+        with col4:
+            st.metric("💚 Max Health", f"{stats['health'].max.max():.1f}%")
+            st.metric("💔 Min Health", f"{stats['health'].min.min():.1f}%")
+    else:
+        st.info("Start monitoring to see historical trends...")
+
+def render_replay_tab(worker):
+    """Render any past sample of the run, recomputed from the nearest replay checkpoint"""
+    st.subheader("⏪ Replay")
+    
+    time_range = worker.replay_range()
+    if time_range is None:
+        st.info("Start monitoring or simulate a test to replay it...")
+        return
+    first, last = (value.astype("datetime64[us]").item() for value in time_range)
+    replay, timeline = worker.replay, worker.timeline
+    if timeline is not None:
+        st.caption(
+            f"{len(timeline)} samples of an event-driven run, held as {timeline.num_segments} trajectory segments. "
+            "Each seek evaluates the segment every cell is in at the chosen moment."
+        )
+    if replay is not None and len(replay):
+        st.caption(
+            f"{len(replay)} samples recorded with {replay.checkpoints} model checkpoints. "
+            "Each seek restores the nearest checkpoint and steps the model forward to the chosen moment."
+        )
+    safety_voltage_limit = st.session_state.process_parameters["safety_voltage_limit"]
+    
+    # Keep the seek position inside the run as it grows or is re-initialized
+    if "replay_time" not in st.session_state:
+        st.session_state.replay_time = last
+    st.session_state.replay_time = min(max(st.session_state.replay_time, first), last)
+    
+    col1, col2 = st.columns([4, 1])
+    # The jump runs before the slider is created so it can move it
+    with col2:
+        if st.button("🚨 Next Alert", use_container_width=True):
+            alert_time = next_alert_time(worker, st.session_state.replay_time, safety_voltage_limit)
+            if alert_time is None:
+                st.toast("No safety alerts after this moment")
+            else:
+                st.session_state.replay_time = alert_time.astype("datetime64[us]").item()
+    with col1:
+        if first < last:
+            seek_time = st.slider(
+                "Seek",
+                min_value=first,
+                max_value=last,
+                step=timedelta(seconds=worker.sampling_interval),
+                format="YYYY-MM-DD HH:mm:ss",
+                key="replay_time"
+            )
+        else:
+            seek_time = first
+    
+    began = time.perf_counter()
+    df = worker.replay_frame(seek_time)
+    seek_ms = (time.perf_counter() - began) * 1000
+    if df is None:
+        return
+    
+    sample_time = df["timestamp"].iloc[0]
+    elapsed = (sample_time - pd.Timestamp(worker.process_start_time)).total_seconds() / 3600
+    st.markdown(f"**{sample_time:%Y-%m-%d %H:%M:%S}** • {elapsed:.2f}h into the run • recomputed in {seek_ms:.0f} ms")
+    
+    status_counts = df["status"].value_counts()
+    render_summary_cards(
+        len(df), status_counts.get("Excellent", 0), status_counts.get("Good", 0), status_counts.get("Warning", 0),
+        status_counts.get("Critical", 0), df["health"].mean(), df["power"].sum(), df["voltage"].mean()
+    )
+    
+    df["alert"] = alert_mask(df["voltage"], df["temperature"], df["status"] == "Critical", safety_voltage_limit)
+    alerts = int(df["alert"].sum())
+    if alerts:
+        st.error(f"🚨 {alerts} cells with safety alerts at this moment")
+    
+    df = df.sort_values(["alert", "health"], ascending=[False, True])
+    decimals = {"voltage": 3, "current": 2, "temperature": 1, "soc": 3, "health": 1, "power": 2}
+    steps = ["protocol_step"] if "protocol_step" in df else []
+    st.dataframe(
+        df[["cell_id", "cell_type", "position", "alert", "status", *steps, *decimals]].astype(
+            dict.fromkeys(decimals, float)
+        ).round(decimals),
+        use_container_width=True,
+        hide_index=True
+    )
+
+def render_sweep_tab(worker):
+    """Render the parameter sweep form, heatmap and results table"""
+    st.subheader("🧪 Parameter Sweep")
+    base_params = st.session_state.process_parameters
+    st.caption(
+        f"Every combination simulates {base_params['test_duration']}h at a "
+        f"{base_params['sampling_interval']}s sampling interval, in parallel worker processes."
+    )
+    if base_params.get('protocol'):
+        st.caption("Sweeps run at constant charge and discharge rates; the selected test protocol is not applied.")
+    
+    cell_types = st.multiselect(
+        "Cell Types", list(CELL_CONFIGS), default=sorted(set(worker.cell_types)), key="sweep_cell_types"
+    )
+    sweep_axes = {}
+    for name, label, bounds, default, points, step in SWEEP_RANGES:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            low, high = st.slider(label, *bounds, value=default, step=step, key=f"sweep_{name}")
+        with col2:
+            count = st.number_input("Points", min_value=1, max_value=20, value=points, key=f"sweep_{name}_points")
+        sweep_axes[name] = sweep_values(low, high, count)
+    num_cells = st.number_input("Cells per Combination", min_value=1, max_value=256, value=16, key="sweep_cells")
+    
+    combinations = len(cell_types) * int(np.prod([len(values) for values in sweep_axes.values()]))
+    if st.button(f"🧪 Run Sweep ({combinations} combinations)", type="primary", disabled=combinations == 0):
+        sweep_progress = st.progress(0.0, text="Sweeping...")
+        st.session_state.sweep_results = run_sweep(
+            cell_types, sweep_axes["charge_rate"], sweep_axes["discharge_rate"],
+            sweep_axes["target_temperature"], base_params, num_cells=num_cells,
+            progress=lambda fraction: sweep_progress.progress(fraction, text=f"Sweeping... {fraction:.0%}")
+        )
+        sweep_progress.empty()
+    
+    results = st.session_state.sweep_results
+    if results is None:
+        st.info("Choose parameter ranges and run a sweep to compare them...")
+        return
+    
+    # Heatmap of charge x discharge rate for one chemistry and target temperature
+    axes, _ = sweep_cube(results, SWEEP_METRICS[0])
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        metric = st.selectbox("Metric", SWEEP_METRICS, format_func=lambda name: name.replace("_", " ").title(),
+                              key="sweep_metric")
+    with col2:
+        cell_type = st.selectbox("Cell Type", list(axes["cell_type"]), key="sweep_heatmap_type")
+    with col3:
+        temperature = st.select_slider("Target Temperature (°C)", options=list(axes["target_temperature"]),
+                                       key="sweep_heatmap_temperature")
+    axes, cube = sweep_cube(results, metric)
+    heatmap = cube[list(axes["cell_type"]).index(cell_type), :, :,
+                   list(axes["target_temperature"]).index(temperature)]
+    fig_sweep = px.imshow(
+        heatmap,
+        x=[f"{value:g}" for value in axes["discharge_rate"]],
+        y=[f"{value:g}" for value in axes["charge_rate"]],
+        labels={"x": "Discharge Rate (A)", "y": "Charge Rate (A)", "color": metric.replace("_", " ")},
+        title=f"🧪 {metric.replace('_', ' ').title()} - {cell_type} at {temperature:g}°C",
+        color_continuous_scale="RdYlGn_r" if metric in ("warning_hours", "critical_hours", "peak_temperature")
+        else "RdYlGn",
+        text_auto=".1f",
+        aspect="auto"
+    )
+    fig_sweep.update_layout(title_font_size=18, font_color='#333')
+    st.plotly_chart(fig_sweep, use_container_width=True)
+    
+    st.dataframe(results.round(2), use_container_width=True, hide_index=True)
+    st.download_button(
+        label="📥 Download Sweep Results (CSV)",
+        data=results.to_csv(index=False),
+        file_name=f"sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv"
+    )
+
+def add_band_traces(fig, bands, name, color, row=None, col=None):
+    """Add a shaded lower-upper band and a mean line from replicate_bands to a figure"""
+    fig.add_trace(go.Scatter(
+        x=bands["hours"], y=bands["upper"], mode="lines", line=dict(width=0),
+        legendgroup=name, showlegend=False, hoverinfo="skip"
+    ), row=row, col=col)
+    fig.add_trace(go.Scatter(
+        x=bands["hours"], y=bands["lower"], mode="lines", line=dict(width=0), fill="tonexty",
+        fillcolor=color, opacity=0.3, legendgroup=name, name=f"{name} band"
+    ), row=row, col=col)
+    fig.add_trace(go.Scatter(
+        x=bands["hours"], y=bands["mean"], mode="lines", line=dict(color=color, width=2),
+        legendgroup=name, name=f"{name} mean"
+    ), row=row, col=col)
+
+def render_montecarlo_tab(worker):
+    """Render Monte Carlo replicates of the bench configuration with their distributions and bands"""
+    st.subheader("🎲 Monte Carlo Replicates")
+    base_params = st.session_state.process_parameters
+    st.caption(
+        f"Replicates simulate the {len(worker.cell_ids)} configured cells for {base_params['test_duration']}h. "
+        "Replicate i draws from SeedSequence(seed, spawn_key=(i,)), so it can be re-created bit for bit."
+    )
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        replicates = st.number_input("Replicates", min_value=2, max_value=1000, value=50, key="mc_replicates")
+    with col2:
+        seed = st.number_input("Seed", min_value=0, value=0, step=1, key="mc_seed")
+    with col3:
+        level = st.select_slider("Band Coverage", options=[0.5, 0.8, 0.9, 0.95, 0.99], value=MONTE_CARLO_LEVEL,
+                                 format_func=lambda value: f"{value:.0%}", key="mc_level")
+    
+    if st.button(f"🎲 Run {replicates} Replicates", type="primary"):
+        mc_progress = st.progress(0.0, text="Running replicates...")
+        st.session_state.monte_carlo_results = run_replicates(
+            worker.cell_types, base_params, replicates, seed=int(seed),
+            progress=lambda fraction: mc_progress.progress(fraction, text=f"Running replicates... {fraction:.0%}"),
+            positions=worker.cells.positions
+        )
+        mc_progress.empty()
+    
+    results = st.session_state.monte_carlo_results
+    if results is None:
+        st.info("Run replicates to see health and status distributions...")
+        return
+    summary = results["summary"]
+    final = replicate_bands([0], summary[["final_health"]].to_numpy(), level).iloc[0]
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("🎲 Replicates", len(summary))
+    with col2:
+        st.metric("💚 Mean Final Health", f"{final['mean']:.2f}%",
+                  help=f"{level:.0%} CI of the mean: {final['mean_lower']:.2f}-{final['mean_upper']:.2f}%")
+    with col3:
+        st.metric(f"📏 {level:.0%} of Replicates", f"{final['lower']:.1f}-{final['upper']:.1f}%")
+    with col4:
+        st.metric("⚠️ Mean Warning Time", f"{summary['warning_hours'].mean():.2f}h")
+    
+    # Health and status count bands over the test
+    fig_bands = make_subplots(rows=1, cols=2, subplot_titles=("💚 Mean Cell Health (%)", "📊 Cells per Status"))
+    add_band_traces(fig_bands, replicate_bands(results["hours"], results["health"], level), "Health", "#11998e",
+                    row=1, col=1)
+    for code, label in enumerate(STATUS_COLORS):
+        add_band_traces(fig_bands, replicate_bands(results["hours"], results["status_counts"][:, :, code], level),
+                        label, STATUS_COLORS[label], row=1, col=2)
+    fig_bands.update_xaxes(title_text="Test Time (hours)")
+    fig_bands.update_layout(
+        height=450,
+        title_text=f"🎲 {level:.0%} Bands over {len(summary)} Replicates (seed {results['seed']})",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='#333'
+    )
+    st.plotly_chart(fig_bands, use_container_width=True)
+    
+    # Distribution of one per-replicate metric
+    metric = st.selectbox("Distribution", REPLICATE_METRICS, format_func=lambda name: name.replace("_", " ").title(),
+                          key="mc_metric")
+    fig_distribution = px.histogram(
+        summary, x=metric, nbins=30, title=f"🎲 {metric.replace('_', ' ').title()} across Replicates"
+    )
+    fig_distribution.update_traces(marker_color="#667eea", marker_line_width=1, marker_line_color='white')
+    fig_distribution.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font_color='#333',
+        title_font_size=18
+    )
+    st.plotly_chart(fig_distribution, use_container_width=True)
+    
+    st.dataframe(summary.round(3), use_container_width=True, hide_index=True)
+
+def render_process_tab(worker):
+    """Render the process efficiency analysis and summary report"""
+    st.subheader("📊 Process Analysis")
+    
+    history = worker.history
+    if history is not None and len(history) > 1:
+        # Process efficiency analysis over the entire test, reduced chunk by chunk: the bench
+        # means over time are downsampled as they stream and per-cell statistics merged
+        efficiency = BucketDownsampler(
+            worker.process_start_time, worker.latest_timestamp, 2, TREND_MAX_POINTS, st.session_state.downsample_mode
+        )
+        num_cells = len(history.cell_ids)
+        health, power, stress = RunningStats(num_cells), RunningStats(num_cells), RunningStats(num_cells)
+        for timestamps, series in worker.iter_history_window(
+            ("power", "health", "stress_factor"), since=worker.process_start_time
+        ):
+            efficiency.add(timestamps, np.column_stack([series["power"].mean(axis=1), series["health"].mean(axis=1)]))
+            health.add(series["health"])
+            power.add(series["power"])
+            stress.add(series["stress_factor"])
+        if not health.count:
+            st.info("Start the test to see process analysis...")
+            return
+        health_mean, health_std = health.overall()
         
-        # Enhanced health distribution
         col1, col2 = st.columns(2)
         
         with col1:
-            fig_health = px.histogram(
-                df, 
-                x="health", 
-                nbins=15, 
-                title="🎯 Health Distribution Analysis",
-                color="status",
-                color_discrete_map={
-                    "Excellent": "#00ff88", 
-                    "Good": "#667eea", 
-                    "Warning": "#f093fb", 
-                    "Critical": "#ff416c"
-                }
+            # Process efficiency over time, downsampled to a bounded number of points
+            efficiency_x, efficiency_y = efficiency.result()
+            efficiency_data = pd.DataFrame({
+                "timestamp": efficiency_x.T.ravel(),
+                "value": efficiency_y.T.ravel(),
+                "variable": np.repeat(["power", "health"], len(efficiency_x))
+            })
+            
+            fig_efficiency = px.line(
+                efficiency_data, 
+                x="timestamp", 
+                y="value", 
+                color="variable",
+                title="⚡ Process Efficiency Over Time",
+                labels={"value": "Value", "variable": "Metric"}
             )
-            fig_health.update_traces(marker_line_width=2, marker_line_color='white')
-            fig_health.update_layout(
+            fig_efficiency.update_layout(
                 plot_bgcolor='rgba(0,0,0,0)',
                 paper_bgcolor='rgba(0,0,0,0)',
                 font_color='#333',
                 title_font_size=18
             )
-            st.plotly_chart(fig_health, use_container_width=True)
+            st.plotly_chart(fig_efficiency, use_container_width=True)
         
         with col2:
-            # Health vs Stress Factor correlation
-            fig_stress = px.scatter(
-                df, 
-                x="stress_factor", 
-                y="health", 
-                color="status",
-                size="temperature",
-                title="📊 Health vs Stress Factor",
-                hover_data=["cell_id", "voltage", "current"],
-                color_discrete_map={
-                    "Excellent": "#00ff88", 
-                    "Good": "#667eea", 
-                    "Warning": "#f093fb", 
-                    "Critical": "#ff416c"
-                }
+            # Cell performance comparison
+            performance_data = pd.DataFrame({
+                'cell_id': history.cell_ids,
+                'Avg Health': health.mean,
+                'Health Std': health.std(),
+                'Avg Power': power.mean,
+                'Avg Stress': stress.mean
+            }).round(2)
+            
+            fig_performance = px.scatter(
+                performance_data, 
+                x="Avg Health", 
+                y="Avg Power", 
+                size="Health Std",
+                color="Avg Stress",
+                hover_data=["cell_id"],
+                title="🎯 Cell Performance Analysis",
+                color_continuous_scale="viridis"
             )
-            fig_stress.update_traces(marker_line_width=2, marker_line_color='white')
-            fig_stress.update_layout(
+            fig_performance.update_layout(
                 plot_bgcolor='rgba(0,0,0,0)',
                 paper_bgcolor='rgba(0,0,0,0)',
                 font_color='#333',
                 title_font_size=18
             )
-            st.plotly_chart(fig_stress, use_container_width=True)
-    
-    with tab3:
-        st.subheader("🔥 Temperature Monitoring")
+            st.plotly_chart(fig_performance, use_container_width=True)
+        
+        # Process summary report
+        st.subheader("📋 Process Summary Report")
         
+        if worker.process_start_time:
+            total_runtime = (datetime.now() - worker.process_start_time).total_seconds() / 3600
+            
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.markdown("**⏱️ Test Progress**")
+                st.write(f"Total Runtime: {total_runtime:.2f} hours")
+                st.write(f"Progress: {(total_runtime/st.session_state.total_test_duration*100):.1f}%")
+                st.write(f"Data Points: {health.count}")
+            
+            with col2:
+                st.markdown("**📊 Performance Metrics**")
+                st.write(f"Avg System Health: {health_mean:.1f}%")
+                st.write(f"Avg System Power: {power.mean.mean():.2f}W")
+                st.write(f"Std Health Deviation: {health_std:.2f}%")
+            
+            with col3:
+                st.markdown("**🔍 Quality Indicators**")
+                stable_cells = len([cell for cell in performance_data['Health Std'] if cell < 5.0])
+                st.write(f"Stable Cells: {stable_cells}/{len(performance_data)}")
+                st.write(f"Avg Stress Factor: {stress.mean.mean():.3f}")
+                
+                if health.min.min() > 75:
+                    st.success("✅ All cells maintaining good health")
+                elif health.min.min() > 50:
+                    st.warning("⚠️ Some cells showing degradation")
+                else:
+                    st.error("🚨 Critical health levels detected")
+    else:
+        st.info("Start the test to see process analysis...")
+
+# Main Dashboard
+st.markdown('<h1 class="main-header">🔋 Battery Cell Monitoring Dashboard</h1>', unsafe_allow_html=True)
+
+# Sidebar for configuration
+with st.sidebar:
+    st.header("⚙️ Configuration")
+    
+    # Bench and group information
+    fleet_mode = st.checkbox(
+        "🌐 Fleet Mode",
+        key="fleet_mode",
+        help="Run many bench/group pairs at once with the same cell configuration"
+    )
+    if fleet_mode:
+        fleet_benches_text = st.text_area(
+            "Fleet Benches",
+            value="Bench-001\nBench-002\nBench-003",
+            help="One bench name per line"
+        )
+        fleet_benches = list(dict.fromkeys(name.strip() for name in fleet_benches_text.splitlines() if name.strip()))
+        fleet_groups = st.number_input("Groups per Bench", min_value=1, max_value=100, value=2)
+    else:
+        running_benches = get_bench_registry().active()
+        if running_benches:
+            st.selectbox(
+                "📡 Join Running Bench",
+                options=[None, *range(len(running_benches))],
+                format_func=lambda i: "Select..." if i is None else f"{running_benches[i][0]} (Group {running_benches[i][1]})",
+                key="join_bench",
+                on_change=join_running_bench,
+                args=(running_benches,),
+                help="View a bench/group that is already initialized in this server"
+            )
+        bench_name = st.text_input("Bench Name", key="bench_name")
+        group_num = st.number_input("Group Number", min_value=1, max_value=100, key="group_num")
+    
+    # Data is sampled by the shared background worker of each bench and group; this
+    # session only views it
+    if fleet_mode:
+        workers = [get_acquisition_worker(fleet_bench, fleet_group)
+                   for fleet_bench in fleet_benches for fleet_group in range(1, fleet_groups + 1)]
+    else:
+        worker = get_acquisition_worker(bench_name, group_num)
+        workers = [worker]
+    sync_process_parameters(workers)
+    
+    st.divider()
+    
+    # Process Parameters Section
+    st.subheader("🔧 Process Parameters")
+    with st.expander("⚙️ Test Configuration", expanded=True):
         col1, col2 = st.columns(2)
         
         with col1:
-            # Enhanced temperature heatmap
-            temp_data = df.pivot_table(values='temperature', index='cell_type', columns='cell_id', fill_value=0)
-            fig_temp = px.imshow(
-                temp_data, 
-                title="🌡️ Temperature Heatmap",
-                color_continuous_scale="plasma",
-                aspect="auto"
+            test_duration = st.number_input(
+                "Test Duration (hours)", 
+                min_value=0.1, 
+                max_value=168.0, 
+                key="param_test_duration",
+                on_change=apply_process_parameters,
+                args=(workers,),
+                step=0.1,
+                help="Total duration for the battery test"
             )
-            # Add target temperature line
-            fig_temp.add_hline(
-                y=st.session_state.process_parameters["target_temperature"], 
-                line_dash="dash", 
-                line_color="white",
-                annotation_text="Target Temp"
+            
+            charge_rate = st.number_input(
+                "Charge Rate (A)", 
+                min_value=0.0, 
+                max_value=10.0, 
+                key="param_charge_rate",
+                on_change=apply_process_parameters,
+                args=(workers,),
+                step=0.1,
+                help="Charging current in Amperes"
             )
-            fig_temp.update_layout(
-                title_font_size=18,
-                font_color='#333'
+            
+            target_temperature = st.number_input(
+                "Target Temperature (°C)", 
+                min_value=-40, 
+                max_value=80, 
+                key="param_target_temperature",
+                on_change=apply_process_parameters,
+                args=(workers,),
+                step=1,
+                help="Target operating temperature"
+            )
+            
+            thermal_columns = st.number_input(
+                "Bench Columns (Thermal)", 
+                min_value=0, 
+                max_value=256, 
+                key="param_thermal_columns",
+                on_change=apply_process_parameters,
+                args=(workers,),
+                step=1,
+                help="Positions per row of the bench layout; neighbouring cells exchange heat (0: off)"
             )
-            st.plotly_chart(fig_temp, use_container_width=True)
         
         with col2:
-            # Temperature distribution by cell type
-            fig_temp_dist = px.box(
-                df, 
-                x="cell_type", 
-                y="temperature", 
-                color="cell_type",
-                title="🌡️ Temperature Distribution by Cell Type",
-                color_discrete_map={cell_type: config["color"] for cell_type, config in CELL_CONFIGS.items()}
+            discharge_rate = st.number_input(
+                "Discharge Rate (A)", 
+                min_value=0.0, 
+                max_value=10.0, 
+                key="param_discharge_rate",
+                on_change=apply_process_parameters,
+                args=(workers,),
+                step=0.1,
+                help="Discharging current in Amperes"
             )
-            fig_temp_dist.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='#333',
-                title_font_size=18
+            
+            sampling_interval = st.number_input(
+                "Sampling Interval (seconds)", 
+                min_value=1, 
+                max_value=60, 
+                key="param_sampling_interval",
+                on_change=apply_process_parameters,
+                args=(workers,),
+                step=1,
+                help="Data collection frequency"
             )
-            st.plotly_chart(fig_temp_dist, use_container_width=True)
-        
-        # Enhanced temperature vs power scatter
-        fig_scatter = px.scatter(
-            df, 
-            x="temperature", 
-            y="power", 
-            color="cell_type",
-            size="health",
-            title="🔥 Temperature vs Power Analysis",
-            hover_data=["cell_id", "voltage", "current", "status"],
-            color_discrete_map={cell_type: config["color"] for cell_type, config in CELL_CONFIGS.items()}
+            
+            safety_voltage_limit = st.number_input(
+                "Safety Voltage Limit (V)", 
+                min_value=2.0, 
+                max_value=5.0, 
+                key="param_safety_voltage_limit",
+                on_change=apply_process_parameters,
+                args=(workers,),
+                step=0.1,
+                help="Maximum safe voltage threshold"
+            )
+    
+    with st.expander("🧭 Test Protocol", expanded=False):
+        st.selectbox(
+            "Protocol",
+            options=[CONSTANT_RATES, *PROTOCOL_PRESETS, CUSTOM_PROTOCOL],
+            key="protocol_choice",
+            on_change=select_protocol,
+            args=(workers,),
+            help="Step sequence every cell runs on its own; constant rates use the charge and discharge rates above"
         )
+        if st.session_state.protocol_choice == CUSTOM_PROTOCOL:
+            protocol_file = st.file_uploader(
+                "Protocol File (JSON)",
+                type=["json"],
+                help='An object with "name", "cycles" and a "steps" list of cc_charge, cc_discharge, '
+                     'cv_hold, rest and pulse steps'
+            )
+            if protocol_file is not None:
+                try:
+                    protocol = load_test_protocol(protocol_file.getvalue(), protocol_file.name)
+                except ValueError as e:
+                    st.error(f"❌ Invalid protocol: {e}")
+                else:
+                    if protocol != st.session_state.param_protocol:
+                        st.session_state.param_protocol = protocol
+                        apply_process_parameters(workers)
+        protocol = st.session_state.param_protocol
+        if protocol is not None:
+            st.caption(f"**{protocol['name']}** × {protocol['cycles']} cycle(s)")
+            for number, step in enumerate(protocol["steps"], 1):
+                st.caption(f"{number}. {describe_step(step)}")
+    
+    # Store process parameters
+    st.session_state.process_parameters = {
+        'test_duration': test_duration,
+        'charge_rate': charge_rate,
+        'discharge_rate': discharge_rate,
+        'target_temperature': target_temperature,
+        'sampling_interval': sampling_interval,
+        'safety_voltage_limit': safety_voltage_limit,
+        'thermal_columns': thermal_columns,
+        'protocol': st.session_state.param_protocol
+    }
+    st.session_state.total_test_duration = test_duration
+    
+    
+    st.divider()
+    
+    # Cell configuration
+    st.subheader("🔋 Cell Configuration")
+    manifest_file = st.file_uploader(
+        "Cell Manifest (CSV/JSON)",
+        type=["csv", "json"],
+        help="Columns: cell_id, cell_type and optional position. Replaces the per-cell selectors below."
+    )
+    manifest = None
+    if manifest_file is not None:
+        try:
+            manifest = load_cell_manifest(manifest_file.getvalue(), manifest_file.name)
+        except ValueError as e:
+            st.error(f"❌ Invalid manifest: {e}")
+    
+    if manifest is not None:
+        # The manifest replaces the per-cell widgets
+        cell_ids = manifest["cell_id"].tolist()
+        cell_types = manifest["cell_type"].tolist()
+        cell_positions = manifest["position"].to_numpy()
+        st.success(f"📋 {len(cell_ids)} cells loaded from {manifest_file.name}")
+        type_counts = manifest["cell_type"].value_counts()
+        st.caption(" • ".join(f"{cell_type}: {count}" for cell_type, count in type_counts.items()))
+        with st.expander("Manifest Preview"):
+            st.dataframe(manifest[list(MANIFEST_COLUMNS)].head(100), use_container_width=True, hide_index=True)
+    else:
+        num_cells = st.slider("Number of Cells", min_value=1, max_value=16, value=8)
         
-        # Add target temperature line
-        fig_scatter.add_vline(
-            x=st.session_state.process_parameters["target_temperature"], 
-            line_dash="dash", 
-            line_color="gray",
-            annotation_text="Target Temperature"
-        )
+        cell_types = []
+        for i in range(num_cells):
+            cell_type = st.selectbox(
+                f"Cell {i+1} Type",
+                options=list(CELL_CONFIGS.keys()),
+                key=f"cell_type_{i}",
+                help=f"Select battery chemistry for Cell {i+1}"
+            )
+            cell_types.append(cell_type)
+        cell_ids = [f"Cell_{i+1}_{cell_type}" for i, cell_type in enumerate(cell_types)]
+        cell_positions = None
+    
+    # Pack topology: P parallel strings of as many series cells as the bench fills
+    st.session_state.pack_parallel = min(st.session_state.pack_parallel, len(cell_ids))
+    pack_parallel = st.number_input(
+        "Strings in Parallel (P)",
+        min_value=1,
+        max_value=len(cell_ids),
+        key="pack_parallel",
+        help="Cells fill the series strings in position order"
+    )
+    pack_series = len(cell_ids) // pack_parallel
+    unused_cells = len(cell_ids) - pack_series * pack_parallel
+    st.caption(f"🔗 Pack: {pack_series}S{pack_parallel}P" + (f" • {unused_cells} cells not in the pack" if unused_cells else ""))
+    
+    st.divider()
+    
+    if fleet_mode:
+        # Fleet control applies the same cell configuration to every bench/group
+        st.subheader("🌐 Fleet Control")
         
-        fig_scatter.update_traces(marker_line_width=2, marker_line_color='white')
-        fig_scatter.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='#333',
-            title_font_size=18
-        )
-        st.plotly_chart(fig_scatter, use_container_width=True)
+        if st.button("🚀 Initialize Fleet", type="primary", use_container_width=True):
+            st.session_state.elapsed_time = 0
+            for fleet_worker in workers:
+                fleet_worker.initialize(cell_ids, cell_types, cell_positions)
+            st.success(f"🎉 {len(workers)} groups initialized successfully!")
+        
+        running_groups = sum(fleet_worker.is_monitoring for fleet_worker in workers)
+        status_class = "status-running" if running_groups else "status-stopped"
+        st.markdown(f"""
+        <div class="process-status {status_class}">
+            🔄 {running_groups}/{len(workers)} Groups Running
+        </div>
+        """, unsafe_allow_html=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("▶️ Start All", use_container_width=True):
+                for fleet_worker in workers:
+                    fleet_worker.start()
+                st.success("Fleet monitoring started!")
+        
+        with col2:
+            if st.button("⏸️ Pause All", use_container_width=True):
+                for fleet_worker in workers:
+                    fleet_worker.pause()
+                st.info("Fleet monitoring paused!")
+        
+        if st.button("🔄 Reset Fleet", use_container_width=True, type="secondary"):
+            for fleet_worker in workers:
+                fleet_worker.reset()
+            st.info("Fleet reset successfully!")
     
-    with tab4:
-        st.subheader("⚡ Historical Trends")
+    else:
+        # Control panel
+        st.subheader("🎛️ Control Panel")
         
-        if len(st.session_state.historical_data) > 1:
-            # Prepare historical data
-            hist_df = []
-            for record in st.session_state.historical_data[-100:]:  # Last 100 records
-                for cell_id, cell_data in record["data"].items():
-                    hist_df.append({
-                        "timestamp": record["timestamp"],
-                        "cell_id": cell_id,
-                        "cell_type": cell_data["cell_type"],
-                        "voltage": cell_data["voltage"],
-                        "current": cell_data["current"],
-                        "temperature": cell_data["temperature"],
-                        "health": cell_data["health"],
-                        "power": cell_data["power"],
-                        "status": cell_data["status"]
-                    })
-            
-            hist_df = pd.DataFrame(hist_df)
-            
-            # Enhanced multi-line charts
-            fig_trends = make_subplots(
-                rows=2, cols=2,
-                subplot_titles=("⚡ Voltage Trends", "🔄 Current Trends", "🌡️ Temperature Trends", "💚 Health Trends"),
-                vertical_spacing=0.08
-            )
-            
-            # Color palette for different cells
-            colors = ['#00ff88', '#ff416c', '#f093fb', '#667eea', '#ffa726', '#ab47bc', '#26c6da', '#66bb6a']
-            
-            # Voltage trends
-            for i, cell_id in enumerate(hist_df["cell_id"].unique()):
-                cell_hist = hist_df[hist_df["cell_id"] == cell_id]
-                fig_trends.add_trace(
-                    go.Scatter(
-                        x=cell_hist["timestamp"], 
-                        y=cell_hist["voltage"], 
-                        name=f"{cell_id}_V", 
-                        line=dict(width=3, color=colors[i % len(colors)])
-                    ),
-                    row=1, col=1
-                )
-            
-            # Current trends
-            for i, cell_id in enumerate(hist_df["cell_id"].unique()):
-                cell_hist = hist_df[hist_df["cell_id"] == cell_id]
-                fig_trends.add_trace(
-                    go.Scatter(
-                        x=cell_hist["timestamp"], 
-                        y=cell_hist["current"], 
-                        name=f"{cell_id}_I", 
-                        showlegend=False,
-                        line=dict(width=3, color=colors[i % len(colors)])
-                    ),
-                    row=1, col=2
-                )
-            
-            # Temperature trends
-            for i, cell_id in enumerate(hist_df["cell_id"].unique()):
-                cell_hist = hist_df[hist_df["cell_id"] == cell_id]
-                fig_trends.add_trace(
-                    go.Scatter(
-                        x=cell_hist["timestamp"], 
-                        y=cell_hist["temperature"], 
-                        name=f"{cell_id}_T", 
-                        showlegend=False,
-                        line=dict(width=3, color=colors[i % len(colors)])
-                    ),
-                    row=2, col=1
-                )
-            
-            # Health trends
-            for i, cell_id in enumerate(hist_df["cell_id"].unique()):
-                cell_hist = hist_df[hist_df["cell_id"] == cell_id]
-                fig_trends.add_trace(
-                    go.Scatter(
-                        x=cell_hist["timestamp"], 
-                        y=cell_hist["health"], 
-                        name=f"{cell_id}_H", 
-                        showlegend=False,
-                        line=dict(width=3, color=colors[i % len(colors)])
-                    ),
-                    row=2, col=2
+        # Another session's offline simulation owns the model until it finishes
+        simulating = worker.is_simulating
+        if st.button("🚀 Initialize Test", type="primary", use_container_width=True, disabled=simulating):
+            st.session_state.elapsed_time = 0
+            st.session_state.completion_announced = False
+            worker.initialize(cell_ids, cell_types, cell_positions)
+            st.success("🎉 Test initialized successfully!")
+        
+        # Run the whole test offline instead of in real time
+        event_driven = st.checkbox(
+            "Event-Driven Simulation",
+            key="event_driven",
+            disabled=bool(thermal_columns),
+            help="Jump straight between voltage limits, temperature limits and protocol step ends; "
+                 "samples are evaluated on demand. Needs thermal coupling off."
+        )
+        if st.button("⚡ Simulate Full Test", use_container_width=True, disabled=worker.is_monitoring or simulating,
+                     help="Simulate the full test duration at the sampling interval as fast as possible"):
+            st.session_state.completion_announced = False
+            if worker.cells is None:
+                worker.initialize(cell_ids, cell_types, cell_positions)
+            simulation_progress = st.progress(0.0, text="Simulating...")
+            stats = worker.simulate(progress=lambda fraction: simulation_progress.progress(
+                fraction, text=f"Simulating... {fraction:.0%}"
+            ), event_driven=event_driven and not thermal_columns)
+            simulation_progress.empty()
+            if stats is None:
+                # Another session started live sampling or reset the bench in the meantime
+                st.warning("⚠️ Cannot simulate while the test or another simulation is running, "
+                           "or before cells are initialized.")
+            else:
+                st.success(
+                    f"⚡ Simulated {stats['simulated_hours']:.1f}h ({stats['samples']:,} samples x {stats['cells']} cells) "
+                    f"in {stats['elapsed_seconds']:.2f}s: {stats['samples_per_second']:,.0f} samples/s, "
+                    f"{stats['speedup']:,.0f}x real time"
                 )
+                if "events" in stats:
+                    st.caption(f"{stats['events']:,} events • {stats['segments']:,} trajectory segments")
+        
+        # Process status display
+        if worker.process_start_time:
+            # A completed run ends at its last sample, which a simulated run reaches ahead of the clock
+            current_time = worker.latest_timestamp if worker.is_completed else datetime.now()
+            elapsed = (current_time - worker.process_start_time).total_seconds() / 3600
+            st.session_state.elapsed_time = elapsed
             
-            fig_trends.update_layout(
-                height=600, 
-                title_text="📈 Historical Data Trends",
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='#333'
-            )
-            fig_trends.update_xaxes(title_text="Time")
-            fig_trends.update_yaxes(title_text="Voltage (V)", row=1, col=1)
-            fig_trends.update_yaxes(title_text="Current (A)", row=1, col=2)
-            fig_trends.update_yaxes(title_text="Temperature (°C)", row=2, col=1)
-            fig_trends.update_yaxes(title_text="Health (%)", row=2, col=2)
+            progress = min(elapsed / st.session_state.total_test_duration, 1.0)
+            remaining_time = max(st.session_state.total_test_duration - elapsed, 0)
             
-            st.plotly_chart(fig_trends, use_container_width=True)
+            if worker.is_completed:
+                st.markdown("""
+                <div class="process-status status-completed">
+                    ✅ Test Completed
+                </div>
+                """, unsafe_allow_html=True)
+            elif worker.is_monitoring:
+                st.markdown("""
+                <div class="process-status status-running">
+                    🔄 Test In Progress
+                </div>
+                """, unsafe_allow_html=True)
+            else:
+                st.markdown("""
+                <div class="process-status status-stopped">
+                    ⏸️ Test Paused
+                </div>
+                """, unsafe_allow_html=True)
             
-            # Historical statistics
-            st.subheader("📊 Historical Statistics")
-            col1, col2, col3, col4 = st.columns(4)
+            # Progress bar
+            st.progress(progress)
             
+            col1, col2 = st.columns(2)
             with col1:
-                st.metric("📈 Max Voltage", f"{hist_df['voltage'].max():.3f}V")
-                st.metric("📉 Min Voltage", f"{hist_df['voltage'].min():.3f}V")
-            
+                st.metric("⏱️ Elapsed", f"{elapsed:.1f}h")
             with col2:
-                st.metric("⚡ Max Current", f"{hist_df['current'].max():.2f}A")
-                st.metric("⚡ Min Current", f"{hist_df['current'].min():.2f}A")
-            
-            with col3:
-                st.metric("🌡️ Max Temperature", f"{hist_df['temperature'].max():.1f}°C")
-                st.metric("🌡️ Min Temperature", f"{hist_df['temperature'].min():.1f}°C")
-            
-            with col4:
-                st.metric("💚 Max Health", f"{hist_df['health'].max():.1f}%")
-                st.metric("💔 Min Health", f"{hist_df['health'].min():.1f}%")
-        else:
-            st.info("Start monitoring to see historical trends...")
-    
-    with tab5:
-        st.subheader("📊 Process Analysis")
+                st.metric("⏳ Remaining", f"{remaining_time:.1f}h")
         
-        if len(st.session_state.historical_data) > 1:
-            # Process efficiency analysis
-            hist_df = []
-            for record in st.session_state.historical_data:
-                for cell_id, cell_data in record["data"].items():
-                    hist_df.append({
-                        "timestamp": record["timestamp"],
-                        "cell_id": cell_id,
-                        "voltage": cell_data["voltage"],
-                        "current": cell_data["current"],
-                        "power": cell_data["power"],
-                        "health": cell_data["health"],
-                        "temperature": cell_data["temperature"],
-                        "stress_factor": cell_data["stress_factor"]
-                    })
-            
-            hist_df = pd.DataFrame(hist_df)
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                # Process efficiency over time
-                efficiency_data = hist_df.groupby('timestamp').agg({
-                    'power': 'mean',
-                    'health': 'mean',
-                    'stress_factor': 'mean'
-                }).reset_index()
-                
-                fig_efficiency = px.line(
-                    efficiency_data, 
-                    x="timestamp", 
-                    y=["power", "health"], 
-                    title="⚡ Process Efficiency Over Time",
-                    labels={"value": "Value", "variable": "Metric"}
-                )
-                fig_efficiency.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font_color='#333',
-                    title_font_size=18
+        # Monitoring controls
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("▶️ Start", use_container_width=True, disabled=simulating):
+                worker.start()
+                st.session_state.completion_announced = False
+                if worker.is_monitoring:
+                    st.success("Monitoring started!")
+                else:
+                    st.warning("⚠️ Cannot start while a simulation is running or before cells are initialized.")
+        
+        with col2:
+            if st.button("⏸️ Pause", use_container_width=True):
+                worker.pause()
+                st.info("Monitoring paused!")
+        
+        # Reset button
+        if st.button("🔄 Reset Test", use_container_width=True, type="secondary", disabled=simulating):
+            worker.reset()
+            st.session_state.elapsed_time = 0
+            st.info("Test reset successfully!")
+        
+        st.divider()
+        
+        # Export Section
+        st.subheader("💾 Data Export")
+        export_format = st.selectbox(
+            "Export Format",
+            options=list(EXPORT_FORMATS.keys()),
+            help="Parquet, Feather and Arrow IPC keep typed columns and load much faster than CSV"
+        )
+        export_extension, export_mime = EXPORT_FORMATS[export_format]
+        
+        # Current data export
+        if worker.latest_records is not None and export_format != "CSV":
+            latest_timestamp, latest_records = worker.snapshot()
+            st.download_button(
+                label=f"📊 Export Current Data ({export_format})",
+                data=export_current_binary(
+                    latest_timestamp, latest_records, worker.cell_ids, worker.cell_types, export_format
+                ),
+                file_name=f"{bench_name}_Group{group_num}_current_{datetime.now().strftime('%Y%m%d_%H%M%S')}{export_extension}",
+                mime=export_mime,
+                use_container_width=True
+            )
+        elif worker.latest_records is not None:
+            if st.button("📊 Export Current Data", use_container_width=True):
+                df, filename = export_to_csv(worker.latest_frame(), f"{bench_name}_Group{group_num}_current")
+                if df is not None and filename is not None:
+                    csv_buffer = io.StringIO()
+                    df.to_csv(csv_buffer, index=False)
+                    csv_data = csv_buffer.getvalue()
+                    
+                    st.download_button(
+                        label="⬇️ Download Current Data CSV",
+                        data=csv_data,
+                        file_name=filename,
+                        mime="text/csv",
+                        use_container_width=True
+                    )
+                    st.success("📁 Current data ready for download!")
+        
+        # Historical data export
+        if worker.history:
+            # Downloads are held in memory while served, so long runs are exported in parts
+            parts = export_parts(
+                worker.process_start_time, worker.latest_timestamp, len(worker.cell_ids), worker.sampling_interval
+            )
+            part = 0
+            part_suffix = ""
+            if len(parts) > 1:
+                part = st.selectbox(
+                    "Export Part",
+                    options=range(len(parts)),
+                    format_func=lambda i: f"Part {i + 1}/{len(parts)}: {parts[i][0]:%m-%d %H:%M} - {parts[i][1]:%m-%d %H:%M}",
+                    help=f"Each part holds up to {EXPORT_PART_ROWS:,} rows (one per cell per sample)"
                 )
-                st.plotly_chart(fig_efficiency, use_container_width=True)
+                part_suffix = f"_part{part + 1}of{len(parts)}"
+            part_start, part_end = parts[part]
+            part_until = part_end if part < len(parts) - 1 else None
+            filename = (f"{bench_name}_Group{group_num}_historical_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                        f"{part_suffix}{export_extension}")
+            # Clear exports left behind by downloads that never finished
+            prune_exports(EXPORT_DIR)
             
-            with col2:
-                # Cell performance comparison
-                performance_data = hist_df.groupby('cell_id').agg({
-                    'health': ['mean', 'std'],
-                    'power': 'mean',
-                    'stress_factor': 'mean'
-                }).round(2)
-                
-                performance_data.columns = ['Avg Health', 'Health Std', 'Avg Power', 'Avg Stress']
-                performance_data = performance_data.reset_index()
-                
-                fig_performance = px.scatter(
-                    performance_data, 
-                    x="Avg Health", 
-                    y="Avg Power", 
-                    size="Health Std",
-                    color="Avg Stress",
-                    hover_data=["cell_id"],
-                    title="🎯 Cell Performance Analysis",
-                    color_continuous_scale="viridis"
-                )
-                fig_performance.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font_color='#333',
-                    title_font_size=18
-                )
-                st.plotly_chart(fig_performance, use_container_width=True)
+            def stream_historical_export():
+                # Runs on a separate thread when clicked: writes the part chunk by chunk to
+                # disk, so neither the page script nor the acquisition loop waits on it.
+                # Streamlit serves downloads from memory, so the finished file (at most
+                # EXPORT_PART_ROWS rows) is read back whole and its directory removed
+                os.makedirs(EXPORT_DIR, exist_ok=True)
+                with tempfile.TemporaryDirectory(dir=EXPORT_DIR) as export_dir:
+                    export_path = write_historical_export(
+                        os.path.join(export_dir, filename),
+                        worker.iter_history_window(EXPORT_COLUMNS, part_start, until=part_until),
+                        worker.history.cell_ids, worker.history.cell_types, export_format
+                    )
+                    with open(export_path, "rb") as f:
+                        return f.read()
             
-            # Process summary report
-            st.subheader("📋 Process Summary Report")
+            st.download_button(
+                label=f"📈 Export Historical Data ({export_format})",
+                data=stream_historical_export,
+                file_name=filename,
+                mime=export_mime,
+                use_container_width=True
+            )
             
-            if st.session_state.process_start_time:
-                total_runtime = (datetime.now() - st.session_state.process_start_time).total_seconds() / 3600
-                
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.markdown("**⏱️ Test Progress**")
-                    st.write(f"Total Runtime: {total_runtime:.2f} hours")
-                    st.write(f"Progress: {(total_runtime/st.session_state.total_test_duration*100):.1f}%")
-                    st.write(f"Data Points: {len(st.session_state.historical_data)}")
-                
-                with col2:
-                    st.markdown("**📊 Performance Metrics**")
-                    st.write(f"Avg System Health: {hist_df['health'].mean():.1f}%")
-                    st.write(f"Avg System Power: {hist_df['power'].mean():.2f}W")
-                    st.write(f"Std Health Deviation: {hist_df['health'].std():.2f}%")
-                
-                with col3:
-                    st.markdown("**🔍 Quality Indicators**")
-                    stable_cells = len([cell for cell in performance_data['Health Std'] if cell < 5.0])
-                    st.write(f"Stable Cells: {stable_cells}/{len(performance_data)}")
-                    st.write(f"Avg Stress Factor: {hist_df['stress_factor'].mean():.3f}")
-                    
-                    if hist_df['health'].min() > 75:
-                        st.success("✅ All cells maintaining good health")
-                    elif hist_df['health'].min() > 50:
-                        st.warning("⚠️ Some cells showing degradation")
-                    else:
-                        st.error("🚨 Critical health levels detected")
-        else:
-            st.info("Start the test to see process analysis...")
+            # Data summary
+            st.info(f"📊 Records: {len(worker.history)}")
+    
+    # Auto-refresh control
+    st.divider()
+    auto_refresh = st.checkbox("🔄 Auto Refresh", value=True)
+    refresh_interval = st.selectbox(
+        "Refresh Interval",
+        options=[1, 3, 5, 10, 30],
+        index=2,
+        format_func=lambda x: f"{x}s"
+    )
+    st.selectbox(
+        "📉 Chart Downsampling",
+        options=DOWNSAMPLE_MODES,
+        key="downsample_mode",
+        help="LTTB keeps the visual shape; Min/Max keeps every bucket's extremes so short spikes stay visible"
+    )
+    lazy_tabs = st.checkbox(
+        "💤 Render Selected Tab Only",
+        value=True,
+        help="Only build the data and charts of the visible tab on each refresh"
+    )
+    
+
+# Main content area
+if fleet_mode:
+    if any(fleet_worker.latest_records is not None for fleet_worker in workers):
+        st.header(f"🌐 Fleet Overview - {len(fleet_benches)} Benches, {len(workers)} Groups")
+        
+        live = auto_refresh and any(fleet_worker.is_monitoring for fleet_worker in workers)
+        st.fragment(render_fleet_view, run_every=refresh_interval if live else None)(workers, live)
+    else:
+        st.info("👈 Please list the fleet benches and initialize the fleet using the sidebar to begin monitoring.")
+
+elif worker.latest_records is not None:
+    
+    # Announce completion once per session when the worker reaches the test duration
+    if worker.is_completed and not st.session_state.completion_announced:
+        st.session_state.completion_announced = True
+        st.balloons()
+        st.success("🎉 Test completed successfully!")
+    
+    # System overview with enhanced styling
+    st.header(f"📊 System Overview - {bench_name} (Group {group_num})")
+    
+    # Process Parameters Display
+    with st.expander("🔧 Current Process Parameters", expanded=False):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.markdown("**⚡ Electrical Parameters**")
+            st.write(f"Charge Rate: {st.session_state.process_parameters['charge_rate']} A")
+            st.write(f"Discharge Rate: {st.session_state.process_parameters['discharge_rate']} A")
+            st.write(f"Safety Limit: {st.session_state.process_parameters['safety_voltage_limit']} V")
+            protocol = st.session_state.process_parameters['protocol']
+            if protocol is None:
+                st.write("Protocol: Constant Rates")
+            else:
+                st.write(f"Protocol: {protocol['name']} × {protocol['cycles']} cycle(s)")
+                for number, step in enumerate(protocol["steps"], 1):
+                    st.caption(f"{number}. {describe_step(step)}")
+        
+        with col2:
+            st.markdown("**🌡️ Environmental Parameters**")
+            st.write(f"Target Temperature: {st.session_state.process_parameters['target_temperature']} °C")
+            st.write(f"Test Duration: {st.session_state.process_parameters['test_duration']} hours")
+            thermal_columns = st.session_state.process_parameters['thermal_columns']
+            st.write(f"Thermal Coupling: {f'{thermal_columns} columns' if thermal_columns else 'Off'}")
+        
+        with col3:
+            st.markdown("**📊 Data Collection**")
+            st.write(f"Sampling Interval: {st.session_state.process_parameters['sampling_interval']} seconds")
+            if worker.process_start_time:
+                st.write(f"Test Progress: {(st.session_state.elapsed_time/st.session_state.total_test_duration*100):.1f}%")
+            if worker.run_seed is not None:
+                # Entropy and spawn key re-create the run's random streams
+                st.write(f"Run Seed: {worker.run_seed.entropy} / spawn key {worker.run_seed.spawn_key}")
+    
+    # Live sections refresh themselves while monitoring; the sidebar and the rest of the
+    # page are only rebuilt on a full rerun
+    live = auto_refresh and worker.is_monitoring
+    live_interval = refresh_interval if live else None
+    # History views only change when a new sample lands, so never refresh faster than sampling
+    history_interval = max(refresh_interval, worker.sampling_interval) if live else None
+    
+    st.fragment(render_overview, run_every=live_interval)(worker, live)
+    
+    # Tabs for different views
+    tab_views = [
+        ("📈 Real-time Data", render_realtime_tab, live_interval),
+        ("🔋 Enhanced Health", render_health_tab, live_interval),
+        ("🔥 Temperature Monitor", render_temperature_tab, live_interval),
+        ("⚡ Historical Trends", render_trends_tab, history_interval),
+        ("⏪ Replay", render_replay_tab, None),
+        ("📊 Process Analysis", render_process_tab, history_interval),
+        ("🧪 Parameter Sweep", render_sweep_tab, None),
+        ("🎲 Monte Carlo", render_montecarlo_tab, None)
+    ]
+    tab_labels = [label for label, _, _ in tab_views]
+    if lazy_tabs:
+        # Track the selected tab (kept across reruns by its key) so hidden tabs can be skipped
+        tabs = st.tabs(tab_labels, key="selected_tab", on_change="rerun")
+    else:
+        tabs = st.tabs(tab_labels)
+    
+    for tab, (_, render_tab, run_every) in zip(tabs, tab_views):
+        with tab:
+            # tab.open is None when tabs don't track selection, so every tab renders
+            if tab.open is False:
+                continue
+            st.fragment(render_tab, run_every=run_every)(worker)
 
 else:
     st.info("👈 Please configure and initialize cells using the sidebar to begin monitoring.")
@@ -1408,6 +2123,17 @@ else:
             - Temperature: {config['temp_range'][0]}°C to {config['temp_range'][1]}°C
             """)
     
+    
+    with config_col2:
+        for i, (cell_type, config) in enumerate(list(CELL_CONFIGS.items())[2:]):
+            st.markdown(f"""
+            **{cell_type}** (Lithium {cell_type})
+            - Voltage Range: {config['min_voltage']}V - {config['max_voltage']}V
+            - Nominal: {config['nominal_voltage']}V
+            - Capacity: {config['capacity_range'][0]}-{config['capacity_range'][1]} Ah
+            - Temperature: {config['temp_range'][0]}°C to {config['temp_range'][1]}°C
+            """)
+    
     st.subheader("🚀 Quick Start Guide:")
     st.markdown("""
     1. **Configure Process Parameters** - Set test duration, charge/discharge rates, and temperature
@@ -1456,7 +2182,7 @@ else:
 
 # Footer with enhanced styling
 st.markdown("---")
-st.markdown(f"""
+st.markdown("""
     <div style='text-align: center; color: #666; padding: 20px;'>
         <p>🔋 <strong>Enhanced Battery Cell Monitoring Dashboard</strong> | Professional Real-time Monitoring System</p>
         <p style='font-size: 0.9rem; opacity: 0.8;'>
@@ -1465,18 +2191,5 @@ st.markdown(f"""
         <p style='font-size: 0.8rem; opacity: 0.6;'>
             Developed for Professional Battery Testing Applications
         </p>
-        <p style='font-size: 0.85rem; color: #555; margin-top: 10px;'>
-            Capacity Range: {config['capacity_range'][0]}-{config['capacity_range'][1]} Ah<br>
-            Temperature: {config['temp_range'][0]}°C to {config['temp_range'][1]}°C
-        </p>
     </div>
 """, unsafe_allow_html=True)
-
-    
-    with config_col2:
-        for i, (cell_type, config) in enumerate(list(CELL_CONFIGS.items())[2:]):
-            st.markdown(f"""
-            **{cell_type}** (Lithium {cell_type})
-            - Voltage Range: {config['min_voltage']}V - {config['max_voltage']}V
-            - Nominal: {config['nominal_voltage']}V
-            - Capacity: {config['capacity_range'][0